@@ -1,4 +1,5 @@
 from flask import Flask
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
@@ -8,8 +9,17 @@ load_dotenv()
 # Import configuration
 from config.settings import SECRET_KEY
 
+class AppJSONProvider(DefaultJSONProvider):
+    """JSON provider that also serializes compact prospect records"""
+    @staticmethod
+    def default(o):
+        if hasattr(o, 'to_dict'):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
 def create_app():
     app = Flask(__name__)
+    app.json = AppJSONProvider(app)
     app.secret_key = SECRET_KEY
 
     # Security: Configure CORS properly for production
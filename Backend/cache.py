@@ -31,6 +31,12 @@ except Exception as e:
     print(f"[ERROR] Redis connection failed: {e}")
     redis_client = None
 
+def _json_default(value: Any) -> Any:
+    """Serialize objects such as compact prospect records via to_dict()"""
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
 def get_cached_data(key: str) -> Optional[Any]:
     """Get data from Redis cache with timeout protection"""
     if not redis_client:
@@ -50,7 +56,7 @@ def set_cached_data(key: str, value: Any, ttl: int = 3600) -> bool:
     if not redis_client:
         return False
     try:
-        redis_client.setex(key, ttl, json.dumps(value))
+        redis_client.setex(key, ttl, json.dumps(value, default=_json_default))
         return True
     except (redis.TimeoutError, redis.ConnectionError) as e:
         print(f"Redis timeout/connection error setting key {key}: {e}")
@@ -12,4 +12,24 @@ SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-here')
 CLIENT_SECRET=os.getenv("CLIENT_SECRET")
 CLIENT_ID=os.getenv("CLIENT_ID")
 BUSINESS_UNIT_ID=os.getenv("BUSINESS_UNIT_ID")
-SF_LOGIN_URL=os.getenv("SF_LOGIN_URL")
\ No newline at end of file
+SF_LOGIN_URL=os.getenv("SF_LOGIN_URL")
+
+# Directory for on-disk spill files written by streaming prospect audits
+AUDIT_SPILL_DIR = os.getenv("AUDIT_SPILL_DIR") or None
+
+# Worker processes for parallel prospect audits (0 = one per CPU core)
+AUDIT_WORKERS = int(os.getenv("AUDIT_WORKERS", "0"))
+
+# SQLite file holding the local copy of visitor activity streams
+ACTIVITY_STORE_PATH = os.getenv("ACTIVITY_STORE_PATH", "activity_store.sqlite")
+
+# Unique opens/clicks in email stats: "exact" (distinct visitor rows) or
+# "approximate" (HyperLogLog sketches, standard error 1.04 / sqrt(2 ** precision))
+EMAIL_UNIQUE_MODE = os.getenv("EMAIL_UNIQUE_MODE", "exact")
+HLL_PRECISION = int(os.getenv("HLL_PRECISION", "12"))
+
+# Worker threads computing per-form statistics
+FORM_STATS_WORKERS = int(os.getenv("FORM_STATS_WORKERS", "8"))
+
+# Seconds landing page metadata stays cached; it changes far less often than activity
+LANDING_PAGE_METADATA_TTL = int(os.getenv("LANDING_PAGE_METADATA_TTL", "21600"))
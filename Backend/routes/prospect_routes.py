@@ -1,9 +1,20 @@
-from flask import Blueprint, request, jsonify, g
+from flask import Blueprint, Response, request, jsonify, send_file, g
 from services.prospect_service import (
-    get_prospect_health, find_duplicate_prospects, find_inactive_prospects, 
-    find_missing_critical_fields, find_scoring_issues
+    get_prospect_health, get_prospect_health_streaming, find_duplicate_prospects, find_inactive_prospects, 
+    find_missing_critical_fields, find_scoring_issues, find_fuzzy_duplicate_prospects,
+    refresh_prospect_health
 )
-from datetime import datetime, timedelta
+from services.prospect_audit_state import IncrementalAuditState
+from services.prospect_records import ProspectRecord, compact_audit_results
+from services.prospect_pagination import ProspectSnapshot, StaleCursorError
+from services.prospect_bitmaps import ProspectBitmapIndex
+from services.prospect_query import facet_counts, filter_bitmap, run_filter
+from services.prospect_search import ProspectSearchIndex
+from services.prospect_export import EXPORT_FORMATS, EXPORT_SECTIONS, iter_section_rows, stream_export
+from services.prospect_columnar import COLUMNAR_FORMATS, columnar_available, export_columnar
+from datetime import datetime
+import threading
+import time
 from cache import get_cached_data, set_cached_data
 from middleware.auth_middleware import require_auth
 
@@ -15,19 +26,151 @@ _memory_cache = {}
 # Tab data cache for instant loading
 _tab_cache = {}
 
+# Streaming audits: cache_key -> (summary response, disk-backed detail store, expiry time)
+_spill_stores = {}
+_spill_lock = threading.Lock()
+
+# Seconds a full prospect audit stays in the Redis cache
+PROSPECT_CACHE_TTL = 1800
+
+# Streaming audits live as long as the Redis prospect cache; at most this
+# many are kept, and the oldest store is closed (deleting its file) first
+SPILL_STORE_TTL = PROSPECT_CACHE_TTL
+MAX_SPILL_STORES = 8
+
+# Incremental audit states: cache_key -> (state, expiry time). A state
+# expires with the full audit it was built from, so the next request runs a
+# fresh audit and picks up what delta syncs miss, such as deleted prospects
+_audit_states = {}
+_state_lock = threading.Lock()
+MAX_AUDIT_STATES = 8
+
+# Tabs served from a ProspectSnapshot with server-side sorting and cursors
+_SORTABLE_TABS = ('all_prospects', 'active_prospects', 'duplicates', 'inactive', 'missing_fields', 'scoring_issues')
+
+# Detail tab name -> audit rule whose rows a spill store holds
+_SPILL_RULES = {
+    'duplicates': 'duplicates',
+    'inactive': 'inactive_prospects',
+    'missing_fields': 'missing_fields',
+    'scoring_issues': 'scoring_issues'
+}
+
+def _evict_spill_stores():
+    # Caller holds _spill_lock
+    now = time.time()
+    for key in [key for key, entry in _spill_stores.items() if entry[2] <= now]:
+        _spill_stores.pop(key)[1].close()
+    while len(_spill_stores) > MAX_SPILL_STORES:
+        _spill_stores.pop(next(iter(_spill_stores)))[1].close()
+
+def get_spill_store(cache_key):
+    """(summary response, detail store) of an unexpired streaming audit, or None"""
+    with _spill_lock:
+        _evict_spill_stores()
+        entry = _spill_stores.get(cache_key)
+        return entry[:2] if entry else None
+
+def put_spill_store(cache_key, response_data, store):
+    """Keep a streaming audit's results for SPILL_STORE_TTL seconds"""
+    with _spill_lock:
+        replaced = _spill_stores.pop(cache_key, None)
+        if replaced:
+            replaced[1].close()
+        _spill_stores[cache_key] = (response_data, store, time.time() + SPILL_STORE_TTL)
+        _evict_spill_stores()
+
+def drop_spill_store(cache_key):
+    """Close and forget a streaming audit's results"""
+    with _spill_lock:
+        entry = _spill_stores.pop(cache_key, None)
+    if entry:
+        entry[1].close()
+
+def _synced_at_key(cache_key):
+    return f"{cache_key}:synced_at"
+
+def is_current(cache_key, synced_at):
+    """Whether results synced at `synced_at` are the ones in the shared cache.
+
+    Every full audit and refresh records its synced_at under a small Redis
+    key, so a worker notices when another worker has moved the data on.
+    Without Redis there is a single process and its own data is current.
+    """
+    shared = get_cached_data(_synced_at_key(cache_key))
+    return not shared or shared == synced_at
+
+def publish_health_data(cache_key, health_data, ttl=PROSPECT_CACHE_TTL):
+    """Store full results in Redis (or the memory fallback) for every worker"""
+    if set_cached_data(cache_key, health_data, ttl=ttl):
+        set_cached_data(_synced_at_key(cache_key), health_data.get('synced_at'), ttl=ttl)
+        return True
+    _memory_cache[cache_key] = health_data
+    return False
+
+def get_memory_health(cache_key):
+    """Results kept in the memory fallback, until their full audit expires"""
+    health_data = _memory_cache.get(cache_key)
+    if health_data and health_data.get('expires_at', float('inf')) <= time.time():
+        _memory_cache.pop(cache_key, None)
+        return None
+    return health_data
+
+def _evict_audit_states():
+    # Caller holds _state_lock
+    now = time.time()
+    for key in [key for key, entry in _audit_states.items() if entry[1] <= now]:
+        del _audit_states[key]
+    while len(_audit_states) > MAX_AUDIT_STATES:
+        del _audit_states[next(iter(_audit_states))]
+
+def get_audit_state(cache_key):
+    """Unexpired incremental state for a cache key, if it is still current"""
+    with _state_lock:
+        _evict_audit_states()
+        entry = _audit_states.get(cache_key)
+    if entry is None:
+        return None
+    if not is_current(cache_key, entry[0].synced_at):
+        # Another worker refreshed or re-audited; its results are in Redis
+        drop_audit_state(cache_key)
+        return None
+    return entry[0]
+
+def put_audit_state(cache_key, state):
+    """Keep an incremental state until its full audit expires (state.expires_at)"""
+    with _state_lock:
+        _audit_states.pop(cache_key, None)
+        _audit_states[cache_key] = (state, state.expires_at)
+        _evict_audit_states()
+
+def drop_audit_state(cache_key):
+    """Forget a cache key's incremental state and the tab lists built from it"""
+    with _state_lock:
+        _audit_states.pop(cache_key, None)
+    _tab_cache.pop(cache_key, None)
+
+def get_health_data(cache_key):
+    """Full health results, from the incremental state once a refresh has run"""
+    state = get_audit_state(cache_key)
+    if state is not None:
+        return state.results()
+    return get_cached_data(cache_key) or get_memory_health(cache_key)
+
 def get_or_create_tab_cache(cache_key):
     """Get or create cached tab data for instant loading"""
-    if cache_key in _tab_cache:
-        return _tab_cache[cache_key]
+    tab_data = _tab_cache.get(cache_key)
+    if tab_data is not None and is_current(cache_key, tab_data['synced_at']):
+        return tab_data
     
     # Get main health data
-    cached_health = get_cached_data(cache_key)
-    if not cached_health:
-        cached_health = _memory_cache.get(cache_key)
-    
+    cached_health = get_health_data(cache_key)
     if not cached_health:
         return None
     
+    # Share one compact record per prospect across all tab lists
+    cached_health = compact_audit_results(cached_health)
+    
     # Pre-calculate all tab data
     all_prospects = cached_health.get('all_prospects', [])
     active_prospects = [p for p in all_prospects if p.get('lastActivityAt')]
@@ -41,16 +184,99 @@ def get_or_create_tab_cache(cache_key):
         'scoring_issues': cached_health.get('scoring_issues', {}).get('details', [])
     }
     
+    # Sort orders are built lazily per column and live as long as this version
+    tab_data['snapshot'] = ProspectSnapshot({name: tab_data[name] for name in _SORTABLE_TABS})
+    # View bitmaps are likewise built per predicate on first use
+    tab_data['bitmaps'] = ProspectBitmapIndex(all_prospects)
+    tab_data['synced_at'] = cached_health.get('synced_at')
+    
     # Cache for instant access
     _tab_cache[cache_key] = tab_data
     return tab_data
 
+def get_page_args():
+    """Read page, per_page, sort, order and cursor from the query string"""
+    order = request.args.get('order', 'asc')
+    if order not in ('asc', 'desc'):
+        raise ValueError("order must be 'asc' or 'desc'")
+    return (
+        int(request.args.get('page', 1)),
+        int(request.args.get('per_page', 10)),
+        request.args.get('sort') or None,
+        order,
+        request.args.get('cursor') or None
+    )
+
+def get_tab_page(cache_key, tab_name, page, per_page, sort=None, order='asc', cursor=None):
+    """Return (page rows, total, next cursor) for a tab from memory or a spill store"""
+    start = (page - 1) * per_page
+    # After a refresh, detail tabs page straight from the incremental state
+    state = get_audit_state(cache_key)
+    if state is not None and tab_name in _SPILL_RULES and not sort and not cursor:
+        rule_name = _SPILL_RULES[tab_name]
+        return state.page(rule_name, start, per_page), state.count(rule_name), None
+    
+    tab_data = get_or_create_tab_cache(cache_key)
+    if tab_data:
+        return tab_data['snapshot'].page(tab_name, sort, order, start, per_page, cursor)
+    
+    spilled = get_spill_store(cache_key)
+    if spilled and tab_name in _SPILL_RULES:
+        if sort or cursor:
+            raise ValueError("Sorting and cursors are not available for streaming audits")
+        store = spilled[1]
+        rule_name = _SPILL_RULES[tab_name]
+        return store.page(rule_name, start, per_page), store.count(rule_name), None
+    
+    return None
+
+def build_pagination(page, per_page, total, sort, order, next_cursor):
+    """Pagination block shared by the tab routes"""
+    return {
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "pages": (total + per_page - 1) // per_page,
+        "sort": sort,
+        "order": order,
+        "next_cursor": next_cursor
+    }
+
+def run_streaming_health(cache_key):
+    """Run a bounded-memory audit and keep its detail rows on disk"""
+    spilled = get_spill_store(cache_key)
+    if spilled:
+        return spilled[0]
+    
+    print(f"🌐 PROSPECT DATA: Streaming audit from API - Key: {cache_key}")
+    results = get_prospect_health_streaming(g.access_token)
+    response_data = {
+        "total_prospects": results["total_prospects"],
+        "active_prospects": results["active_prospects"],
+        "duplicate_count": results["duplicates"]["count"],
+        "inactive_count": results["inactive_prospects"]["count"],
+        "missing_fields_count": results["missing_fields"]["count"],
+        "scoring_issues_count": results["scoring_issues"]["count"],
+        "health_score": "Good" if results["duplicates"]["count"] == 0 else "Needs Attention"
+    }
+    put_spill_store(cache_key, response_data, results["store"])
+    return response_data
+
 @prospect_bp.route("/get-prospect-health", methods=["GET"])
 @require_auth
 def get_prospect_health_route():
     try:
         cache_key = f"prospects:{g.access_token[:20]}"
         
+        # Streaming mode keeps memory flat for very large databases
+        if request.args.get('mode') == 'streaming':
+            return jsonify(run_streaming_health(cache_key))
+        
+        # A refreshed incremental state is newer than the cached snapshot
+        state = get_audit_state(cache_key)
+        if state is not None:
+            return jsonify(state.summary())
+        
         # Check cache first
         cached_data = get_cached_data(cache_key)
         if cached_data:
@@ -89,14 +315,16 @@ def get_prospect_health_route():
             "health_score": "Good" if health_data.get("duplicates", {}).get("count", 0) == 0 else "Needs Attention"
         }
         
-        # Clear tab cache for fresh data
-        if cache_key in _tab_cache:
-            del _tab_cache[cache_key]
+        # Clear tab cache and any streaming results for fresh data
+        drop_audit_state(cache_key)
+        drop_spill_store(cache_key)
+        
+        # Refreshes of this audit are served until it expires, then it is re-run
+        health_data['expires_at'] = time.time() + PROSPECT_CACHE_TTL
         
         # Try Redis first, fallback to memory
-        cache_success = set_cached_data(cache_key, health_data, ttl=1800)
+        cache_success = publish_health_data(cache_key, health_data)
         if not cache_success:
-            _memory_cache[cache_key] = health_data
             print(f"💾 PROSPECT DATA: Stored in memory cache - Key: {cache_key}")
         else:
             print(f"💾 PROSPECT DATA: Cached for 30 minutes - Key: {cache_key}")
@@ -105,9 +333,73 @@ def get_prospect_health_route():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@prospect_bp.route("/refresh-prospect-health", methods=["POST"])
+@require_auth
+def refresh_prospect_health_route():
+    try:
+        cache_key = f"prospects:{g.access_token[:20]}"
+        
+        # Build the incremental state once from the cached snapshot
+        state = get_audit_state(cache_key)
+        if state is None:
+            cached_health = get_cached_data(cache_key) or get_memory_health(cache_key)
+            expires_at = (cached_health or {}).get('expires_at') or time.time() + PROSPECT_CACHE_TTL
+            if not cached_health or not cached_health.get('synced_at') or expires_at <= time.time():
+                return jsonify({"error": "Please run prospect health analysis first"}), 400
+            state = IncrementalAuditState()
+            state.load(ProspectRecord.from_dict(p) for p in cached_health.get('all_prospects', []))
+            state.synced_at = cached_health['synced_at']
+            state.expires_at = expires_at
+            put_audit_state(cache_key, state)
+        
+        print(f"🔄 PROSPECT DATA: Incremental refresh since {state.synced_at} - Key: {cache_key}")
+        refreshed = refresh_prospect_health(g.access_token, state, state.synced_at)
+        
+        # Other workers read the refreshed results from the shared cache; the
+        # entry keeps the full audit's expiry so a fresh audit still runs then
+        ttl = int(state.expires_at - time.time())
+        if ttl > 0:
+            publish_health_data(cache_key, {**state.results(), 'expires_at': state.expires_at}, ttl=ttl)
+        
+        # Full tab lists are rebuilt from the state only if a route needs them
+        _tab_cache.pop(cache_key, None)
+        
+        return jsonify({
+            **state.summary(),
+            "changed_prospects": refreshed["changed_prospects"],
+            "synced_at": refreshed["synced_at"]
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @prospect_bp.route("/get-duplicate-prospects", methods=["GET"])
 @require_auth
 def get_duplicate_prospects():
+    try:
+        page, per_page, sort, order, cursor = get_page_args()
+        cache_key = f"prospects:{g.access_token[:20]}"
+        
+        tab_page = get_tab_page(cache_key, 'duplicates', page, per_page, sort, order, cursor)
+        if tab_page is None:
+            return jsonify({"error": "Please run prospect health analysis first"}), 400
+        
+        duplicates, total, next_cursor = tab_page
+        
+        return jsonify({
+            "total_duplicate_groups": total,
+            "duplicate_prospects": duplicates,
+            "pagination": build_pagination(page, per_page, total, sort, order, next_cursor)
+        })
+    except StaleCursorError as e:
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@prospect_bp.route("/get-fuzzy-duplicate-prospects", methods=["GET"])
+@require_auth
+def get_fuzzy_duplicate_prospects():
     try:
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 10))
@@ -117,7 +409,11 @@ def get_duplicate_prospects():
         if not tab_data:
             return jsonify({"error": "Please run prospect health analysis first"}), 400
         
-        duplicates = tab_data['duplicates']
+        # Computed on first request and kept with the other tab data
+        if 'fuzzy_duplicates' not in tab_data:
+            tab_data['fuzzy_duplicates'] = find_fuzzy_duplicate_prospects(tab_data['all_prospects'])
+        
+        duplicates = tab_data['fuzzy_duplicates']
         total = len(duplicates)
         start = (page - 1) * per_page
         
@@ -138,28 +434,24 @@ def get_duplicate_prospects():
 @require_auth
 def get_inactive_prospects():
     try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10))
+        page, per_page, sort, order, cursor = get_page_args()
         cache_key = f"prospects:{g.access_token[:20]}"
         
-        tab_data = get_or_create_tab_cache(cache_key)
-        if not tab_data:
+        tab_page = get_tab_page(cache_key, 'inactive', page, per_page, sort, order, cursor)
+        if tab_page is None:
             return jsonify({"error": "Please run prospect health analysis first"}), 400
         
-        prospects = tab_data['inactive']
-        total = len(prospects)
-        start = (page - 1) * per_page
+        prospects, total, next_cursor = tab_page
         
         return jsonify({
             "total_inactive": total,
-            "inactive_prospects": prospects[start:start + per_page],
-            "pagination": {
-                "page": page,
-                "per_page": per_page,
-                "total": total,
-                "pages": (total + per_page - 1) // per_page
-            }
+            "inactive_prospects": prospects,
+            "pagination": build_pagination(page, per_page, total, sort, order, next_cursor)
         })
+    except StaleCursorError as e:
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -167,28 +459,24 @@ def get_inactive_prospects():
 @require_auth
 def get_missing_fields_prospects():
     try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10))
+        page, per_page, sort, order, cursor = get_page_args()
         cache_key = f"prospects:{g.access_token[:20]}"
         
-        tab_data = get_or_create_tab_cache(cache_key)
-        if not tab_data:
+        tab_page = get_tab_page(cache_key, 'missing_fields', page, per_page, sort, order, cursor)
+        if tab_page is None:
             return jsonify({"error": "Please run prospect health analysis first"}), 400
         
-        prospects = tab_data['missing_fields']
-        total = len(prospects)
-        start = (page - 1) * per_page
+        prospects, total, next_cursor = tab_page
         
         return jsonify({
             "total_with_missing_fields": total,
-            "prospects_missing_fields": prospects[start:start + per_page],
-            "pagination": {
-                "page": page,
-                "per_page": per_page,
-                "total": total,
-                "pages": (total + per_page - 1) // per_page
-            }
+            "prospects_missing_fields": prospects,
+            "pagination": build_pagination(page, per_page, total, sort, order, next_cursor)
         })
+    except StaleCursorError as e:
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -196,28 +484,24 @@ def get_missing_fields_prospects():
 @require_auth
 def get_scoring_issues_prospects():
     try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10))
+        page, per_page, sort, order, cursor = get_page_args()
         cache_key = f"prospects:{g.access_token[:20]}"
         
-        tab_data = get_or_create_tab_cache(cache_key)
-        if not tab_data:
+        tab_page = get_tab_page(cache_key, 'scoring_issues', page, per_page, sort, order, cursor)
+        if tab_page is None:
             return jsonify({"error": "Please run prospect health analysis first"}), 400
         
-        prospects = tab_data['scoring_issues']
-        total = len(prospects)
-        start = (page - 1) * per_page
+        prospects, total, next_cursor = tab_page
         
         return jsonify({
             "total_scoring_issues": total,
-            "prospects_scoring_issues": prospects[start:start + per_page],
-            "pagination": {
-                "page": page,
-                "per_page": per_page,
-                "total": total,
-                "pages": (total + per_page - 1) // per_page
-            }
+            "prospects_scoring_issues": prospects,
+            "pagination": build_pagination(page, per_page, total, sort, order, next_cursor)
         })
+    except StaleCursorError as e:
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -225,28 +509,26 @@ def get_scoring_issues_prospects():
 @require_auth
 def get_all_prospects():
     try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10))
+        page, per_page, sort, order, cursor = get_page_args()
         cache_key = f"prospects:{g.access_token[:20]}"
         
         tab_data = get_or_create_tab_cache(cache_key)
         if not tab_data:
             return jsonify({"error": "Please run prospect health analysis first"}), 400
         
-        prospects = tab_data['all_prospects']
-        total = len(prospects)
-        start = (page - 1) * per_page
+        prospects, total, next_cursor = tab_data['snapshot'].page(
+            'all_prospects', sort, order, (page - 1) * per_page, per_page, cursor
+        )
         
         return jsonify({
             "total_prospects": total,
-            "all_prospects": prospects[start:start + per_page],
-            "pagination": {
-                "page": page,
-                "per_page": per_page,
-                "total": total,
-                "pages": (total + per_page - 1) // per_page
-            }
+            "all_prospects": prospects,
+            "pagination": build_pagination(page, per_page, total, sort, order, next_cursor)
         })
+    except StaleCursorError as e:
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -254,21 +536,54 @@ def get_all_prospects():
 @require_auth
 def get_active_prospects():
     try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10))
+        page, per_page, sort, order, cursor = get_page_args()
         cache_key = f"prospects:{g.access_token[:20]}"
         
         tab_data = get_or_create_tab_cache(cache_key)
         if not tab_data:
             return jsonify({"error": "Please run prospect health analysis first"}), 400
         
-        prospects = tab_data['active_prospects']
-        total = len(prospects)
-        start = (page - 1) * per_page
+        prospects, total, next_cursor = tab_data['snapshot'].page(
+            'active_prospects', sort, order, (page - 1) * per_page, per_page, cursor
+        )
         
         return jsonify({
             "total_active": total,
-            "active_prospects": prospects[start:start + per_page],
+            "active_prospects": prospects,
+            "pagination": build_pagination(page, per_page, total, sort, order, next_cursor)
+        })
+    except StaleCursorError as e:
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@prospect_bp.route("/search-prospects", methods=["GET"])
+@require_auth
+def search_prospects_route():
+    try:
+        query = (request.args.get('q') or '').strip()
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 10))
+        if not query:
+            return jsonify({"error": "Search query is required"}), 400
+        
+        cache_key = f"prospects:{g.access_token[:20]}"
+        tab_data = get_or_create_tab_cache(cache_key)
+        if not tab_data:
+            return jsonify({"error": "Please run prospect health analysis first"}), 400
+        
+        # Built on first search and kept with the other tab data for this version
+        if 'search' not in tab_data:
+            tab_data['search'] = ProspectSearchIndex(tab_data['all_prospects'])
+        
+        prospects, total = tab_data['search'].search(query, (page - 1) * per_page, per_page)
+        
+        return jsonify({
+            "query": query,
+            "total_matches": total,
+            "prospects": prospects,
             "pagination": {
                 "page": page,
                 "per_page": per_page,
@@ -279,6 +594,42 @@ def get_active_prospects():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@prospect_bp.route("/prospect-facets", methods=["GET"])
+@require_auth
+def prospect_facets_route():
+    try:
+        view = request.args.get('view', 'all_prospects')
+        date_field = request.args.get('date_field', 'last_activity')
+        cache_key = f"prospects:{g.access_token[:20]}"
+        
+        tab_data = get_or_create_tab_cache(cache_key)
+        if not tab_data:
+            return jsonify({"error": "Please run prospect health analysis first"}), 400
+        
+        # Counts are popcounts over the version's bitmaps; date presets are
+        # relative to now, resolved to the second like /filter-prospects so
+        # a facet count always equals the filtered total it leads to
+        now = datetime.now().replace(microsecond=0)
+        facets_cache = tab_data.setdefault('facets', {})
+        cached = facets_cache.get((view, date_field))
+        if cached and cached[0] == now:
+            facets = cached[1]
+        else:
+            facets = facet_counts(tab_data['bitmaps'], view, date_field, now)
+            facets_cache[(view, date_field)] = (now, facets)
+        
+        return jsonify({
+            "total_prospects": len(tab_data['all_prospects']),
+            "view": view,
+            "date_field": date_field,
+            "views": facets['views'],
+            "date_ranges": facets['date_ranges']
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @prospect_bp.route("/filter-prospects", methods=["POST"])
 @require_auth
 def filter_prospects_route():
@@ -297,16 +648,16 @@ def filter_prospects_route():
         if not prospects:
             return jsonify({"error": "No prospect data available"}), 400
         
-        filtered_prospects = apply_filters(prospects, filters)
-        
-        # Apply pagination
-        total = len(filtered_prospects)
+        # The compiled plan combines precomputed bitmaps; only the page is materialized
+        index = tab_data['bitmaps']
+        bitmap = filter_bitmap(index, filters)
+        total = index.count(bitmap)
         start = (page - 1) * per_page
         
         return jsonify({
             "total_prospects": len(prospects),
             "filtered_count": total,
-            "prospects": filtered_prospects[start:start + per_page],
+            "prospects": index.rows(bitmap, start, per_page),
             "filters_applied": filters,
             "pagination": {
                 "page": page,
@@ -315,125 +666,14 @@ def filter_prospects_route():
                 "pages": (total + per_page - 1) // per_page
             }
         })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-def apply_filters(prospects, filters):
-    filtered = prospects
-    
-    # Apply view filter
-    view = filters.get('view', 'all_prospects')
-    if view == 'active_prospects':
-        filtered = [p for p in filtered if p.get('lastActivityAt')]
-    elif view == 'never_active_prospects':
-        filtered = [p for p in filtered if not p.get('lastActivityAt')]
-    elif view == 'assigned_prospects':
-        filtered = [p for p in filtered if p.get('assignedToId')]
-    elif view == 'mailable_prospects':
-        filtered = [p for p in filtered if not p.get('isDoNotEmail') and not p.get('optedOut') and p.get('email')]
-    elif view == 'prospects_not_in_salesforce':
-        filtered = [p for p in filtered if not p.get('salesforceId')]
-    elif view == 'unassigned_prospects':
-        filtered = [p for p in filtered if not p.get('assignedToId')]
-    
-    # Apply date range filter
-    date_range = filters.get('date_range', 'all_time')
-    if date_range != 'all_time':
-        date_field = filters.get('date_field', 'last_activity')
-        filtered = apply_date_filter(filtered, date_field, date_range, filters)
-    
-    return filtered
-
-def apply_date_filter(prospects, date_field_key, date_range, filters):
-    date_field_mapping = {
-        'last_activity': 'lastActivityAt',
-        'created': 'createdAt',
-        'updated': 'updatedAt',
-        'first_assigned': 'firstAssignedAt'
-    }
-    
-    date_field = date_field_mapping.get(date_field_key, 'lastActivityAt')
-    now = datetime.now()
-    
-    # Calculate date ranges
-    if date_range == 'today':
-        start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = now
-    elif date_range == 'yesterday':
-        start_date = (now - timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = (now - timedelta(days=1)).replace(hour=23, minute=59, second=59, microsecond=999999)
-    elif date_range == 'last_7_days':
-        start_date = (now - timedelta(days=6)).replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = now
-    elif date_range == 'last_week':
-        days_since_sunday = (now.weekday() + 1) % 7
-        last_sunday = (now - timedelta(days=days_since_sunday + 7)).replace(hour=0, minute=0, second=0, microsecond=0)
-        last_saturday = (last_sunday + timedelta(days=6)).replace(hour=23, minute=59, second=59, microsecond=999999)
-        start_date = last_sunday
-        end_date = last_saturday
-    elif date_range == 'this_month':
-        start_date = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        end_date = now
-    elif date_range == 'last_month':
-        first_day_this_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        last_day_last_month = first_day_this_month - timedelta(days=1)
-        start_date = last_day_last_month.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        end_date = last_day_last_month.replace(hour=23, minute=59, second=59, microsecond=999999)
-    elif date_range == 'this_quarter':
-        quarter = (now.month - 1) // 3 + 1
-        start_date = now.replace(month=(quarter - 1) * 3 + 1, day=1, hour=0, minute=0, second=0, microsecond=0)
-        end_date = now
-    elif date_range == 'last_quarter':
-        quarter = (now.month - 1) // 3 + 1
-        if quarter == 1:
-            start_date = now.replace(year=now.year - 1, month=10, day=1, hour=0, minute=0, second=0, microsecond=0)
-            end_date = now.replace(year=now.year - 1, month=12, day=31, hour=23, minute=59, second=59, microsecond=999999)
-        else:
-            start_month = (quarter - 2) * 3 + 1
-            start_date = now.replace(month=start_month, day=1, hour=0, minute=0, second=0, microsecond=0)
-            end_month = start_month + 2
-            if end_month == 12:
-                end_date = now.replace(month=12, day=31, hour=23, minute=59, second=59, microsecond=999999)
-            else:
-                next_month = now.replace(month=end_month + 1, day=1)
-                end_date = (next_month - timedelta(days=1)).replace(hour=23, minute=59, second=59, microsecond=999999)
-    elif date_range == 'this_year':
-        start_date = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-        end_date = now
-    elif date_range == 'last_year':
-        start_date = now.replace(year=now.year - 1, month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-        end_date = now.replace(year=now.year - 1, month=12, day=31, hour=23, minute=59, second=59, microsecond=999999)
-    elif date_range == 'custom':
-        start_date_str = filters.get('start_date')
-        end_date_str = filters.get('end_date')
-        if start_date_str and end_date_str:
-            start_date = datetime.fromisoformat(start_date_str).replace(hour=0, minute=0, second=0, microsecond=0)
-            end_date = datetime.fromisoformat(end_date_str).replace(hour=23, minute=59, second=59, microsecond=999999)
-        else:
-            return prospects
-    else:
-        return prospects
-    
-    # Filter prospects by date
-    filtered = []
-    for prospect in prospects:
-        field_value = prospect.get(date_field)
-        if not field_value:
-            continue
-        
-        try:
-            if 'T' in str(field_value):
-                field_date = datetime.fromisoformat(str(field_value).replace('Z', '+00:00'))
-            else:
-                field_date = datetime.fromisoformat(str(field_value)[:10])
-            
-            field_date = field_date.replace(tzinfo=None)
-            if start_date <= field_date <= end_date:
-                filtered.append(prospect)
-        except:
-            continue
-    
-    return filtered
+def apply_filters(prospects, filters, index=None):
+    """Filter prospects through the shared compiled filter engine"""
+    return run_filter(prospects, filters, index)
 
 @prospect_bp.route("/export-prospects", methods=["POST"])
 @require_auth
@@ -443,10 +683,7 @@ def export_prospects():
         export_type = data.get('type', 'all')
         
         cache_key = f"prospects:{g.access_token[:20]}"
-        cached_health = get_cached_data(cache_key)
-        if not cached_health:
-            cached_health = _memory_cache.get(cache_key)
-        
+        cached_health = get_health_data(cache_key)
         if not cached_health:
             return jsonify({"error": "Please run prospect health analysis first"}), 400
         
@@ -493,4 +730,76 @@ def export_prospects():
             "type": export_type
         })
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+@prospect_bp.route("/export-prospects/stream", methods=["GET"])
+@require_auth
+def stream_export_prospects():
+    try:
+        export_type = request.args.get('type', 'all')
+        export_format = request.args.get('format', 'ndjson')
+        compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({"error": f"Unsupported export format: {export_format}"}), 400
+        if export_type != 'all' and export_type not in EXPORT_SECTIONS:
+            return jsonify({"error": f"Unsupported export type: {export_type}"}), 400
+        
+        cache_key = f"prospects:{g.access_token[:20]}"
+        section_names = list(EXPORT_SECTIONS) if export_type == 'all' else [export_type]
+        
+        # Rows are read lazily from the tab cache or a streaming audit's spill
+        # store, so only one chunk is serialized at a time
+        tab_data = get_or_create_tab_cache(cache_key)
+        spilled = get_spill_store(cache_key)
+        if tab_data:
+            sections = [(name, iter_section_rows(tab_data[EXPORT_SECTIONS[name]], name)) for name in section_names]
+        elif spilled:
+            store = spilled[1]
+            sections = [(name, iter_section_rows(store.iter_details(_SPILL_RULES[name]), name))
+                        for name in section_names if name in _SPILL_RULES]
+        else:
+            return jsonify({"error": "Please run prospect health analysis first"}), 400
+        if not sections:
+            return jsonify({"error": "Full prospect lists are not kept for streaming audits"}), 400
+        
+        chunks = stream_export(sections, export_format, compress)
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        filename = f"prospects_{export_type}.{extension}"
+        if compress:
+            mimetype, filename = 'application/gzip', filename + '.gz'
+        
+        return Response(chunks, mimetype=mimetype, headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "X-Accel-Buffering": "no"
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@prospect_bp.route("/export-prospects/columnar", methods=["GET"])
+@require_auth
+def columnar_export_prospects():
+    try:
+        export_type = request.args.get('type', 'all')
+        export_format = request.args.get('format', 'parquet')
+        if not columnar_available():
+            return jsonify({"error": "Columnar export requires pyarrow to be installed"}), 501
+        if export_format not in COLUMNAR_FORMATS:
+            return jsonify({"error": f"Unsupported export format: {export_format}"}), 400
+        if export_type != 'all' and export_type not in EXPORT_SECTIONS:
+            return jsonify({"error": f"Unsupported export type: {export_type}"}), 400
+        
+        cache_key = f"prospects:{g.access_token[:20]}"
+        tab_data = get_or_create_tab_cache(cache_key)
+        if not tab_data:
+            return jsonify({"error": "Please run prospect health analysis first"}), 400
+        
+        # Columns are read directly from the cached records and detail rows
+        section_names = list(EXPORT_SECTIONS) if export_type == 'all' else [export_type]
+        sections = [(name, tab_data[EXPORT_SECTIONS[name]]) for name in section_names]
+        buffer, mimetype, extension = export_columnar(sections, export_format)
+        
+        return send_file(buffer, as_attachment=True, download_name=f"prospects_{export_type}.{extension}", mimetype=mimetype)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -1,68 +1,52 @@
 import requests
 from concurrent.futures import ThreadPoolExecutor
-from collections import defaultdict
 from datetime import datetime, timedelta
-from config.settings import BUSINESS_UNIT_ID
+from config.settings import BUSINESS_UNIT_ID, LANDING_PAGE_METADATA_TTL
+from cache import get_cached_data, set_cached_data
+from services.activity_store import CREATED_AT_FORMAT, LAKE_STREAM, sync_activity_lake
 import json
 import os
 
-def fetch_all_activities(headers, created_after=None, created_before=None):
-    """Fetch all landing page activities with optional date filtering"""
-    all_activities = []
-    limit = 200
-    offset = 0
-    
-    while True:
-        params = {
-            "format": "json",
-            "limit": limit,
-            "offset": offset,
-            "sort_by": "created_at",
-            "sort_order": "descending",
-            "landing_page_only": "true"
-        }
-        
-        # Add date filters if provided
-        if created_after:
-            params["created_after"] = created_after
-        if created_before:
-            params["created_before"] = created_before
-        
-        response = requests.get(
-            "https://pi.pardot.com/api/visitorActivity/version/4/do/query",
-            headers=headers,
-            params=params
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            activities = data.get("result", {}).get("visitor_activity", [])
-            if activities:
-                all_activities.extend(activities)
-                offset += limit
-            else:
-                break
-        else:
-            print(f"Error fetching activities: {response.status_code} - {response.text}")
-            break
-    
-    return all_activities
+# Activity types: 2=View, 4=Success (Form Submission), 1,6=Clicks. One
+# grouped pass computes, per landing page: views, submissions, clicks, total
+# activities, activities after the recent cutoff and the latest created_at
+_TYPE = "COALESCE(CAST(type AS INTEGER), 0)"
+LANDING_PAGE_TOTALS = (
+    f"SUM({_TYPE} = 2)",
+    f"SUM({_TYPE} = 4)",
+    f"SUM({_TYPE} IN (1, 6))",
+    "COUNT(*)",
+    "SUM(COALESCE(created_at, '') > ?)",
+    "MAX(created_at)",
+)
+
+# Landing pages with activity in this many days are active
+ACTIVE_DAYS = 90
+
+# Landing page metadata fields fetched from the v5 API
+LANDING_PAGE_FIELDS = "id,name,url,vanityUrl,formId,isDeleted,createdAt"
+
 
-def calculate_landing_page_stats(page, activities_by_page):
-    """Calculate statistics for a single landing page"""
+def aggregate_landing_page_activity(store, created_after=None, created_before=None):
+    """{landing page id: [views, submissions, clicks, total, recent, last activity]} from the activity lake"""
+    recent_since = (datetime.now() - timedelta(days=ACTIVE_DAYS)).strftime(CREATED_AT_FORMAT)
+    totals = {}
+    for landing_page_id, *row in store.aggregate(
+        LAKE_STREAM, 'landing_page_id', LANDING_PAGE_TOTALS, created_after, created_before,
+        present=('landing_page_id',), params=(recent_since,)
+    ):
+        # A page id stored both as a number and as text comes back as two groups
+        merged = totals.setdefault(str(landing_page_id), [0, 0, 0, 0, 0, None])
+        for column in range(5):
+            merged[column] += row[column]
+        if row[5] and (merged[5] is None or row[5] > merged[5]):
+            merged[5] = row[5]
+    return totals
+
+def landing_page_stats(page, totals):
+    """Statistics for a single landing page from its aggregated activity totals"""
     page_id = str(page["id"])
-    page_activities = activities_by_page.get(page_id, [])
-    
-    # Activity types: 2=View, 4=Success (Form Submission), 1,6=Clicks
-    views = [a for a in page_activities if int(a.get("type", 0)) == 2]
-    submissions = [a for a in page_activities if int(a.get("type", 0)) == 4]
-    clicks = [a for a in page_activities if int(a.get("type", 0)) in [1, 6]]
-    
-    # Check if landing page is active (has activity in last 3 months)
-    three_months_ago = datetime.now() - timedelta(days=90)
-    recent_activities = [a for a in page_activities if a.get("created_at") and 
-                        datetime.fromisoformat(a["created_at"].replace('Z', '+00:00')) > three_months_ago]
-    is_active = len(recent_activities) > 0
+    views, submissions, clicks, total_activities, recent_activities, last_activity = totals.get(page_id, (0, 0, 0, 0, 0, None))
     
     return {
         "id": page_id,
@@ -70,15 +54,53 @@ def calculate_landing_page_stats(page, activities_by_page):
         "created_at": page.get("createdAt"),
         "url": page.get("url") or page.get("vanityUrl") or "No URL",
         "form_id": page.get("formId"),
-        "views": len(views),
-        "submissions": len(submissions),
-        "clicks": len(clicks),
-        "total_activities": len(page_activities),
-        "recent_activities": len(recent_activities),
-        "is_active": is_active,
-        "last_activity": max([a.get("created_at") for a in page_activities], default=None) if page_activities else None
+        "views": views,
+        "submissions": submissions,
+        "clicks": clicks,
+        "total_activities": total_activities,
+        "recent_activities": recent_activities,
+        "is_active": recent_activities > 0,
+        "last_activity": last_activity
     }
 
+def iter_landing_page_batches(headers):
+    """Yield pages of landing page metadata from the v5 API, following nextPageToken"""
+    next_page_token = None
+    while True:
+        params = {"fields": LANDING_PAGE_FIELDS}
+        if next_page_token:
+            # For pagination, only use nextPageToken
+            params["nextPageToken"] = next_page_token
+        else:
+            params["limit"] = 200
+        
+        response = requests.get(
+            "https://pi.pardot.com/api/v5/objects/landing-pages",
+            headers=headers,
+            params=params
+        )
+        # A missing page would silently drop landing pages, so fail instead
+        if response.status_code != 200:
+            raise Exception(f"Error fetching landing pages: {response.text}")
+        
+        data = response.json()
+        values = data.get("values", [])
+        yield values
+        next_page_token = data.get("nextPageToken")
+        if not next_page_token or not values:
+            break
+
+def get_landing_pages(headers):
+    """Non-deleted landing pages, cached per business unit for LANDING_PAGE_METADATA_TTL"""
+    cache_key = f"landing_page_metadata:{BUSINESS_UNIT_ID}"
+    pages = get_cached_data(cache_key)
+    if pages is None:
+        pages = []
+        for batch in iter_landing_page_batches(headers):
+            pages.extend(page for page in batch if not page.get('isDeleted'))
+        set_cached_data(cache_key, pages, ttl=LANDING_PAGE_METADATA_TTL)
+    return pages
+
 def get_landing_page_stats(access_token, created_after=None, created_before=None):
     """Get landing page statistics with optional date filtering"""
     try:
@@ -89,39 +111,19 @@ def get_landing_page_stats(access_token, created_after=None, created_before=None
         
         print("Fetching landing pages and activities...")
         
+        # Landing page metadata is paged in while the activity lake syncs
         with ThreadPoolExecutor(max_workers=2) as executor:
-            pages_future = executor.submit(
-                requests.get,
-                "https://pi.pardot.com/api/v5/objects/landing-pages",
-                headers=headers,
-                params={"fields": "id,name,url,vanityUrl,formId,isDeleted,createdAt", "limit": 200}
-            )
-            activities_future = executor.submit(fetch_all_activities, headers, created_after, created_before)
-            
-            pages_response = pages_future.result()
-            activities = activities_future.result()
+            pages_future = executor.submit(get_landing_pages, headers)
+            store = executor.submit(sync_activity_lake, headers).result()
+            pages = pages_future.result()
         
-        if pages_response.status_code != 200:
-            raise Exception(f"Error fetching landing pages: {pages_response.text}")
-        
-        pages = pages_response.json().get("values", [])
-        # Filter out deleted pages
-        pages = [p for p in pages if not p.get('isDeleted')]
+        # Per-page totals in one grouped pass over the lake
+        totals = aggregate_landing_page_activity(store, created_after, created_before)
         
         print(f"Found {len(pages)} active landing pages")
-        print(f"Found {len(activities)} visitor activities")
-        
-        # Group activities by landing page ID
-        activities_by_page = defaultdict(list)
-        for activity in activities:
-            page_id = str(activity.get("landing_page_id", "")) or str(activity.get("landing_page", {}).get("id", ""))
-            if page_id:
-                activities_by_page[page_id].append(activity)
+        print(f"Found activity for {len(totals)} landing pages")
         
-        # Calculate stats for each landing page
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            futures = [executor.submit(calculate_landing_page_stats, page, activities_by_page) for page in pages]
-            page_stats = [future.result() for future in futures]
+        page_stats = [landing_page_stats(page, totals) for page in pages]
         
         # Filter out pages with no activities if date filters are applied
         if created_after or created_before:
@@ -0,0 +1,326 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import requests
+from config.settings import ACTIVITY_STORE_PATH, BUSINESS_UNIT_ID
+
+# Pardot's created_at format; it sorts correctly as a string
+CREATED_AT_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Delta fetches start this far before the watermark so activities that were
+# committed late upstream are not missed; the overlap is deduped by id
+WATERMARK_OVERLAP_SECONDS = 300
+
+# A stream fetched more recently than this is served from the store as is
+MIN_SYNC_INTERVAL_SECONDS = 60
+
+# Activity fields kept locally
+ACTIVITY_FIELDS = (
+    'id', 'prospect_id', 'visitor_id', 'type', 'type_name', 'details',
+    'email_id', 'list_email_id', 'campaign_id', 'created_at',
+    'form_id', 'landing_page_id'
+)
+
+# Stream holding every visitor activity type; the form, landing page and
+# email services all read it instead of crawling their own filtered copies
+LAKE_STREAM = 'lake'
+
+# Lake columns with their own index, each followed by the partition key
+INDEXED_FIELDS = ('type', 'form_id', 'landing_page_id', 'list_email_id', 'prospect_id')
+
+INSERT_BATCH_ROWS = 5000
+
+# Ids per statement when checking which fetched activities are already stored
+LOOKUP_BATCH = 500
+
+
+def _activity_key(activity):
+    # Pardot activity id; activities without one are keyed by their content
+    activity_id = activity.get('id')
+    if activity_id is not None:
+        return str(activity_id)
+    return ':'.join(str(activity.get(field)) for field in ('created_at', 'type', 'list_email_id', 'visitor_id', 'prospect_id'))
+
+def _day(created_at):
+    # Day partition of an activity; undated activities share the '' partition
+    return created_at[:10] if created_at else ''
+
+def created_at_bound(value):
+    """A date filter ('2024-01-31', ISO 8601 with T or Z) in created_at format, for comparisons"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).strftime(CREATED_AT_FORMAT)
+    except ValueError:
+        return value
+
+def _overlap_start(watermark):
+    try:
+        start = datetime.strptime(watermark, CREATED_AT_FORMAT) - timedelta(seconds=WATERMARK_OVERLAP_SECONDS)
+    except (TypeError, ValueError):
+        return None
+    return start.strftime(CREATED_AT_FORMAT)
+
+
+def iter_all_activity_pages(headers, created_after=None):
+    """Yield pages of visitor activities of every type, oldest first; raises if a page fails"""
+    offset = 0
+    limit = 200
+    while True:
+        params = {
+            "format": "json",
+            "limit": limit,
+            "offset": offset,
+            "sort_by": "created_at",
+            "sort_order": "ascending"
+        }
+        if created_after:
+            params["created_after"] = created_after
+
+        response = requests.get(
+            "https://pi.pardot.com/api/visitorActivity/version/4/do/query",
+            headers=headers,
+            params=params
+        )
+        if response.status_code != 200:
+            # Raised so the sync stops without marking the crawl complete
+            raise Exception(f"Error fetching activities: {response.status_code} - {response.text}")
+        activities = response.json().get("result", {}).get("visitor_activity", [])
+        # A single result comes back as an object rather than a list
+        if isinstance(activities, dict):
+            activities = [activities]
+        if not activities:
+            break
+        yield activities
+        offset += limit
+
+
+class ActivityStore:
+    """Local SQLite copy of visitor activity streams, one set of rows per business unit.
+
+    Each stream has a created_at watermark. A sync fetches only activities
+    created after the watermark (minus a small overlap) and inserts them by
+    activity id, so re-fetched rows are ignored. Rows carry their day as
+    the partition key; day ranges and the indexed lookups (type, form,
+    landing page, list email, prospect) stay within the days asked for.
+    """
+    def __init__(self, path=None, business_unit=None):
+        self.path = path or ACTIVITY_STORE_PATH
+        self.business_unit = business_unit or BUSINESS_UNIT_ID or ''
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        # Request threads share one connection; writes and syncs hold the lock
+        self._lock = threading.Lock()
+        self._sync_locks = {}
+        self._listeners = {}
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        columns = ', '.join(field for field in ACTIVITY_FIELDS if field not in ('id', 'created_at'))
+        self._conn.executescript(f'''
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS activities (
+                business_unit TEXT NOT NULL, stream TEXT NOT NULL, id TEXT NOT NULL,
+                created_at TEXT, day TEXT, {columns},
+                PRIMARY KEY (business_unit, stream, id)
+            );
+            CREATE TABLE IF NOT EXISTS watermarks (
+                business_unit TEXT NOT NULL, stream TEXT NOT NULL,
+                created_at TEXT, synced_at REAL,
+                PRIMARY KEY (business_unit, stream)
+            );
+        ''')
+        # type and created_at make each index covering for counts grouped by its field
+        indexes = ''.join(
+            f'CREATE INDEX IF NOT EXISTS activities_by_{field} ON activities (business_unit, stream, {field}, day, type, created_at);'
+            for field in INDEXED_FIELDS
+        )
+        self._conn.executescript(f'''
+            CREATE INDEX IF NOT EXISTS activities_created ON activities (business_unit, stream, created_at);
+            CREATE INDEX IF NOT EXISTS activities_day ON activities (business_unit, stream, day, created_at);
+            {indexes}
+        ''')
+
+    @contextmanager
+    def transaction(self):
+        """The store's connection, locked and inside a transaction"""
+        with self._lock, self._conn:
+            yield self._conn
+
+    def add_listener(self, stream, callback):
+        """Call callback(conn, activities) with the new rows of every page a sync stores.
+
+        The callback runs inside the page's transaction on the given
+        connection (the store lock is held, so it must not call transaction()).
+        If it raises, the page is rolled back and the sync stops there.
+        """
+        with self._lock:
+            self._listeners.setdefault(stream, []).append(callback)
+
+    def watermark(self, stream):
+        """Return (latest created_at stored, last sync time) for a stream"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT created_at, synced_at FROM watermarks WHERE business_unit = ? AND stream = ?',
+                (self.business_unit, stream)
+            ).fetchone()
+        return row if row else (None, None)
+
+    def _insert(self, conn, stream, activities):
+        # Insert on the caller's connection; returns the activities that were not stored yet
+        keyed = {_activity_key(a): a for a in activities}
+        keys = list(keyed)
+        for start in range(0, len(keys), LOOKUP_BATCH):
+            batch = keys[start:start + LOOKUP_BATCH]
+            for (key,) in conn.execute(
+                f"SELECT id FROM activities WHERE business_unit = ? AND stream = ? AND id IN ({', '.join('?' * len(batch))})",
+                [self.business_unit, stream] + batch
+            ):
+                del keyed[key]
+        placeholders = ', '.join('?' * (len(ACTIVITY_FIELDS) + 3))
+        columns = ', '.join(('business_unit', 'stream', 'day') + ACTIVITY_FIELDS)
+        rows = [
+            (self.business_unit, stream, _day(a.get('created_at')), key)
+            + tuple(a.get(field) for field in ACTIVITY_FIELDS[1:])
+            for key, a in keyed.items()
+        ]
+        for start in range(0, len(rows), INSERT_BATCH_ROWS):
+            conn.executemany(
+                f'INSERT INTO activities ({columns}) VALUES ({placeholders})',
+                rows[start:start + INSERT_BATCH_ROWS]
+            )
+        return list(keyed.values())
+
+    def add_activities(self, stream, activities):
+        """Insert activities, ignoring ids already stored; returns the number added"""
+        with self.transaction() as conn:
+            return len(self._insert(conn, stream, activities))
+
+    def _set_watermark(self, conn, stream, created_at, synced_at=None):
+        # Moves created_at forward only; synced_at is kept unless a new one is given
+        conn.execute(
+            'INSERT INTO watermarks (business_unit, stream, created_at, synced_at) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (business_unit, stream) DO UPDATE SET '
+            'created_at = MAX(COALESCE(watermarks.created_at, \'\'), COALESCE(excluded.created_at, \'\')), '
+            'synced_at = COALESCE(excluded.synced_at, watermarks.synced_at)',
+            (self.business_unit, stream, created_at, synced_at)
+        )
+
+    def sync(self, stream, fetch_pages, force=False):
+        """Fetch new activities for a stream and store them page by page.
+
+        `fetch_pages(created_after)` must yield pages of activities in
+        ascending created_at order (created_after is None for the first, full
+        fetch). Each page is one transaction: its new rows are inserted,
+        handed to the stream's listeners on the same connection, and the
+        watermark moves past them. A crawl that stops early, or a listener
+        that raises, leaves nothing stored beyond the watermark, and the
+        next sync resumes from there. The sync time is only stamped once a
+        crawl completes, so a failed one is retried on the next request.
+        """
+        with self._lock:
+            sync_lock = self._sync_locks.setdefault(stream, threading.Lock())
+            listeners = list(self._listeners.get(stream, ()))
+        with sync_lock:
+            watermark, synced_at = self.watermark(stream)
+            if not force and synced_at and time.time() - synced_at < MIN_SYNC_INTERVAL_SECONDS:
+                return 0
+            fetched = added = 0
+            try:
+                for page in fetch_pages(_overlap_start(watermark) if watermark else None):
+                    fetched += len(page)
+                    latest = max((a.get('created_at') for a in page if a.get('created_at')), default=None)
+                    with self.transaction() as conn:
+                        new = self._insert(conn, stream, page)
+                        if new:
+                            for callback in listeners:
+                                callback(conn, new)
+                        self._set_watermark(conn, stream, latest)
+                    added += len(new)
+            except Exception as e:
+                print(f"Error syncing {stream} activities: {str(e)}")
+                return added
+            with self.transaction() as conn:
+                self._set_watermark(conn, stream, None, time.time())
+            print(f"[DEBUG] Activity store: {stream} synced, {fetched} fetched, {added} stored")
+            return added
+
+    def _where(self, stream, created_after, created_before, types, present):
+        # WHERE clause and params shared by activities() and aggregate()
+        conditions = ['business_unit = ?', 'stream = ?']
+        params = [self.business_unit, stream]
+        created_after = created_at_bound(created_after)
+        created_before = created_at_bound(created_before)
+        if created_after:
+            # The day bound lets SQLite skip whole partitions
+            conditions += ['day >= ?', 'created_at > ?']
+            params += [_day(created_after), created_after]
+        if created_before:
+            # Undated activities ('' sorts first) fall outside every window
+            conditions += ['day > ?', 'day <= ?', 'created_at < ?']
+            params += ['', _day(created_before), created_before]
+        if types:
+            conditions.append(f"type IN ({', '.join('?' * len(types))})")
+            params += list(types)
+        conditions += [f'{field} IS NOT NULL' for field in present]
+        return ' AND '.join(conditions), params
+
+    def activities(self, stream, created_after=None, created_before=None, fields=ACTIVITY_FIELDS,
+                   types=None, present=()):
+        """Stored activities of a stream as dicts, optionally within a created_at window.
+
+        `types` limits the activity types and `present` names fields that
+        must be set (e.g. ('form_id',) for form activities).
+        """
+        where, params = self._where(stream, created_after, created_before, types, present)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {', '.join(fields)} FROM activities WHERE {where}", params).fetchall()
+        return [dict(zip(fields, row)) for row in rows]
+
+    def aggregate(self, stream, group_by, expressions, created_after=None, created_before=None,
+                  types=None, present=(), params=()):
+        """(group value, *expression values) rows of one GROUP BY pass over a stream.
+
+        `expressions` are SQL aggregates over the activity columns; `params`
+        fills their placeholders and comes before the filter parameters.
+        """
+        where, where_params = self._where(stream, created_after, created_before, types, present)
+        query = f"SELECT {group_by}, {', '.join(expressions)} FROM activities WHERE {where} GROUP BY {group_by}"
+        with self._lock:
+            return self._conn.execute(query, list(params) + where_params).fetchall()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+_store_listeners = []
+
+def on_store_created(factory):
+    """Call factory(store) for every store, now and as they are opened.
+
+    Indexes that follow the lake register here at import time, so they see
+    every sync whichever service triggers it.
+    """
+    with _stores_lock:
+        _store_listeners.append(factory)
+        stores = list(_stores.values())
+    for store in stores:
+        factory(store)
+
+def get_activity_store(business_unit=None):
+    """Process-wide store for a business unit"""
+    business_unit = business_unit or BUSINESS_UNIT_ID or ''
+    with _stores_lock:
+        store = _stores.get(business_unit)
+        if store is None:
+            store = _stores[business_unit] = ActivityStore(business_unit=business_unit)
+            for factory in _store_listeners:
+                factory(store)
+        return store
+
+def sync_activity_lake(headers, force=False):
+    """Bring the shared activity lake up to date with one delta crawl of every type"""
+    store = get_activity_store()
+    store.sync(LAKE_STREAM, lambda created_after: iter_all_activity_pages(headers, created_after), force=force)
+    return store
@@ -1,6 +1,8 @@
 import requests
 from datetime import datetime, timedelta, timezone
 from config.settings import BUSINESS_UNIT_ID
+from services.duplicate_detection import DuplicateDetector
+from services.prospect_dates import NO_TIMESTAMP, datetime_to_epoch, normalize_prospect_dates, prospect_timestamp
 
 def get_date_range_from_filter(filter_type):
     """Convert filter type to start and end dates"""
@@ -101,7 +103,7 @@ class DatabaseHealthAnalyzer:
         page_count = 0
         
         while page_count < max_pages:
-            params = {'fields': 'id,email,createdAt,updatedAt,isDoNotEmail,optedOut'}
+            params = {'fields': 'id,email,firstName,lastName,company,createdAt,updatedAt,isDoNotEmail,optedOut'}
             
             if next_page_token:
                 params['nextPageToken'] = next_page_token
@@ -116,7 +118,8 @@ class DatabaseHealthAnalyzer:
                     
                 data = response.json()
                 values = data.get('values', [])
-                all_prospects.extend(values)
+                # Parse timestamps once at ingestion for the date counters
+                all_prospects.extend(normalize_prospect_dates(p) for p in values)
                 print(f"Fetched {len(values)} prospect records (page {page_count + 1}, total: {len(all_prospects)})")
                 
                 next_page_token = data.get('nextPageToken')
@@ -132,16 +135,11 @@ class DatabaseHealthAnalyzer:
 
     def count_prospects_by_date(self, prospects, date_field, cutoff_date):
         """Count prospects by date field"""
+        cutoff_ts = datetime_to_epoch(cutoff_date)
         count = 0
         for prospect in prospects:
-            date_str = prospect.get(date_field)
-            if date_str:
-                try:
-                    prospect_date = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-                    if prospect_date >= cutoff_date:
-                        count += 1
-                except:
-                    continue
+            if prospect_timestamp(prospect, date_field) >= cutoff_ts:
+                count += 1
         return count
 
     def count_marketable_prospects(self, prospects):
@@ -160,6 +158,9 @@ class DatabaseHealthAnalyzer:
         inactive_12m = 0
         inactive_2y = 0
         unsubscribed = 0
+        six_months_ts = datetime_to_epoch(six_months_ago)
+        twelve_months_ts = datetime_to_epoch(twelve_months_ago)
+        two_years_ts = datetime_to_epoch(two_years_ago)
         
         for prospect in prospects:
             # Count unsubscribed
@@ -167,18 +168,14 @@ class DatabaseHealthAnalyzer:
                 unsubscribed += 1
             
             # Count inactive by periods
-            updated_str = prospect.get('updatedAt')
-            if updated_str:
-                try:
-                    updated_date = datetime.fromisoformat(updated_str.replace('Z', '+00:00'))
-                    if updated_date < two_years_ago:
-                        inactive_2y += 1
-                    elif updated_date < twelve_months_ago:
-                        inactive_12m += 1
-                    elif updated_date < six_months_ago:
-                        inactive_6m += 1
-                except:
-                    continue
+            updated_ts = prospect_timestamp(prospect, 'updatedAt')
+            if updated_ts != NO_TIMESTAMP:
+                if updated_ts < two_years_ts:
+                    inactive_2y += 1
+                elif updated_ts < twelve_months_ts:
+                    inactive_12m += 1
+                elif updated_ts < six_months_ts:
+                    inactive_6m += 1
         
         return {
             'inactive_leads': inactive_6m,
@@ -297,7 +294,7 @@ class DatabaseHealthAnalyzer:
             
             # 7. Get data quality metrics
             print("Analyzing data quality metrics...")
-            quality_metrics = self.analyze_data_quality()
+            quality_metrics = self.analyze_data_quality(all_prospects)
             
             # 8. Get scoring issues
             print("Analyzing lead scoring issues...")
@@ -566,7 +563,7 @@ class DatabaseHealthAnalyzer:
             # Return fallback data if API calls fail
             return self.get_fallback_stats()
     
-    def analyze_data_quality(self):
+    def analyze_data_quality(self, all_prospects=None):
         """Analyze data quality metrics by sampling prospects"""
         try:
             # Get a sample of prospects to analyze data quality
@@ -630,7 +627,7 @@ class DatabaseHealthAnalyzer:
             total_db = self.get_prospects_count()
             
             # Get duplicate count
-            duplicate_count = self.get_duplicate_prospects_count()
+            duplicate_count = self.get_duplicate_prospects_count(all_prospects)
             
             quality_table = [
                 {"metric": "Total Database", "count": total_db, "percentage": "–"},
@@ -732,27 +729,21 @@ class DatabaseHealthAnalyzer:
     
 
     
-    def get_duplicate_prospects_count(self):
-        """Estimate duplicate prospects by sampling"""
+    def get_duplicate_prospects_count(self, prospects=None):
+        """Count duplicate prospects with the blocking/LSH duplicate engine"""
         try:
-            sample_prospects = self.get_prospects_sample(1000)
-            if not sample_prospects:
+            if not prospects:
+                prospects = self.get_prospects_sample(1000)
+            if not prospects:
                 return 0
             
-            emails_seen = set()
-            duplicates = 0
-            
-            for prospect in sample_prospects:
-                email = (prospect.get('email') or '').lower().strip()
-                if email and email in emails_seen:
-                    duplicates += 1
-                elif email:
-                    emails_seen.add(email)
+            duplicates = DuplicateDetector().count_duplicates(prospects)
             
-            # Extrapolate to full database
+            # Only extrapolate when the fetched data is a subset of the database
             total_db = self.get_prospects_count()
-            estimated_duplicates = int((duplicates / len(sample_prospects)) * total_db)
-            return estimated_duplicates
+            if total_db > len(prospects):
+                return int((duplicates / len(prospects)) * total_db)
+            return duplicates
         except Exception as e:
             print(f"Error calculating duplicates: {str(e)}")
             return 0
@@ -0,0 +1,250 @@
+import re
+import zlib
+from collections import defaultdict
+
+# Mailbox providers whose domain says nothing about the prospect's company
+FREE_MAIL_DOMAINS = {
+    'gmail.com', 'googlemail.com', 'yahoo.com', 'hotmail.com', 'outlook.com',
+    'live.com', 'aol.com', 'icloud.com', 'me.com', 'msn.com', 'proton.me', 'protonmail.com'
+}
+
+# Providers that ignore dots in the local part of an address
+DOTLESS_DOMAINS = {'gmail.com', 'googlemail.com'}
+
+COMPANY_SUFFIXES = {
+    'inc', 'incorporated', 'llc', 'ltd', 'limited', 'corp', 'corporation',
+    'co', 'company', 'gmbh', 'plc', 'pvt', 'private', 'sa', 'ag', 'bv'
+}
+
+# MinHash/LSH parameters: BANDS * ROWS signature values per record. With
+# 8 bands of 4 rows, pairs with Jaccard similarity >= ~0.6 collide in at
+# least one band with probability > 0.5, and pairs below ~0.3 rarely do.
+LSH_BANDS = 8
+LSH_ROWS = 4
+_SIGNATURE_SIZE = LSH_BANDS * LSH_ROWS  # must be a power of two
+_BIN_SHIFT = 32 - (_SIGNATURE_SIZE.bit_length() - 1)
+_VALUE_MASK = (1 << _BIN_SHIFT) - 1
+_EMPTY_BIN = 1 << 32
+
+# Blocks larger than this are almost always junk keys ("info@", "test test")
+MAX_BLOCK_SIZE = 50
+
+# Minimum verification score for a fuzzy (non-email) match, and the name
+# similarity below which a pair is rejected regardless of company
+MATCH_THRESHOLD = 0.8
+NAME_THRESHOLD = 0.7
+
+_non_word = re.compile(r'[^a-z0-9 ]+')
+_spaces = re.compile(r'\s+')
+
+
+def canonicalize_email(email):
+    """Normalize case, whitespace, plus-addressing and provider dot rules"""
+    email = (email or '').strip().lower()
+    if '@' not in email or email == 'n/a':
+        return ''
+    local, _, domain = email.rpartition('@')
+    local = local.split('+', 1)[0]
+    if domain in DOTLESS_DOMAINS:
+        local = local.replace('.', '')
+        domain = 'gmail.com'
+    if not local or not domain:
+        return ''
+    return f"{local}@{domain}"
+
+def normalize_text(value):
+    """Lowercase, strip punctuation and collapse whitespace"""
+    value = _non_word.sub(' ', str(value or '').lower())
+    return _spaces.sub(' ', value).strip()
+
+def normalize_company(value):
+    """Normalized company name without legal suffixes"""
+    words = [w for w in normalize_text(value).split(' ') if w and w not in COMPANY_SUFFIXES]
+    return ' '.join(words)
+
+def email_domain(canonical_email):
+    """Company domain of an address, or '' for free-mail providers"""
+    domain = canonical_email.rpartition('@')[2]
+    return '' if domain in FREE_MAIL_DOMAINS else domain
+
+def _shingles(text, size=3):
+    text = f" {text} "
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+def minhash_signature(tokens):
+    """One-permutation MinHash signature: each token is hashed exactly once"""
+    signature = [_EMPTY_BIN] * _SIGNATURE_SIZE
+    for token in tokens:
+        # Multiplicative mixing spreads crc32 bits before splitting into bins
+        h = (zlib.crc32(token.encode('utf-8')) * 0x9E3779B1) & 0xFFFFFFFF
+        slot = h >> _BIN_SHIFT
+        value = h & _VALUE_MASK
+        if value < signature[slot]:
+            signature[slot] = value
+    # Densify: empty bins borrow the next non-empty bin's value, offset by
+    # distance, so sparse token sets still produce comparable signatures
+    if _EMPTY_BIN in signature and len(set(signature)) > 1:
+        filled = list(signature)
+        for slot in range(_SIGNATURE_SIZE):
+            distance = 1
+            while filled[slot] == _EMPTY_BIN:
+                borrowed = signature[(slot + distance) % _SIGNATURE_SIZE]
+                if borrowed != _EMPTY_BIN:
+                    filled[slot] = borrowed + distance * _EMPTY_BIN
+                distance += 1
+        signature = filled
+    return signature
+
+def jaccard(left, right):
+    """Jaccard similarity of two sets"""
+    if not left or not right:
+        return 0.0
+    shared = len(left & right)
+    return shared / (len(left) + len(right) - shared)
+
+
+class _DuplicateRecord:
+    __slots__ = ('index', 'email', 'name', 'company', 'domain', 'name_shingles', 'company_shingles')
+
+    def __init__(self, index, prospect):
+        self.index = index
+        self.email = canonicalize_email(prospect.get('email'))
+        self.name = normalize_text(f"{prospect.get('firstName') or ''} {prospect.get('lastName') or ''}")
+        self.company = normalize_company(prospect.get('company'))
+        self.domain = email_domain(self.email) if self.email else ''
+        self.name_shingles = _shingles(self.name) if self.name else set()
+        self.company_shingles = _shingles(self.company) if self.company else set()
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, x):
+        parent = self.parent
+        root = x
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while parent.get(x, x) != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            # Smaller index becomes the root so clusters keep scan order
+            if rb < ra:
+                ra, rb = rb, ra
+            self.parent[rb] = ra
+
+
+def score_pair(a, b):
+    """Verification score in [0, 1] and the reason two records match"""
+    if a.email and a.email == b.email:
+        return 1.0, 'email'
+    name_score = jaccard(a.name_shingles, b.name_shingles)
+    if name_score < NAME_THRESHOLD:
+        return 0.0, None
+    # A shared corporate domain counts as strongly as a matching company
+    company_score = jaccard(a.company_shingles, b.company_shingles)
+    if a.domain and a.domain == b.domain:
+        company_score = 1.0
+    return 0.6 * name_score + 0.4 * company_score, 'name_company'
+
+
+class DuplicateDetector:
+    """Blocking + MinHash/LSH candidate generation with scored verification"""
+    def __init__(self, threshold=MATCH_THRESHOLD, use_lsh=True):
+        self.threshold = threshold
+        self.use_lsh = use_lsh
+
+    def _blocks(self, records):
+        blocks = defaultdict(list)
+        for record in records:
+            if record.email:
+                blocks[('email', record.email)].append(record.index)
+            if record.name and record.company:
+                blocks[('name_company', record.name, record.company)].append(record.index)
+            if record.name and record.domain:
+                blocks[('name_domain', record.name, record.domain)].append(record.index)
+            if self.use_lsh and record.name and (record.company or record.domain):
+                tokens = record.name_shingles | (record.company_shingles or _shingles(record.domain))
+                signature = minhash_signature(tokens)
+                for band in range(LSH_BANDS):
+                    start = band * LSH_ROWS
+                    blocks[('lsh', band, tuple(signature[start:start + LSH_ROWS]))].append(record.index)
+        return blocks
+
+    def find_clusters(self, prospects):
+        """Return duplicate clusters as lists of (index, score, reason) tuples"""
+        records = [_DuplicateRecord(i, p) for i, p in enumerate(prospects)]
+        union_find = _UnionFind()
+        evidence = {}
+        checked = set()
+
+        for key, members in self._blocks(records).items():
+            if len(members) < 2:
+                continue
+            if key[0] == 'email':
+                # Same canonical address is a match without further scoring
+                for other in members[1:]:
+                    union_find.union(members[0], other)
+                    evidence[other] = max(evidence.get(other, (0, None)), (1.0, 'email'))
+                evidence.setdefault(members[0], (1.0, 'email'))
+                continue
+            if len(members) > MAX_BLOCK_SIZE:
+                continue
+            for i, left in enumerate(members):
+                for right in members[i + 1:]:
+                    pair = (left, right)
+                    if pair in checked:
+                        continue
+                    checked.add(pair)
+                    score, reason = score_pair(records[left], records[right])
+                    if score >= self.threshold:
+                        union_find.union(left, right)
+                        for idx in pair:
+                            evidence[idx] = max(evidence.get(idx, (0, None)), (score, reason))
+
+        clusters = defaultdict(list)
+        for index in evidence:
+            clusters[union_find.find(index)].append(index)
+
+        result = []
+        for root in sorted(clusters):
+            members = sorted(clusters[root])
+            if len(members) > 1:
+                result.append([(i,) + evidence[i] for i in members])
+        return result
+
+    def find_duplicates(self, prospects):
+        """Duplicate groups in the same shape as the exact-email audit"""
+        groups = []
+        for cluster in self.find_clusters(prospects):
+            members = [prospects[i] for i, _, _ in cluster]
+            reasons = sorted({reason for _, _, reason in cluster if reason})
+            first = _DuplicateRecord(cluster[0][0], members[0])
+            groups.append({
+                'email': first.email or members[0].get('email', ''),
+                'count': len(members),
+                'score': round(min(score for _, score, _ in cluster), 3),
+                'matchedOn': reasons,
+                'prospects': [{
+                    'id': p.get('id'),
+                    'email': p.get('email', ''),
+                    'firstName': p.get('firstName', ''),
+                    'lastName': p.get('lastName', ''),
+                    'company': p.get('company', ''),
+                    'createdAt': p.get('createdAt', '')
+                } for p in members]
+            })
+        return groups
+
+    def count_duplicates(self, prospects):
+        """Number of redundant records (cluster size minus one, summed)"""
+        return sum(len(cluster) - 1 for cluster in self.find_clusters(prospects))
+
+
+def find_fuzzy_duplicates(prospects, threshold=MATCH_THRESHOLD):
+    """Find likely duplicate prospects beyond exact email matches"""
+    return DuplicateDetector(threshold).find_duplicates(prospects)
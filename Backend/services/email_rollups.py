@@ -0,0 +1,292 @@
+import threading
+from datetime import datetime, timedelta
+from services.activity_store import LAKE_STREAM, on_store_created
+from services.email_stats import CLICKS, COLUMN_COUNT, OPENS, UNDATED, rollup_activities, stats_from_counts
+from services.hyperloglog import HyperLogLog
+from config.settings import EMAIL_UNIQUE_MODE, HLL_PRECISION
+
+# Rollup count columns, in email_stats counter column order
+ROLLUP_COUNTS = ('sent', 'opens', 'clicks', 'hard_bounces', 'soft_bounces', 'other')
+
+# Bound parameters per statement when probing visitors of the edge days
+VISITOR_PROBE_BATCH = 200
+
+
+def _day_start(day, days=0):
+    # created_at of midnight `days` after the given day
+    return (datetime.strptime(day, '%Y-%m-%d') + timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class EmailRollups:
+    """Per-email per-day counts and distinct visitors, kept next to the activity store.
+
+    Each synced page is added to the rollups of its days as it is stored.
+    Counts for any date range are sums over whole days plus the raw
+    activities of the two partial edge days. Unique opens and clicks come
+    either from the exact (email, visitor) rows of each day, which merge
+    across days with COUNT(DISTINCT), or in approximate mode from one
+    HyperLogLog sketch per email, metric and day, merged the same way.
+    """
+    def __init__(self, store, stream=LAKE_STREAM, unique_mode=None, precision=None):
+        self.store = store
+        self.stream = stream
+        self.approximate = (unique_mode or EMAIL_UNIQUE_MODE) == 'approximate'
+        self.precision = precision or HLL_PRECISION
+        with store.transaction() as conn:
+            conn.executescript(f'''
+                CREATE TABLE IF NOT EXISTS email_daily (
+                    business_unit TEXT NOT NULL, day TEXT NOT NULL, list_email_id NOT NULL,
+                    {', '.join(f'{name} INTEGER NOT NULL' for name in ROLLUP_COUNTS)},
+                    PRIMARY KEY (business_unit, day, list_email_id)
+                );
+                CREATE TABLE IF NOT EXISTS email_daily_visitors (
+                    business_unit TEXT NOT NULL, list_email_id NOT NULL, metric INTEGER NOT NULL,
+                    visitor NOT NULL, day TEXT NOT NULL,
+                    PRIMARY KEY (business_unit, list_email_id, metric, visitor, day)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS email_daily_visitors_day ON email_daily_visitors (business_unit, day);
+                CREATE TABLE IF NOT EXISTS email_daily_sketches (
+                    business_unit TEXT NOT NULL, day TEXT NOT NULL, list_email_id NOT NULL,
+                    metric INTEGER NOT NULL, sketch BLOB NOT NULL,
+                    PRIMARY KEY (business_unit, day, list_email_id, metric)
+                );
+            ''')
+            has_rollups = conn.execute(
+                'SELECT 1 FROM email_daily WHERE business_unit = ? LIMIT 1', (store.business_unit,)
+            ).fetchone()
+            # Only the current mode's unique table is maintained; after a mode
+            # or precision change it is empty or stale and gets rebuilt
+            if self.approximate:
+                sample = conn.execute(
+                    'SELECT sketch FROM email_daily_sketches WHERE business_unit = ? LIMIT 1', (store.business_unit,)
+                ).fetchone()
+                has_uniques = sample is not None and sample[0][1] == self.precision
+            else:
+                has_uniques = conn.execute(
+                    'SELECT 1 FROM email_daily_visitors WHERE business_unit = ? LIMIT 1', (store.business_unit,)
+                ).fetchone()
+        store.add_listener(stream, self.apply)
+        if not has_rollups or not has_uniques:
+            self.rebuild_all()
+
+    def _raw_rows(self, conn, conditions, params):
+        query = (
+            'SELECT list_email_id, type, visitor_id, prospect_id, created_at FROM activities '
+            'WHERE business_unit = ? AND stream = ? AND list_email_id IS NOT NULL'
+        )
+        rows = conn.execute(' AND '.join([query] + conditions), [self.store.business_unit, self.stream] + params)
+        fields = ('list_email_id', 'type', 'visitor_id', 'prospect_id', 'created_at')
+        return [dict(zip(fields, row)) for row in rows]
+
+    def rebuild_days(self, days):
+        """Recompute the rollups of the given days from the stored activities"""
+        business_unit = self.store.business_unit
+        with self.store.transaction() as conn:
+            for day in sorted(days):
+                activities = self._raw_rows(conn, ['day = ?'], [day])
+                counts, visitors = rollup_activities(activities)
+                conn.execute('DELETE FROM email_daily WHERE business_unit = ? AND day = ?', (business_unit, day))
+                conn.execute('DELETE FROM email_daily_visitors WHERE business_unit = ? AND day = ?', (business_unit, day))
+                conn.execute('DELETE FROM email_daily_sketches WHERE business_unit = ? AND day = ?', (business_unit, day))
+                conn.executemany(
+                    f"INSERT INTO email_daily VALUES (?, ?, ?, {', '.join('?' * COLUMN_COUNT)})",
+                    ((business_unit, row_day, list_email_id, *row) for (list_email_id, row_day), row in counts.items())
+                )
+                if self.approximate:
+                    sketches = self._sketches(visitors)
+                    conn.executemany(
+                        'INSERT INTO email_daily_sketches VALUES (?, ?, ?, ?, ?)',
+                        ((business_unit, day, list_email_id, metric, sketch.to_bytes())
+                         for (list_email_id, metric), sketch in sketches.items())
+                    )
+                else:
+                    conn.executemany(
+                        'INSERT INTO email_daily_visitors VALUES (?, ?, ?, ?, ?)',
+                        ((business_unit,) + visitor for visitor in visitors)
+                    )
+        print(f"[DEBUG] Email rollups: rebuilt {len(days)} day(s)")
+
+    def apply(self, conn, activities):
+        """Store listener: add a synced page of new activities to the rollups of their days"""
+        counts, visitors = rollup_activities(activities)
+        if not counts:
+            return
+        business_unit = self.store.business_unit
+        conn.executemany(
+            f"INSERT INTO email_daily VALUES (?, ?, ?, {', '.join('?' * COLUMN_COUNT)}) "
+            'ON CONFLICT (business_unit, day, list_email_id) DO UPDATE SET '
+            + ', '.join(f'{name} = {name} + excluded.{name}' for name in ROLLUP_COUNTS),
+            ((business_unit, day, list_email_id, *row) for (list_email_id, day), row in counts.items())
+        )
+        if not self.approximate:
+            conn.executemany(
+                'INSERT OR IGNORE INTO email_daily_visitors VALUES (?, ?, ?, ?, ?)',
+                ((business_unit,) + visitor for visitor in visitors)
+            )
+            return
+        # Fold the page's visitors into each day's stored sketch
+        by_day = {}
+        for list_email_id, metric, visitor, day in visitors:
+            by_day.setdefault((day, list_email_id, metric), []).append(visitor)
+        for (day, list_email_id, metric), day_visitors in by_day.items():
+            sketch = HyperLogLog(self.precision).update(day_visitors)
+            stored = conn.execute(
+                'SELECT sketch FROM email_daily_sketches WHERE business_unit = ? AND day = ? AND list_email_id = ? AND metric = ?',
+                (business_unit, day, list_email_id, metric)
+            ).fetchone()
+            if stored:
+                sketch.merge(stored[0])
+            conn.execute(
+                'INSERT OR REPLACE INTO email_daily_sketches VALUES (?, ?, ?, ?, ?)',
+                (business_unit, day, list_email_id, metric, sketch.to_bytes())
+            )
+
+    def rebuild_all(self):
+        with self.store.transaction() as conn:
+            days = [day for (day,) in conn.execute(
+                'SELECT DISTINCT day FROM activities WHERE business_unit = ? AND stream = ? AND list_email_id IS NOT NULL',
+                (self.store.business_unit, self.stream)
+            )]
+        if days:
+            self.rebuild_days(days)
+
+    def _ranges(self, created_after, created_before):
+        # (whole-day SQL conditions, params) and the raw-activity windows for the edge days
+        after_day = created_after[:10] if created_after else None
+        before_day = created_before[:10] if created_before else None
+        if after_day and after_day == before_day:
+            return None, [(['created_at > ?', 'created_at < ?'], [created_after, created_before])]
+
+        day_conditions, day_params, windows = [], [], []
+        if after_day or before_day:
+            day_conditions.append('day != ?')
+            day_params.append(UNDATED)
+        if after_day:
+            day_conditions.append('day > ?')
+            day_params.append(after_day)
+            windows.append((['created_at > ?', 'created_at < ?'], [created_after, _day_start(after_day, 1)]))
+        if before_day:
+            day_conditions.append('day < ?')
+            day_params.append(before_day)
+            windows.append((['created_at >= ?', 'created_at < ?'], [_day_start(before_day), created_before]))
+        return (day_conditions, day_params), windows
+
+    def email_stats(self, created_after=None, created_before=None):
+        """{list_email_id: stats} for activities created in (created_after, created_before)"""
+        whole_days, windows = self._ranges(created_after, created_before)
+        business_unit = self.store.business_unit
+        counts, latest_day = {}, {}
+
+        with self.store.transaction() as conn:
+            edge_activities = []
+            for conditions, params in windows:
+                edge_activities.extend(self._raw_rows(conn, conditions, params))
+            edge_counts, edge_visitors = rollup_activities(edge_activities)
+
+            if whole_days is not None:
+                conditions = ''.join(f' AND {c}' for c in whole_days[0])
+                params = [business_unit] + whole_days[1]
+                sums = ', '.join(f'SUM({name})' for name in ROLLUP_COUNTS)
+                for list_email_id, day, *row in conn.execute(
+                    f'SELECT list_email_id, MAX(day), {sums} FROM email_daily WHERE business_unit = ?{conditions} GROUP BY list_email_id',
+                    params
+                ):
+                    counts[list_email_id] = row
+                    latest_day[list_email_id] = day
+            if self.approximate:
+                uniques = self._approximate_uniques(conn, whole_days, edge_visitors)
+            else:
+                uniques = self._exact_uniques(conn, whole_days, edge_visitors)
+
+        for (list_email_id, day), row in edge_counts.items():
+            total = counts.get(list_email_id)
+            counts[list_email_id] = row if total is None else [a + b for a, b in zip(total, row)]
+            latest_day[list_email_id] = max(latest_day.get(list_email_id, day), day)
+
+        # Most recently active emails first
+        ordered = sorted(counts, key=lambda list_email_id: latest_day[list_email_id], reverse=True)
+        return {
+            list_email_id: stats_from_counts(
+                counts[list_email_id],
+                uniques.get((list_email_id, OPENS), 0),
+                uniques.get((list_email_id, CLICKS), 0)
+            )
+            for list_email_id in ordered
+        }
+
+    def _sketches(self, visitors, sketches=None):
+        # Add (email, metric, visitor, day) rows to per (email, metric) sketches
+        sketches = {} if sketches is None else sketches
+        for list_email_id, metric, visitor, _ in visitors:
+            sketch = sketches.get((list_email_id, metric))
+            if sketch is None:
+                sketch = sketches[(list_email_id, metric)] = HyperLogLog(self.precision)
+            sketch.add(visitor)
+        return sketches
+
+    def _approximate_uniques(self, conn, whole_days, edge_visitors):
+        sketches = {}
+        if whole_days is not None:
+            conditions = ''.join(f' AND {c}' for c in whole_days[0])
+            for list_email_id, metric, sketch in conn.execute(
+                f'SELECT list_email_id, metric, sketch FROM email_daily_sketches WHERE business_unit = ?{conditions}',
+                [self.store.business_unit] + whole_days[1]
+            ):
+                merged = sketches.get((list_email_id, metric))
+                if merged is None:
+                    merged = sketches[(list_email_id, metric)] = HyperLogLog(self.precision)
+                merged.merge(sketch)
+        self._sketches(edge_visitors, sketches)
+        return {key: sketch.count() for key, sketch in sketches.items()}
+
+    def _exact_uniques(self, conn, whole_days, edge_visitors):
+        uniques = {}
+        if whole_days is not None:
+            conditions = ''.join(f' AND {c}' for c in whole_days[0])
+            params = [self.store.business_unit] + whole_days[1]
+            for list_email_id, metric, distinct in conn.execute(
+                'SELECT list_email_id, metric, COUNT(*) FROM ('
+                f'SELECT DISTINCT list_email_id, metric, visitor FROM email_daily_visitors WHERE business_unit = ?{conditions}'
+                ') GROUP BY list_email_id, metric',
+                params
+            ):
+                uniques[(list_email_id, metric)] = distinct
+
+        # Edge-day visitors count unless the whole days already had them
+        edge_pairs = {(list_email_id, column, visitor) for list_email_id, column, visitor, _ in edge_visitors}
+        if edge_pairs and uniques:
+            edge_pairs -= self._known_visitors(conn, edge_pairs, conditions, params)
+        for list_email_id, column, _ in edge_pairs:
+            uniques[(list_email_id, column)] = uniques.get((list_email_id, column), 0) + 1
+        return uniques
+
+    def _known_visitors(self, conn, pairs, conditions, params):
+        # Edge (email, column, visitor) pairs already present on a whole day of the range
+        known = set()
+        pairs = list(pairs)
+        for start in range(0, len(pairs), VISITOR_PROBE_BATCH):
+            batch = pairs[start:start + VISITOR_PROBE_BATCH]
+            values = ', '.join('(?, ?, ?)' for _ in batch)
+            known.update(conn.execute(
+                f'WITH probe (list_email_id, metric, visitor) AS (VALUES {values}) '
+                'SELECT DISTINCT p.list_email_id, p.metric, p.visitor FROM probe p '
+                'JOIN email_daily_visitors v ON v.business_unit = ? AND v.list_email_id = p.list_email_id '
+                f'AND v.metric = p.metric AND v.visitor = p.visitor{conditions.replace(" day", " v.day")}',
+                [value for pair in batch for value in pair] + params
+            ).fetchall())
+        return known
+
+
+_rollups = {}
+_rollups_lock = threading.Lock()
+
+def get_email_rollups(store):
+    """Rollups for an activity store, registered as its lake listener on first use"""
+    with _rollups_lock:
+        rollups = _rollups.get(id(store))
+        if rollups is None:
+            rollups = _rollups[id(store)] = EmailRollups(store)
+        return rollups
+
+
+on_store_created(get_email_rollups)
@@ -1,6 +1,10 @@
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 from config.settings import BUSINESS_UNIT_ID
+from services.activity_store import sync_activity_lake
+from services.email_rollups import get_email_rollups
+from cache import get_cached_data, set_cached_data
 
 
 def fetch_all_mails(access_token, fields="id,name,subject,createdAt"):
@@ -35,118 +39,41 @@ def fetch_all_mails(access_token, fields="id,name,subject,createdAt"):
         print(f"Error in fetch_all_mails: {str(e)}")
         return []
 
-def fetch_visitor_activities(access_token, filter_start=None, filter_end=None):
-    """Fetch email visitor activities using v4 API with email_only parameter"""
-    try:
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Pardot-Business-Unit-Id": BUSINESS_UNIT_ID
-        }
-        
-        all_activities = []
-        offset = 0
-        limit = 200
-        
-        while True:
-            params = {
-                "format": "json",
-                "limit": limit,
-                "offset": offset,
-                "sort_by": "created_at",
-                "sort_order": "descending",
-                "email_only": "true"
-            }
-            
-            if filter_start:
-                params["created_after"] = filter_start
-            if filter_end:
-                params["created_before"] = filter_end
-            
-            response = requests.get(
-                "https://pi.pardot.com/api/visitorActivity/version/4/do/query", 
-                 headers=headers, params=params
-                 )
-            
-            if response.status_code != 200:
-                print(f"API Error: {response.text}")
-                break
-            data = response.json()
-            page_activities = data.get("result", {}).get("visitor_activity", [])
+def sync_email_activities(access_token):
+    """Bring the shared activity lake, and with it the email rollups, up to date"""
+    headers = {
+        "Authorization": f"Bearer {access_token}",
+        "Pardot-Business-Unit-Id": BUSINESS_UNIT_ID
+    }
+    store = sync_activity_lake(headers)
+    return get_email_rollups(store)
 
-            if not page_activities:
-                break
 
-            all_activities.extend(page_activities)
-            offset += limit
-            
-        return all_activities
-        
-    except Exception as e:
-        print(f"Error fetching visitor activities: {str(e)}")
-        return []
+def get_list_emails(access_token):
+    """List email metadata, cached per business unit"""
+    cache_key = f"list_emails:{BUSINESS_UNIT_ID}"
+    list_emails = get_cached_data(cache_key)
+    if list_emails is None:
+        list_emails = fetch_all_mails(access_token)
+        if list_emails:
+            set_cached_data(cache_key, list_emails, ttl=1800)
+    return list_emails
 
 
 def _get_email_stats_internal(access_token, filter_start=None, filter_end=None):
     try:
-        list_emails = fetch_all_mails(access_token)
-        visitor_activities = fetch_visitor_activities(access_token, filter_start, filter_end)
+        # List emails and the activity sync are independent crawls, so run
+        # them side by side; aggregation only waits for the sync
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list_emails_future = executor.submit(get_list_emails, access_token)
+            rollups = executor.submit(sync_email_activities, access_token).result()
 
-        # Create email lookup dictionary
-        email_lookup = {email['id']: email for email in list_emails}
-
-        # Count stats for each email
-        email_stats = {}
-        unique_trackers = {}  
-
-        for activity in visitor_activities:
-            list_email_id = activity.get('list_email_id')
-            activity_type = activity.get('type')
-            visitor_id = activity.get('visitor_id') or activity.get('prospect_id')
-            
-            if list_email_id:
-                if list_email_id not in email_stats:
-                    email_stats[list_email_id] = {
-                        'sent': 0, 'delivered': 0, 'opens': 0, 'clicks': 0,
-                        'uniqueOpens': 0, 'uniqueClicks': 0,
-                        'bounces': 0, 'hardBounces': 0, 'softBounces': 0, 'unsubscribes': 0
-                    }
-                    unique_trackers[list_email_id] = {
-                        'unique_opens': set(),
-                        'unique_clicks': set()
-                    }
-                
-                if activity_type == 6:  # Email Send
-                    email_stats[list_email_id]['sent'] += 1
-                elif activity_type == 11:  # Email Open
-                    email_stats[list_email_id]['opens'] += 1
-                    if visitor_id:
-                        unique_trackers[list_email_id]['unique_opens'].add(visitor_id)
-                elif activity_type == 1:  # Email Click
-                    email_stats[list_email_id]['clicks'] += 1
-                    if visitor_id:
-                        unique_trackers[list_email_id]['unique_clicks'].add(visitor_id)
-                elif activity_type == 12:  # Email Click (alternative)
-                    email_stats[list_email_id]['clicks'] += 1
-                    if visitor_id:
-                        unique_trackers[list_email_id]['unique_clicks'].add(visitor_id)
-                elif activity_type == 13:  # Email Hard Bounce
-                    email_stats[list_email_id]['hardBounces'] += 1
-                    email_stats[list_email_id]['bounces'] += 1
-                elif activity_type == 36:  # Email Soft Bounce
-                    email_stats[list_email_id]['softBounces'] += 1
-                    email_stats[list_email_id]['bounces'] += 1
-                elif activity_type == 13:  
-                    email_stats[list_email_id]['unsubscribes'] += 1
+            # Counts and uniques per email summed from the daily rollups
+            email_stats = rollups.email_stats(filter_start, filter_end)
 
- 
-        for email_id in email_stats:
-            if email_id in unique_trackers:
-                email_stats[email_id]['uniqueOpens'] = len(unique_trackers[email_id]['unique_opens'])
-                email_stats[email_id]['uniqueClicks'] = len(unique_trackers[email_id]['unique_clicks'])
-          
-            email_stats[email_id]['delivered'] = email_stats[email_id]['sent'] - email_stats[email_id]['bounces']
+            # Create email lookup dictionary
+            email_lookup = {email['id']: email for email in list_emails_future.result()}
 
-       
         results = []
         for email_id, stats in email_stats.items():
             email_info = email_lookup.get(email_id)
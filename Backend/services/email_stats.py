@@ -0,0 +1,121 @@
+from itertools import repeat
+try:
+    import numpy as np
+except ImportError:
+    # Aggregation falls back to pure Python when numpy is missing
+    np = None
+
+# Visitor activity type -> counter column. Types 1 and 12 are both clicks,
+# and 13 (the hard bounce) takes precedence over its unsubscribe meaning.
+SENT, OPENS, CLICKS, HARD_BOUNCES, SOFT_BOUNCES, OTHER = range(6)
+ACTIVITY_COLUMNS = {6: SENT, 11: OPENS, 1: CLICKS, 12: CLICKS, 13: HARD_BOUNCES, 36: SOFT_BOUNCES}
+COLUMN_COUNT = 6
+
+# Columns whose distinct visitors are counted per email
+UNIQUE_COLUMNS = ((OPENS, 'uniqueOpens'), (CLICKS, 'uniqueClicks'))
+
+# Activities without a created_at are rolled up under this day
+UNDATED = ''
+
+
+def stats_from_counts(row, unique_opens, unique_clicks):
+    """Email stats dict from a counter row and unique visitor counts"""
+    bounces = row[HARD_BOUNCES] + row[SOFT_BOUNCES]
+    return {
+        'sent': row[SENT], 'delivered': row[SENT] - bounces, 'opens': row[OPENS], 'clicks': row[CLICKS],
+        'uniqueOpens': unique_opens, 'uniqueClicks': unique_clicks,
+        'bounces': bounces, 'hardBounces': row[HARD_BOUNCES], 'softBounces': row[SOFT_BOUNCES],
+        'unsubscribes': 0  # type 13 is counted as a hard bounce
+    }
+
+def activity_day(created_at):
+    """Rollup day of an activity's created_at"""
+    return created_at[:10] if created_at else UNDATED
+
+def _codes(values):
+    # Dense integer code per distinct value, in first-seen order
+    return {value: code for code, value in enumerate(dict.fromkeys(values))}
+
+
+class ActivityColumns:
+    """Email activities as parallel integer columns: (email, day) group code, type column, visitor id.
+
+    Each column is built by one comprehension or map() over the activities,
+    so the per-activity work stays in C rather than in an if/elif chain.
+    """
+    def __init__(self, activities):
+        groups = list(zip(
+            [activity.get('list_email_id') for activity in activities],
+            map(activity_day, [activity.get('created_at') for activity in activities])
+        ))
+        group_codes = _codes(groups)
+
+        self.size = len(activities)
+        # Every code is kept, including those for a missing email id;
+        # rollup_activities skips falsy ids when building results
+        self.group_keys = list(group_codes)
+        self.groups = list(map(group_codes.__getitem__, groups))
+        self.types = list(map(ACTIVITY_COLUMNS.get, [activity.get('type') for activity in activities], repeat(OTHER)))
+        # -1 marks an activity without a visitor; those are left out of the unique counts
+        self.visitor_ids = [activity.get('visitor_id') or activity.get('prospect_id') or -1 for activity in activities]
+
+
+def _rollup_numpy(columns):
+    group_count = len(columns.group_keys)
+    groups = np.array(columns.groups, dtype=np.int64)
+    types = np.array(columns.types, dtype=np.int64)
+
+    counts = np.bincount(groups * COLUMN_COUNT + types, minlength=group_count * COLUMN_COUNT)
+    counts = counts.reshape(group_count, COLUMN_COUNT).tolist()
+
+    # Visitors are coded densely so (group, metric, visitor) packs into one integer
+    visitor_values = list(dict.fromkeys(columns.visitor_ids))
+    visitor_codes = {value: code for code, value in enumerate(visitor_values)}
+    visitors = np.array(list(map(visitor_codes.__getitem__, columns.visitor_ids)), dtype=np.int64)
+    no_visitor = visitor_codes.get(-1, -1)
+    stride = len(visitor_values)
+
+    mask = ((types == OPENS) | (types == CLICKS)) & (visitors != no_visitor)
+    # Sorted-unique (group, metric, visitor) triples
+    packed = np.sort((groups[mask] * 2 + (types[mask] == CLICKS)) * stride + visitors[mask])
+    if len(packed):
+        packed = packed[np.concatenate(([True], packed[1:] != packed[:-1]))]
+    group_metric, visitor = np.divmod(packed, stride)
+    group, is_click = np.divmod(group_metric, 2)
+
+    keys = columns.group_keys
+    rows = {keys[code]: row for code, row in enumerate(counts) if keys[code][0]}
+    unique_visitors = {
+        (keys[g][0], CLICKS if c else OPENS, visitor_values[v], keys[g][1])
+        for g, c, v in zip(group.tolist(), is_click.tolist(), visitor.tolist())
+        if keys[g][0]
+    }
+    return rows, unique_visitors
+
+def _rollup_python(activities):
+    # One pass with a counter list per (email, day) and a set of visitor tuples
+    counts = {}
+    visitors = set()
+    columns_get = ACTIVITY_COLUMNS.get
+    for activity in activities:
+        get = activity.get
+        list_email_id = get('list_email_id')
+        if not list_email_id:
+            continue
+        day = activity_day(get('created_at'))
+        row = counts.get((list_email_id, day))
+        if row is None:
+            row = counts[(list_email_id, day)] = [0] * COLUMN_COUNT
+        column = columns_get(get('type'), OTHER)
+        row[column] += 1
+        if column == OPENS or column == CLICKS:
+            visitor_id = get('visitor_id') or get('prospect_id')
+            if visitor_id:
+                visitors.add((list_email_id, column, visitor_id, day))
+    return counts, visitors
+
+def rollup_activities(activities):
+    """Return ({(email id, day): counter row}, {(email id, column, visitor, day)})"""
+    if np is None or not activities:
+        return _rollup_python(activities)
+    return _rollup_numpy(ActivityColumns(activities))
@@ -0,0 +1,84 @@
+import threading
+from collections import OrderedDict
+from services.activity_store import LAKE_STREAM, on_store_created
+
+# Prospect ids per lookup statement
+LOOKUP_BATCH = 500
+
+# Prospects whose first activity is remembered in memory between lookups
+LOOKUP_CACHE_SIZE = 50000
+
+
+class FirstActivityIndex:
+    """Earliest activity timestamp per prospect, read from the activity lake.
+
+    Each lookup is a MIN(created_at) per prospect over the lake's covering
+    prospect index, so it always agrees with the stored activities. A
+    bounded LRU keeps recent answers; synced pages evict the prospects
+    they touch.
+    """
+    def __init__(self, store):
+        self.store = store
+        # Bounded LRU of prospect id -> first_at (None when unknown), shared by
+        # the form stats workers; invalidate() drops the prospects a page touches
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._generation = 0
+        store.add_listener(LAKE_STREAM, self.invalidate)
+
+    def invalidate(self, conn, activities):
+        """Store listener: forget cached first activity times of the page's prospects"""
+        touched = {str(a.get("prospect_id")) for a in activities if a.get("prospect_id")}
+        with self._cache_lock:
+            self._generation += 1
+            for prospect_id in touched:
+                self._cache.pop(prospect_id, None)
+
+    def first_activity_at(self, prospect_ids):
+        """{prospect id: earliest activity created_at} for the given prospects"""
+        keys = {str(prospect_id): prospect_id for prospect_id in prospect_ids if prospect_id}
+        found = {}
+        missing = []
+        with self._cache_lock:
+            generation = self._generation
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    found[key] = self._cache[key]
+                else:
+                    missing.append(key)
+
+        if missing:
+            loaded = dict.fromkeys(missing)
+            with self.store.transaction() as conn:
+                for start in range(0, len(missing), LOOKUP_BATCH):
+                    batch = missing[start:start + LOOKUP_BATCH]
+                    loaded.update((str(prospect_id), first_at) for prospect_id, first_at in conn.execute(
+                        "SELECT prospect_id, MIN(created_at) FROM activities WHERE business_unit = ? AND stream = ? "
+                        f"AND prospect_id IN ({', '.join('?' * len(batch))}) AND created_at > '' GROUP BY prospect_id",
+                        [self.store.business_unit, LAKE_STREAM] + [keys[key] for key in batch]
+                    ))
+            found.update(loaded)
+            with self._cache_lock:
+                # Values read while a page was being synced may be stale; do not keep them
+                if generation == self._generation:
+                    self._cache.update(loaded)
+                while len(self._cache) > LOOKUP_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+
+        return {keys[key]: first_at for key, first_at in found.items() if first_at is not None}
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_first_activity_index(store):
+    """First-activity index for an activity store, registered as its listener on first use"""
+    with _indexes_lock:
+        index = _indexes.get(id(store))
+        if index is None:
+            index = _indexes[id(store)] = FirstActivityIndex(store)
+        return index
+
+
+on_store_created(get_first_activity_index)
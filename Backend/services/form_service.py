@@ -2,64 +2,38 @@ import requests
 from concurrent.futures import ThreadPoolExecutor
 from collections import defaultdict
 from datetime import datetime, timedelta
-from config.settings import BUSINESS_UNIT_ID
+from config.settings import BUSINESS_UNIT_ID, FORM_STATS_WORKERS
+from services.activity_store import LAKE_STREAM, sync_activity_lake
+from services.first_activity import get_first_activity_index
 import json
 import os
 
 
 
-def fetch_all_activities(headers, created_after=None, created_before=None):
-    """Fetch all form activities with optional date filtering"""
-    all_activities = []
-    limit = 200
-    offset = 0
-    
-    while True:
-        params = {
-            "format": "json",
-            "limit": limit,
-            "offset": offset,
-            "sort_by": "created_at",
-            "sort_order": "descending",
-            "form_only": "true"
-        }
-        
-        # Add date filters if provided
-        if created_after:
-            params["created_after"] = created_after
-        if created_before:
-            params["created_before"] = created_before
-        
-        response = requests.get(
-            "https://pi.pardot.com/api/visitorActivity/version/4/do/query",
-            headers=headers,
-            params=params
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            activities = data.get("result", {}).get("visitor_activity", [])
-            if activities:
-                all_activities.extend(activities)
-                offset += limit
-            else:
-                break
-        else:
-            print(f"Error fetching activities: {response.status_code} - {response.text}")
-            break
-    
-    return all_activities
+# Lake fields the form stats read
+FORM_ACTIVITY_FIELDS = ('id', 'prospect_id', 'visitor_id', 'type', 'created_at', 'form_id')
+
 
+def partition_form_activities(activities):
+    """Group activities by form id and then by activity type, in one pass"""
+    activities_by_form = defaultdict(lambda: defaultdict(list))
+    for activity in activities:
+        form_id = str(activity.get("form_id", "")) or str(activity.get("form", {}).get("id", ""))
+        if form_id:
+            activities_by_form[form_id][int(activity.get("type", 0))].append(activity)
+    return activities_by_form
 
-def calculate_form_stats(form, activities_by_form, headers, prospect_cache):
-    """Calculate statistics for a single form"""
+
+def calculate_form_stats(form, activities_by_form, first_activity_index):
+    """Calculate statistics for a single form from its activities partitioned by type"""
     form_id = str(form["id"])
-    form_activities = activities_by_form.get(form_id, [])
+    activities_by_type = activities_by_form.get(form_id, {})
+    form_activities = [a for type_activities in activities_by_type.values() for a in type_activities]
     
     # Activity types: 2=View, 4=Success (Form Submission), 1,6=Clicks
-    views = [a for a in form_activities if int(a.get("type", 0)) == 2]
-    submissions = [a for a in form_activities if int(a.get("type", 0)) == 4]
-    clicks = [a for a in form_activities if int(a.get("type", 0)) in [1, 6]]
+    views = activities_by_type.get(2, [])
+    submissions = activities_by_type.get(4, [])
+    clicks = activities_by_type.get(1, []) + activities_by_type.get(6, [])
     
     def get_unique_count(activities):
         return len({a.get("visitor_id") or a.get("prospect_id") for a in activities if a.get("visitor_id") or a.get("prospect_id")})
@@ -71,6 +45,7 @@ def calculate_form_stats(form, activities_by_form, headers, prospect_cache):
     abandonment_rate = (abandoned / total_views * 100) if total_views > 0 else 0
     
     # Calculate conversions: A submission is a conversion only if the prospect had no prior activities
+    first_activity_by_prospect = first_activity_index.first_activity_at({a.get("prospect_id") for a in submissions})
     conversions = 0
     for submission in submissions:
         prospect_id = submission.get("prospect_id")
@@ -81,31 +56,9 @@ def calculate_form_stats(form, activities_by_form, headers, prospect_cache):
         if not submission_date:
             continue
         
-        # Check if this prospect has any activities before this submission
-        prospect_activities = prospect_cache.get(prospect_id)
-        if prospect_activities is None:
-            # Fetch all activities for this prospect
-            params = {"format": "json", "prospect_id": prospect_id, "limit": 200}
-            response = requests.get(
-                "https://pi.pardot.com/api/visitorActivity/version/4/do/query",
-                headers=headers, params=params
-            )
-            if response.status_code == 200:
-                result = response.json().get("result", {})
-                prospect_activities = result.get("visitor_activity", [])
-                # Ensure it's a list
-                if not isinstance(prospect_activities, list):
-                    prospect_activities = [prospect_activities] if prospect_activities else []
-                prospect_cache[prospect_id] = prospect_activities
-            else:
-                prospect_cache[prospect_id] = []
-                prospect_activities = []
-        
-        # Check if any activity exists before this submission date
-        has_prior_activity = any(
-            isinstance(a, dict) and a.get("created_at") and a.get("created_at") < submission_date
-            for a in prospect_activities
-        )
+        # Any activity before this submission means it was not a first touch
+        first_activity_at = first_activity_by_prospect.get(prospect_id)
+        has_prior_activity = first_activity_at is not None and first_activity_at < submission_date
         
         if not has_prior_activity:
             conversions += 1
@@ -113,10 +66,10 @@ def calculate_form_stats(form, activities_by_form, headers, prospect_cache):
     
     
     # Check if form is active (has activity in last 30 days)
-    thirty_days_ago = datetime.now()
-    recent_activities = [a for a in form_activities if a.get("created_at") and 
-                        datetime.fromisoformat(a["created_at"].replace('Z', '+00:00')).replace(tzinfo=None) > (thirty_days_ago - timedelta(days=30))]
-    is_active = len(recent_activities) > 0
+    thirty_days_ago = datetime.now() - timedelta(days=30)
+    is_active = any(a.get("created_at") and 
+                    datetime.fromisoformat(a["created_at"].replace('Z', '+00:00')).replace(tzinfo=None) > thirty_days_ago
+                    for a in form_activities)
     
     return {
         "id": form_id,
@@ -171,37 +124,37 @@ def get_form_stats(access_token, created_after=None, created_before=None):
                     break
             return all_forms
         
+        # One delta sync of the shared activity lake feeds both the form
+        # activities and the first-activity index
         with ThreadPoolExecutor(max_workers=2) as executor:
             forms_future = executor.submit(fetch_all_forms)
-            activities_future = executor.submit(fetch_all_activities, headers, created_after, created_before)
-            
+            store = executor.submit(sync_activity_lake, headers).result()
             forms = forms_future.result()
-            activities = activities_future.result()  
+        
+        activities = store.activities(
+            LAKE_STREAM, created_after, created_before, fields=FORM_ACTIVITY_FIELDS, present=('form_id',)
+        )
+        first_activity_index = get_first_activity_index(store)
         
         print(f"Forms count: {len(forms) if forms else 0}")
         print(f"Activities count: {len(activities) if activities else 0}")
         print(f"Found {len(forms)} forms")
         
-        # Group activities by form_id
-        activities_by_form = defaultdict(list)
-        for activity in activities:
-            form_id = str(activity.get("form_id", "")) or str(activity.get("form", {}).get("id", ""))
-            if form_id:
-                activities_by_form[form_id].append(activity)
+        # Group activities by form_id and type once; per-form stats only read their partition
+        activities_by_form = partition_form_activities(activities)
         
         print(f"Activities grouped by {len(activities_by_form)} forms")
         
-        # Create prospect cache to avoid duplicate API calls
-        prospect_cache = {}
-        
-        # Calculate stats sequentially to manage API rate limits
-        form_stats = []
-        for form in forms:
+        def form_stats_or_none(form):
             try:
-                stats = calculate_form_stats(form, activities_by_form, headers, prospect_cache)
-                form_stats.append(stats)
+                return calculate_form_stats(form, activities_by_form, first_activity_index)
             except Exception as e:
                 print(f"Error calculating stats for form {form.get('id')}: {e}")
+                return None
+        
+        # Forms are independent; a bounded pool computes them, in form order
+        with ThreadPoolExecutor(max_workers=FORM_STATS_WORKERS) as executor:
+            form_stats = [stats for stats in executor.map(form_stats_or_none, forms) if stats is not None]
         
         # Filter out forms with no activities if date filters are applied
         if created_after or created_before:
@@ -0,0 +1,124 @@
+import base64
+import hashlib
+import math
+import struct
+
+MIN_PRECISION = 4
+MAX_PRECISION = 16
+DEFAULT_PRECISION = 12
+
+_DENSE = b'D'
+_SPARSE = b'S'
+_PAIR = struct.Struct('>HB')  # register index, rank
+
+# 2 ** -rank for every possible register value of a 64-bit hash
+_INVERSE_POWERS = [2.0 ** -rank for rank in range(66)]
+
+
+def standard_error(precision):
+    """Relative standard error of a count at the given precision (1.04 / sqrt(2 ** p)).
+
+    p=10: 3.3%, p=12: 1.6%, p=14: 0.81%, p=16: 0.41%. Roughly 95% of
+    counts fall within twice this, and a sketch takes at most 2 ** p bytes.
+    """
+    return 1.04 / (1 << precision) ** 0.5
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest(), 'big')
+
+def _alpha(registers):
+    if registers == 16:
+        return 0.673
+    if registers == 32:
+        return 0.697
+    if registers == 64:
+        return 0.709
+    return 0.7213 / (1 + 1.079 / registers)
+
+
+class HyperLogLog:
+    """Mergeable approximate distinct counter (HyperLogLog with a 64-bit hash).
+
+    Sketches of the same precision merge by taking the register-wise
+    maximum, so per-day sketches combine into any date range. Values are
+    hashed through str(), so 5 and '5' count as the same visitor.
+    """
+    __slots__ = ('precision', 'registers')
+
+    def __init__(self, precision=DEFAULT_PRECISION):
+        if not MIN_PRECISION <= precision <= MAX_PRECISION:
+            raise ValueError(f"HyperLogLog precision must be between {MIN_PRECISION} and {MAX_PRECISION}")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value):
+        x = _hash64(value)
+        suffix_bits = 64 - self.precision
+        index = x >> suffix_bits
+        # Rank = position of the first set bit in the remaining bits
+        rank = suffix_bits - (x & ((1 << suffix_bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+        return self
+
+    def merge(self, other):
+        """Fold another sketch (or its serialized bytes) into this one"""
+        if isinstance(other, (bytes, bytearray, memoryview)):
+            return self._merge_bytes(bytes(other))
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def _merge_bytes(self, data):
+        kind, precision = data[:1], data[1]
+        if precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        if kind == _DENSE:
+            self.registers = bytearray(map(max, self.registers, data[2:]))
+        else:
+            registers = self.registers
+            # Sparse sketches only list their set registers
+            for index, rank in _PAIR.iter_unpack(data[2:]):
+                if rank > registers[index]:
+                    registers[index] = rank
+        return self
+
+    def count(self):
+        """Estimated number of distinct values added"""
+        registers = len(self.registers)
+        estimate = _alpha(registers) * registers * registers / sum(_INVERSE_POWERS[r] for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * registers and zeros:
+            # Linear counting is more accurate for small cardinalities
+            return round(registers * math.log(registers / zeros))
+        return round(estimate)
+
+    def to_bytes(self):
+        """Compact serialization: set registers only when few are set, else all of them"""
+        registers = self.registers
+        set_count = len(registers) - registers.count(0)
+        header = bytes((self.precision,))
+        if set_count * _PAIR.size < len(registers):
+            pairs = b''.join(_PAIR.pack(index, rank) for index, rank in enumerate(registers) if rank)
+            return _SPARSE + header + pairs
+        return _DENSE + header + bytes(registers)
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = bytes(data)
+        if data[:1] not in (_DENSE, _SPARSE) or len(data) < 2:
+            raise ValueError("Not a serialized HyperLogLog sketch")
+        return cls(data[1])._merge_bytes(data)
+
+    def to_dict(self):
+        """JSON-friendly form, so sketches can be stored through the Redis cache"""
+        return {'precision': self.precision, 'sketch': base64.b64encode(self.to_bytes()).decode('ascii')}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls.from_bytes(base64.b64decode(data['sketch']))
@@ -0,0 +1,200 @@
+import atexit
+import mmap
+import multiprocessing
+import os
+import pickle
+import tempfile
+import threading
+import zlib
+from array import array
+from collections import defaultdict
+from services.prospect_audit_rules import (
+    AuditContext, FusedAuditExecutor, GroupingRule, get_rules, required_fields
+)
+from services.prospect_records import IssueRows
+from config.settings import AUDIT_SPILL_DIR, AUDIT_WORKERS
+
+# Below this many prospects the process start-up costs more than it saves
+PARALLEL_MIN_PROSPECTS = 50000
+
+# Process pool shared by every audit for the life of the process; audits
+# from concurrent requests queue their shards on the same workers
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def audit_worker_count():
+    """Number of worker processes to use for parallel audits"""
+    return AUDIT_WORKERS or os.cpu_count() or 1
+
+def key_partition(key, partitions):
+    """Stable partition for a grouping key (hash() is salted per process)"""
+    return zlib.crc32(key.encode('utf-8')) % partitions
+
+def build_columns(prospects, fields, start=0, end=None):
+    """Project prospects[start:end] onto one list per field the rules read"""
+    end = len(prospects) if end is None else end
+    return {field: [prospects[i].get(field) for i in range(start, end)] for field in fields}
+
+def _pool_context():
+    # A multithreaded server must not fork itself: the child could inherit
+    # locks held by other request threads. forkserver forks from a clean
+    # single-threaded helper instead; spawn is the portable fallback.
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+def get_audit_pool():
+    """The process-wide audit pool of audit_worker_count() processes, started on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = _pool_context().Pool(audit_worker_count())
+        return _pool
+
+@atexit.register
+def shutdown_audit_pool():
+    """Stop the audit pool's worker processes"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.terminate()
+            _pool = None
+
+
+def write_shard_columns(prospects, fields, shard_bounds, spill_dir=None):
+    """Encode each shard's columns into one temp file; return (path, [(offset, length)])
+
+    Workers map the file and decode only their own shard's bytes, so the
+    prospect list is neither pickled through the pool's pipes nor copied
+    whole into every worker.
+    """
+    fd, path = tempfile.mkstemp(prefix='prospect_audit_columns_', suffix='.bin', dir=spill_dir or AUDIT_SPILL_DIR)
+    spans = []
+    offset = 0
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            for start, end in shard_bounds:
+                data = pickle.dumps(build_columns(prospects, fields, start, end), protocol=pickle.HIGHEST_PROTOCOL)
+                handle.write(data)
+                spans.append((offset, len(data)))
+                offset += len(data)
+    except Exception:
+        os.remove(path)
+        raise
+    return path, spans
+
+def _read_shard(path, offset, length):
+    with open(path, 'rb') as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        return pickle.loads(mapped[offset:offset + length])
+
+def _audit_shard(task):
+    """Run row rules over one shard; return flagged indices and grouping keys"""
+    path, offset, length, start, rule_names, ctx, partitions = task
+    columns = _read_shard(path, offset, length)
+    rules = get_rules(rule_names)
+    row_rules = [r for r in rules if not isinstance(r, GroupingRule)]
+    group_rules = [r for r in rules if isinstance(r, GroupingRule)]
+    fields = list(columns)
+    values = [columns[field] for field in fields]
+
+    # Per row rule: prospect indices, and per index the id of its code
+    # combination; a rule emits only a handful of distinct combinations
+    flagged = {rule.name: (array('q'), array('i'), {}) for rule in row_rules}
+    # rule name -> partition -> key -> row indices
+    keys = {rule.name: [defaultdict(list) for _ in range(partitions)] for rule in group_rules}
+    for offset_in_shard, row in enumerate(zip(*values)):
+        prospect = dict(zip(fields, row))
+        index = start + offset_in_shard
+        for rule in row_rules:
+            try:
+                codes = rule.check(prospect, ctx)
+                if codes:
+                    indices, combo_ids, combos = flagged[rule.name]
+                    indices.append(index)
+                    combo_ids.append(combos.setdefault(tuple(codes), len(combos)))
+            except Exception as e:
+                print(f"[DEBUG] Error in audit rule {rule.name} for prospect: {e}")
+        for rule in group_rules:
+            key = rule.group_key(prospect, ctx)
+            if key is not None:
+                keys[rule.name][key_partition(key, partitions)][key].append(index)
+    flagged = {name: (indices, combo_ids, list(combos)) for name, (indices, combo_ids, combos) in flagged.items()}
+    return flagged, {name: [dict(part) for part in parts] for name, parts in keys.items()}
+
+def _merge_partition(shard_parts):
+    """Merge one key partition across shards, keeping only repeated keys"""
+    merged = defaultdict(list)
+    for part in shard_parts:
+        for key, indices in part.items():
+            merged[key].extend(indices)
+    return [(key, indices) for key, indices in merged.items() if len(indices) > 1]
+
+
+def run_parallel_audit(prospects, rule_names=None, ctx=None, workers=None):
+    """Split the audit into `workers` shards on the process pool and merge the results.
+
+    Row rules come back as IssueRows over the prospect list, so detail rows
+    are only built when a page, export or cache write reads them.
+    """
+    rules = get_rules(rule_names)
+    ctx = ctx or AuditContext()
+    workers = workers or audit_worker_count()
+
+    if workers <= 1 or len(prospects) < PARALLEL_MIN_PROSPECTS:
+        return FusedAuditExecutor(rules, ctx).run(prospects)
+
+    names = [rule.name for rule in rules]
+    group_names = [rule.name for rule in rules if isinstance(rule, GroupingRule)]
+    size = len(prospects)
+    shard_size = (size + workers - 1) // workers
+    bounds = [(start, min(start + shard_size, size)) for start in range(0, size, shard_size)]
+
+    print(f"[DEBUG] Parallel audit: {size:,} prospects across {len(bounds)} shards")
+    path, spans = write_shard_columns(prospects, required_fields(rules), bounds)
+    try:
+        pool = get_audit_pool()
+        shard_results = pool.map(_audit_shard, [
+            (path, offset, length, start, names, ctx, workers)
+            for (start, _), (offset, length) in zip(bounds, spans)
+        ])
+    finally:
+        os.remove(path)
+
+    # Duplicate detection is merged per key hash partition, in parallel
+    merge_names = []
+    merge_tasks = []
+    for name in group_names:
+        for partition in range(workers):
+            merge_names.append(name)
+            merge_tasks.append([keys[name][partition] for _, keys in shard_results])
+    merged = pool.map(_merge_partition, merge_tasks) if merge_tasks else []
+
+    rules_by_name = {rule.name: rule for rule in rules}
+    results = {}
+    for name in names:
+        if name in group_names:
+            continue
+        indices = array('q')
+        codes = []
+        for flagged, _ in shard_results:
+            shard_indices, combo_ids, combos = flagged[name]
+            indices.extend(shard_indices)
+            combo_codes = [list(combo) for combo in combos]
+            codes.extend(combo_codes[combo_id] for combo_id in combo_ids)
+        results[name] = IssueRows(prospects, rules_by_name[name], ctx, indices, codes)
+
+    groups = defaultdict(list)
+    for name, repeated in zip(merge_names, merged):
+        groups[name].extend(repeated)
+    for name in group_names:
+        rule = rules_by_name[name]
+        rows = []
+        # Sort by first row index so groups come back in scan order
+        for key, indices in sorted(groups[name], key=lambda item: item[1][0]):
+            row = rule.finalize(key, [rule.member(prospects[i], ctx) for i in indices], ctx)
+            if row is not None:
+                rows.append(row)
+        results[name] = rows
+
+    return {name: results[name] for name in names}
@@ -0,0 +1,303 @@
+from datetime import datetime, timedelta, timezone
+from collections import defaultdict
+from services.duplicate_detection import canonicalize_email
+from services.prospect_records import IssueRow
+from services.prospect_dates import NO_TIMESTAMP, datetime_to_epoch, prospect_timestamp
+
+SECONDS_PER_DAY = 86400
+
+# Registered audit rules, keyed by the result name each rule produces
+AUDIT_RULES = {}
+
+def register_rule(rule_cls):
+    """Class decorator that adds an audit rule to the registry"""
+    rule = rule_cls()
+    if not rule.name:
+        raise ValueError(f"Audit rule {rule_cls.__name__} must define a name")
+    AUDIT_RULES[rule.name] = rule
+    return rule_cls
+
+def get_rules(names=None):
+    """Return registered rules, optionally restricted to the given names"""
+    if names is None:
+        return list(AUDIT_RULES.values())
+    return [AUDIT_RULES[name] for name in names]
+
+def required_fields(rules=None):
+    """Union of prospect fields read by the given rules"""
+    fields = []
+    for rule in rules or get_rules():
+        for field in rule.fields:
+            if field not in fields:
+                fields.append(field)
+    return fields
+
+
+class AuditContext:
+    """Values shared by every rule during a single audit run"""
+    def __init__(self, now=None, inactive_days=90):
+        self.now = now or datetime.now(timezone.utc)
+        self.inactive_days = inactive_days
+        self.inactive_cutoff = self.now - timedelta(days=inactive_days)
+        # Epoch-second equivalents so rules compare integers, not datetimes
+        self.now_ts = datetime_to_epoch(self.now)
+        self.inactive_cutoff_ts = datetime_to_epoch(self.inactive_cutoff)
+
+
+class AuditRule:
+    """Row-level rule: inspects one prospect and emits issue codes"""
+    name = None
+    fields = ()
+    codes = ()
+
+    def check(self, prospect, ctx):
+        """Return the issue codes this prospect triggers (empty if healthy)"""
+        return []
+
+    def detail(self, prospect, codes, ctx):
+        """Build the detail row reported for a flagged prospect"""
+        return IssueRow(prospect, (('id', ''),), {'codes': codes})
+
+
+class GroupingRule:
+    """Cross-prospect rule: groups prospects by a key and flags whole groups"""
+    name = None
+    fields = ()
+    codes = ()
+
+    def group_key(self, prospect, ctx):
+        """Return the grouping key for a prospect, or None to skip it"""
+        return None
+
+    def member(self, prospect, ctx):
+        """Return the compact member row stored for each grouped prospect"""
+        return IssueRow(prospect, (('id', None),))
+
+    def finalize(self, key, members, ctx):
+        """Return the detail row for a finished group, or None if it is healthy"""
+        return None
+
+
+@register_rule
+class DuplicateEmailRule(GroupingRule):
+    name = 'duplicates'
+    fields = ('id', 'email', 'firstName', 'lastName', 'createdAt')
+    codes = ('DUPLICATE_EMAIL',)
+    member_fields = (('id', None), ('firstName', ''), ('lastName', ''), ('createdAt', ''))
+
+    def group_key(self, prospect, ctx):
+        # Case, whitespace and plus-addressing variants share one key
+        return canonicalize_email(prospect.get('email')) or None
+
+    def member(self, prospect, ctx):
+        return IssueRow(prospect, self.member_fields)
+
+    def finalize(self, key, members, ctx):
+        if len(members) < 2:
+            return None
+        return {
+            'email': key,
+            'count': len(members),
+            'prospects': members
+        }
+
+
+@register_rule
+class InactiveProspectRule(AuditRule):
+    name = 'inactive_prospects'
+    fields = ('id', 'email', 'firstName', 'lastName', 'company', 'lastActivityAt', 'lastActivityTs')
+    codes = ('INACTIVE', 'INVALID_ACTIVITY_DATE', 'NEVER_ACTIVE')
+    row_fields = (('id', None), ('email', None), ('firstName', ''), ('lastName', ''), ('company', ''))
+
+    def check(self, prospect, ctx):
+        last_activity = prospect.get('lastActivityAt')
+        if not last_activity or not str(last_activity).strip():
+            return ['NEVER_ACTIVE']
+        activity_ts = prospect_timestamp(prospect, 'lastActivityAt')
+        if activity_ts == NO_TIMESTAMP:
+            return ['INVALID_ACTIVITY_DATE']
+        if activity_ts < ctx.inactive_cutoff_ts:
+            return ['INACTIVE']
+        return []
+
+    def detail(self, prospect, codes, ctx):
+        if 'NEVER_ACTIVE' in codes:
+            extras = {'lastActivityAt': None, 'daysInactive': 'Never'}
+        elif 'INVALID_ACTIVITY_DATE' in codes:
+            extras = {'lastActivityAt': 'Invalid date', 'daysInactive': 'Unknown'}
+        else:
+            activity_ts = prospect_timestamp(prospect, 'lastActivityAt')
+            extras = {
+                'lastActivityAt': str(prospect.get('lastActivityAt')),
+                'daysInactive': (ctx.now_ts - activity_ts) // SECONDS_PER_DAY
+            }
+        return IssueRow(prospect, self.row_fields, extras)
+
+
+@register_rule
+class MissingCriticalFieldsRule(AuditRule):
+    name = 'missing_fields'
+    # Critical field -> issue code, in reporting order
+    critical_fields = {
+        'firstName': 'MISSING_FIRST_NAME',
+        'lastName': 'MISSING_LAST_NAME',
+        'company': 'MISSING_COMPANY',
+        'jobTitle': 'MISSING_JOB_TITLE',
+        'country': 'MISSING_COUNTRY'
+    }
+    fields = ('id', 'email', 'firstName', 'lastName', 'company', 'jobTitle', 'country')
+    codes = tuple(critical_fields.values())
+    placeholders = ('none', 'null', 'n/a', 'undefined')
+    row_fields = (('id', ''), ('email', 'N/A'), ('firstName', ''), ('lastName', ''), ('company', ''))
+
+    def check(self, prospect, ctx):
+        codes = []
+        for field, code in self.critical_fields.items():
+            field_value = prospect.get(field, '')
+            # Empty, None, or placeholder values count as missing
+            if (not field_value or
+                str(field_value).strip() == '' or
+                str(field_value).lower().strip() in self.placeholders):
+                codes.append(code)
+        return codes
+
+    def detail(self, prospect, codes, ctx):
+        return IssueRow(prospect, self.row_fields, {
+            'missingFields': [field for field, code in self.critical_fields.items() if code in codes]
+        })
+
+
+@register_rule
+class ScoringIssuesRule(AuditRule):
+    name = 'scoring_issues'
+    fields = ('id', 'email', 'firstName', 'lastName', 'company', 'score', 'grade', 'lastActivityAt')
+    # Issue code -> message shown in the UI
+    messages = {
+        'HIGH_SCORE_LOW_GRADE': 'High score with low grade',
+        'LOW_SCORE_HIGH_GRADE': 'Low score with high grade',
+        'ACTIVE_ZERO_SCORE': 'Active prospect with zero score',
+        'NEGATIVE_SCORE': 'Negative score',
+        'UNUSUALLY_HIGH_SCORE': 'Unusually high score',
+        'GRADE_A_LOW_SCORE': 'Grade A with score below 75',
+        'GRADE_B_SCORE_RANGE': 'Grade B with score outside 50-74 range',
+        'GRADE_C_SCORE_RANGE': 'Grade C with score outside 25-49 range',
+        'GRADE_D_HIGH_SCORE': 'Grade D with score above 24'
+    }
+    codes = tuple(messages)
+    row_fields = (
+        ('id', ''), ('email', 'N/A'), ('firstName', ''), ('lastName', ''), ('company', ''),
+        ('score', 0), ('grade', 'D'), ('lastActivityAt', None)
+    )
+
+    def check(self, prospect, ctx):
+        score = prospect.get('score', 0)
+        grade = prospect.get('grade', 'D')
+        codes = []
+
+        # Score/grade mismatch
+        if score >= 100 and grade in ['D', 'F']:
+            codes.append('HIGH_SCORE_LOW_GRADE')
+        elif score <= 10 and grade in ['A', 'B']:
+            codes.append('LOW_SCORE_HIGH_GRADE')
+
+        # Active prospects with very low scores
+        if prospect.get('lastActivityAt') and score == 0:
+            codes.append('ACTIVE_ZERO_SCORE')
+
+        if score < 0:
+            codes.append('NEGATIVE_SCORE')
+
+        if score > 1000:
+            codes.append('UNUSUALLY_HIGH_SCORE')
+
+        # Grade without corresponding score range
+        if grade == 'A' and score < 75:
+            codes.append('GRADE_A_LOW_SCORE')
+        elif grade == 'B' and (score < 50 or score >= 75):
+            codes.append('GRADE_B_SCORE_RANGE')
+        elif grade == 'C' and (score < 25 or score >= 50):
+            codes.append('GRADE_C_SCORE_RANGE')
+        elif grade == 'D' and score >= 25:
+            codes.append('GRADE_D_HIGH_SCORE')
+
+        return codes
+
+    def detail(self, prospect, codes, ctx):
+        return IssueRow(prospect, self.row_fields, {'issues': [self.messages[code] for code in codes]})
+
+
+class AuditAccumulator:
+    """State filled by one pass over a shard of prospects"""
+    def __init__(self, rules, ctx):
+        self.ctx = ctx
+        self.row_rules = [r for r in rules if isinstance(r, AuditRule)]
+        self.group_rules = [r for r in rules if isinstance(r, GroupingRule)]
+        self.details = {rule.name: [] for rule in self.row_rules}
+        self.groups = {rule.name: defaultdict(list) for rule in self.group_rules}
+        self.total = 0
+
+    def add(self, prospect):
+        """Evaluate every rule against a single prospect"""
+        self.total += 1
+        ctx = self.ctx
+        for rule in self.row_rules:
+            try:
+                codes = rule.check(prospect, ctx)
+                if codes:
+                    self.details[rule.name].append(rule.detail(prospect, codes, ctx))
+            except Exception as e:
+                print(f"[DEBUG] Error in audit rule {rule.name} for prospect: {e}")
+        for rule in self.group_rules:
+            key = rule.group_key(prospect, ctx)
+            if key is not None:
+                self.groups[rule.name][key].append(rule.member(prospect, ctx))
+
+    def merge(self, other):
+        """Fold another shard's state into this one, preserving shard order"""
+        self.total += other.total
+        for name, rows in other.details.items():
+            self.details[name].extend(rows)
+        for name, groups in other.groups.items():
+            target = self.groups[name]
+            for key, members in groups.items():
+                target[key].extend(members)
+        return self
+
+    def results(self):
+        """Finalize grouping rules and return detail rows per rule name"""
+        results = dict(self.details)
+        for rule in self.group_rules:
+            rows = []
+            for key, members in self.groups[rule.name].items():
+                row = rule.finalize(key, members, self.ctx)
+                if row is not None:
+                    rows.append(row)
+            results[rule.name] = rows
+        return results
+
+
+class FusedAuditExecutor:
+    """Evaluates all registered audit rules in a single pass over the data"""
+    def __init__(self, rules=None, ctx=None):
+        self.rules = rules if rules is not None else get_rules()
+        self.ctx = ctx or AuditContext()
+
+    def new_accumulator(self):
+        return AuditAccumulator(self.rules, self.ctx)
+
+    def run(self, prospects, shards=1):
+        """Run every rule over the prospects, optionally split into shards"""
+        if shards <= 1 or len(prospects) < shards:
+            acc = self.new_accumulator()
+            for prospect in prospects:
+                acc.add(prospect)
+            return acc.results()
+
+        shard_size = (len(prospects) + shards - 1) // shards
+        merged = self.new_accumulator()
+        for start in range(0, len(prospects), shard_size):
+            acc = self.new_accumulator()
+            for prospect in prospects[start:start + shard_size]:
+                acc.add(prospect)
+            merged.merge(acc)
+        return merged.results()
@@ -0,0 +1,138 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from services.prospect_audit_rules import AuditAccumulator
+from services.prospect_records import to_json_default
+from config.settings import AUDIT_SPILL_DIR
+
+
+class AuditSpillStore:
+    """Disk-backed storage for audit detail rows and duplicate-group members"""
+    def __init__(self, spill_dir=None):
+        fd, self.path = tempfile.mkstemp(prefix='prospect_audit_', suffix='.sqlite',
+                                         dir=spill_dir or AUDIT_SPILL_DIR)
+        os.close(fd)
+        # Detail pages are read by request threads other than the one that
+        # ran the audit, so share one connection behind a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript('''
+            PRAGMA journal_mode=OFF;
+            PRAGMA synchronous=OFF;
+            CREATE TABLE details (seq INTEGER PRIMARY KEY, rule TEXT NOT NULL, row TEXT NOT NULL);
+            CREATE INDEX details_rule ON details (rule, seq);
+            CREATE TABLE members (seq INTEGER PRIMARY KEY, rule TEXT NOT NULL, key TEXT NOT NULL, member TEXT NOT NULL);
+        ''')
+
+    def add_details(self, rule_name, rows):
+        """Append detail rows for a rule"""
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                'INSERT INTO details (rule, row) VALUES (?, ?)',
+                ((rule_name, json.dumps(row, default=to_json_default)) for row in rows)
+            )
+
+    def add_members(self, rule_name, groups):
+        """Append grouped members ({key: [member, ...]}) for a grouping rule"""
+        if not groups:
+            return
+        with self._lock:
+            self._conn.executemany(
+                'INSERT INTO members (rule, key, member) VALUES (?, ?, ?)',
+                ((rule_name, key, json.dumps(member, default=to_json_default)) for key, members in groups.items() for member in members)
+            )
+
+    def finalize_groups(self, rule, ctx):
+        """Resolve a grouping rule's members into detail rows, one group at a time"""
+        with self._lock:
+            self._conn.execute('CREATE INDEX IF NOT EXISTS members_rule_key ON members (rule, key, seq)')
+            keys = self._conn.execute(
+                'SELECT key FROM members WHERE rule = ? GROUP BY key HAVING COUNT(*) > 1 ORDER BY MIN(seq)',
+                (rule.name,)
+            )
+            batch = []
+            for (key,) in keys:
+                members = [json.loads(m) for (m,) in self._conn.execute(
+                    'SELECT member FROM members WHERE rule = ? AND key = ? ORDER BY seq', (rule.name, key)
+                )]
+                row = rule.finalize(key, members, ctx)
+                if row is not None:
+                    batch.append((rule.name, json.dumps(row, default=to_json_default)))
+                if len(batch) >= 1000:
+                    self._conn.executemany('INSERT INTO details (rule, row) VALUES (?, ?)', batch)
+                    batch = []
+            if batch:
+                self._conn.executemany('INSERT INTO details (rule, row) VALUES (?, ?)', batch)
+            self._conn.execute('DELETE FROM members WHERE rule = ?', (rule.name,))
+            self._conn.commit()
+
+    def count(self, rule_name):
+        """Number of detail rows stored for a rule"""
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM details WHERE rule = ?', (rule_name,)).fetchone()[0]
+
+    def page(self, rule_name, offset, limit):
+        """Return one page of detail rows for a rule"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT row FROM details WHERE rule = ? ORDER BY seq LIMIT ? OFFSET ?',
+                (rule_name, limit, offset)
+            ).fetchall()
+        return [json.loads(row) for (row,) in rows]
+
+    def iter_details(self, rule_name, batch_size=1000):
+        """Yield every detail row for a rule without loading them all at once"""
+        last_seq = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    'SELECT seq, row FROM details WHERE rule = ? AND seq > ? ORDER BY seq LIMIT ?',
+                    (rule_name, last_seq, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for seq, row in rows:
+                yield json.loads(row)
+            last_seq = rows[-1][0]
+
+    def close(self):
+        """Close the connection and delete the spill file"""
+        with self._lock:
+            self._conn.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class SpillingAuditAccumulator(AuditAccumulator):
+    """Audit accumulator that keeps running counts in memory and rows on disk"""
+    def __init__(self, rules, ctx, store):
+        super().__init__(rules, ctx)
+        self.store = store
+        self.active = 0
+
+    def add(self, prospect):
+        super().add(prospect)
+        if prospect.get('lastActivityAt'):
+            self.active += 1
+
+    def flush(self):
+        """Move buffered rows to the spill store so memory stays bounded"""
+        for name, rows in self.details.items():
+            self.store.add_details(name, rows)
+            self.details[name] = []
+        for name, groups in self.groups.items():
+            self.store.add_members(name, groups)
+            groups.clear()
+
+    def results(self):
+        """Finalize grouping rules on disk and return per-rule counts"""
+        self.flush()
+        for rule in self.group_rules:
+            self.store.finalize_groups(rule, self.ctx)
+        return {rule.name: self.store.count(rule.name) for rule in self.row_rules + self.group_rules}
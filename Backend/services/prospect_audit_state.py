@@ -0,0 +1,192 @@
+import heapq
+import threading
+from itertools import islice
+from services.prospect_audit_rules import AuditContext, GroupingRule, get_rules
+from services.prospect_dates import NO_TIMESTAMP, prospect_timestamp
+
+
+class IncrementalAuditState:
+    """Audit results kept current by applying prospect change sets.
+
+    Only issue codes are stored per prospect; detail rows are built when
+    read, against a clock advanced to the time of the read, so values such
+    as daysInactive never go stale.
+    """
+    def __init__(self, rules=None, inactive_days=90):
+        self.rules = rules if rules is not None else get_rules()
+        self.row_rules = [r for r in self.rules if not isinstance(r, GroupingRule)]
+        self.group_rules = [r for r in self.rules if isinstance(r, GroupingRule)]
+        self.inactive_days = inactive_days
+        self.ctx = AuditContext(inactive_days=inactive_days)
+
+        self.prospects = {}                                        # id -> prospect
+        self.codes = {}                                            # id -> {rule name: codes}
+        self.details = {r.name: {} for r in self.row_rules}        # rule -> id -> codes
+        self.members = {r.name: {} for r in self.group_rules}      # rule -> key -> {id: member}
+        self.member_keys = {r.name: {} for r in self.group_rules}  # rule -> id -> key
+        self.flagged = {r.name: {} for r in self.group_rules}      # rule -> keys with 2+ members
+        self.active = 0
+        # Prospects that are active now but will cross the inactivity cutoff,
+        # ordered by last activity so advancing the clock only touches them
+        self._expiry = []
+        # Time of the last change set applied (ISO 8601), set by the caller
+        self.synced_at = None
+        # Epoch time at which the full audit this state was built from
+        # expires, set by the caller; refreshes do not extend it
+        self.expires_at = None
+        # Refreshes and tab reads may run on different request threads
+        self._lock = threading.RLock()
+
+    def load(self, prospects):
+        """Build the state from a full prospect list"""
+        return self.apply_changes(upserts=prospects)
+
+    def apply_changes(self, upserts=(), deletes=()):
+        """Apply upserted and deleted prospects; cost is proportional to the delta"""
+        with self._lock:
+            return self._apply_changes(upserts, deletes)
+
+    def _apply_changes(self, upserts, deletes):
+        touched = 0
+        for prospect_id in deletes:
+            if self._remove(str(prospect_id)):
+                touched += 1
+        for prospect in upserts:
+            prospect_id = str(prospect.get('id'))
+            if prospect.get('isDeleted'):
+                if self._remove(prospect_id):
+                    touched += 1
+                continue
+            self._remove(prospect_id)
+            self._add(prospect_id, prospect)
+            touched += 1
+        return touched
+
+    def advance_clock(self, now=None):
+        """Move the audit clock forward and re-check prospects that aged out"""
+        with self._lock:
+            return self._advance_clock(now)
+
+    def _advance_clock(self, now):
+        self.ctx = AuditContext(now=now, inactive_days=self.inactive_days)
+        cutoff = self.ctx.inactive_cutoff_ts
+        rechecked = 0
+        while self._expiry and self._expiry[0][0] < cutoff:
+            activity_ts, prospect_id = heapq.heappop(self._expiry)
+            prospect = self.prospects.get(prospect_id)
+            # Skip heap entries left behind by later updates or deletes
+            if prospect is None or prospect_timestamp(prospect, 'lastActivityAt') != activity_ts:
+                continue
+            self._remove(prospect_id)
+            self._add(prospect_id, prospect)
+            rechecked += 1
+        return rechecked
+
+    def _add(self, prospect_id, prospect):
+        ctx = self.ctx
+        self.prospects[prospect_id] = prospect
+        prospect_codes = {}
+        for rule in self.row_rules:
+            try:
+                codes = rule.check(prospect, ctx)
+                if codes:
+                    self.details[rule.name][prospect_id] = codes
+                    prospect_codes[rule.name] = codes
+            except Exception as e:
+                print(f"[DEBUG] Error in audit rule {rule.name} for prospect: {e}")
+        for rule in self.group_rules:
+            key = rule.group_key(prospect, ctx)
+            if key is None:
+                continue
+            group = self.members[rule.name].setdefault(key, {})
+            group[prospect_id] = rule.member(prospect, ctx)
+            self.member_keys[rule.name][prospect_id] = key
+            if len(group) == 2:
+                self.flagged[rule.name][key] = None
+        self.codes[prospect_id] = prospect_codes
+
+        if prospect.get('lastActivityAt'):
+            self.active += 1
+        activity_ts = prospect_timestamp(prospect, 'lastActivityAt')
+        if activity_ts != NO_TIMESTAMP and activity_ts >= ctx.inactive_cutoff_ts:
+            heapq.heappush(self._expiry, (activity_ts, prospect_id))
+
+    def _remove(self, prospect_id):
+        prospect = self.prospects.pop(prospect_id, None)
+        if prospect is None:
+            return False
+        for rule_name in self.codes.pop(prospect_id, {}):
+            self.details[rule_name].pop(prospect_id, None)
+        for rule in self.group_rules:
+            key = self.member_keys[rule.name].pop(prospect_id, None)
+            if key is None:
+                continue
+            group = self.members[rule.name][key]
+            group.pop(prospect_id, None)
+            if len(group) < 2:
+                self.flagged[rule.name].pop(key, None)
+            if not group:
+                del self.members[rule.name][key]
+        if prospect.get('lastActivityAt'):
+            self.active -= 1
+        return True
+
+    def count(self, rule_name, now=None):
+        """Number of detail rows a rule reports at `now` (default: the current time)"""
+        with self._lock:
+            self._advance_clock(now)
+            return self._count(rule_name)
+
+    def _count(self, rule_name):
+        if rule_name in self.flagged:
+            return len(self.flagged[rule_name])
+        return len(self.details[rule_name])
+
+    def page(self, rule_name, start, limit, now=None):
+        """One page of detail rows at `now`, without materializing the full list"""
+        with self._lock:
+            self._advance_clock(now)
+            return self._page(rule_name, start, limit)
+
+    def _page(self, rule_name, start, limit):
+        if rule_name in self.flagged:
+            rule = next(r for r in self.group_rules if r.name == rule_name)
+            keys = islice(self.flagged[rule_name], start, start + limit)
+            return [rule.finalize(key, list(self.members[rule_name][key].values()), self.ctx) for key in keys]
+        rule = next(r for r in self.row_rules if r.name == rule_name)
+        rows = islice(self.details[rule_name].items(), start, start + limit)
+        return [rule.detail(self.prospects[prospect_id], codes, self.ctx) for prospect_id, codes in rows]
+
+    def summary(self, now=None):
+        """Prospect and issue counts at `now`, in the health summary format"""
+        with self._lock:
+            self._advance_clock(now)
+            duplicate_count = self._count('duplicates')
+            return {
+                "total_prospects": len(self.prospects),
+                "active_prospects": self.active,
+                "duplicate_count": duplicate_count,
+                "inactive_count": self._count('inactive_prospects'),
+                "missing_fields_count": self._count('missing_fields'),
+                "scoring_issues_count": self._count('scoring_issues'),
+                "health_score": "Good" if duplicate_count == 0 else "Needs Attention"
+            }
+
+    def results(self, now=None):
+        """Full audit results in the run_prospect_health_audit format"""
+        with self._lock:
+            self._advance_clock(now)
+
+            def section(rule_name):
+                count = self._count(rule_name)
+                return {'count': count, 'details': self._page(rule_name, 0, count)}
+
+            return {
+                'total_prospects': len(self.prospects),
+                'duplicates': section('duplicates'),
+                'inactive_prospects': section('inactive_prospects'),
+                'missing_fields': section('missing_fields'),
+                'scoring_issues': section('scoring_issues'),
+                'all_prospects': list(self.prospects.values()),
+                'synced_at': self.synced_at
+            }
@@ -0,0 +1,254 @@
+import threading
+from collections import OrderedDict
+from bisect import bisect_left, bisect_right
+from services.prospect_dates import prospect_timestamp
+
+# Characters per block when skipping over set bits to reach a deep page
+_SKIP_BLOCK = 65536
+
+# Rows per block of a date index; prefix bitmaps are kept at block
+# boundaries so a range bitmap touches at most two partial blocks
+DATE_BLOCK_ROWS = 4096
+
+# Fields with more distinct values than this get no per-value bitmaps
+MAX_VALUE_BITMAPS = 1024
+
+# Filter results remembered per index (i.e. per dataset version)
+RESULT_CACHE_SIZE = 64
+
+# Named row predicates. A view is an AND of these names, each optionally
+# negated with a leading '!', so every predicate is evaluated once per
+# dataset version and views combine with integer bitwise operations.
+PREDICATES = {
+    'has_activity': lambda p: bool(p.get('lastActivityAt')),
+    'has_assigned_to_id': lambda p: bool(p.get('assignedToId')),
+    'has_assigned_to': lambda p: bool(p.get('assignedTo')),
+    'in_salesforce': lambda p: bool(p.get('salesforceId')),
+    'mailable': lambda p: bool(not p.get('isDoNotEmail') and not p.get('optedOut') and p.get('email')),
+    'mailable_no_bounce': lambda p: bool(
+        p.get('email') and not p.get('isDoNotEmail') and not p.get('isUnsubscribed') and not p.get('isHardBounced')
+    ),
+    'do_not_email': lambda p: bool(p.get('isDoNotEmail')),
+    'reviewed': lambda p: bool(p.get('isReviewed')),
+    'needs_review': lambda p: (p.get('score') or 0) > 50 and not p.get('isReviewed'),
+    'starred': lambda p: bool(p.get('isStarred')),
+    'paused': lambda p: bool(p.get('isPaused')),
+    'undelivered': lambda p: bool(p.get('hasUndeliveredEmails')),
+    'my_prospect': lambda p: p.get('assignedTo') == 'current_user_id'
+}
+
+try:
+    _popcount = int.bit_count
+except AttributeError:
+    # Python < 3.10
+    def _popcount(bitmap):
+        return bin(bitmap).count('1')
+
+
+def bitmap_count(bitmap):
+    """Number of rows set in a bitmap"""
+    return _popcount(bitmap)
+
+def bitmap_positions(bitmap, start=0, limit=None):
+    """Row positions set in a bitmap, skipping the first `start` of them"""
+    # bin() is MSB first; reverse it so string index == row position
+    bits = bin(bitmap)[:1:-1]
+    size = len(bits)
+    pos = 0
+    # Skip whole blocks with str.count so deep pages avoid a per-row loop
+    while start:
+        block_end = min(pos + _SKIP_BLOCK, size)
+        in_block = bits.count('1', pos, block_end)
+        if in_block > start:
+            break
+        start -= in_block
+        pos = block_end
+        if pos >= size:
+            return []
+
+    positions = []
+    find = bits.find
+    pos = find('1', pos)
+    while pos != -1 and start:
+        start -= 1
+        pos = find('1', pos + 1)
+    while pos != -1 and (limit is None or len(positions) < limit):
+        positions.append(pos)
+        pos = find('1', pos + 1)
+    return positions
+
+def bitmap_from_positions(positions, size):
+    """Int bitmap with the given row positions set"""
+    if not size:
+        return 0
+    digits = bytearray(b'0') * size
+    last = size - 1
+    for pos in positions:
+        digits[last - pos] = 49  # ASCII '1', stored MSB first
+    return int(digits, 2)
+
+def bitmap_from_flags(flags):
+    """Pack an iterable of truthy/falsy row flags into an int bitmap"""
+    digits = bytearray(49 if flag else 48 for flag in flags)  # ASCII '1' / '0'
+    if not digits:
+        return 0
+    digits.reverse()
+    return int(digits, 2)
+
+
+class DateIndex:
+    """Prospect rows sorted by one epoch date field, for bisect range lookups"""
+    def __init__(self, prospects, field):
+        timestamps = [prospect_timestamp(p, field) for p in prospects]
+        self.size = len(timestamps)
+        self.order = sorted(range(self.size), key=timestamps.__getitem__)
+        self.sorted_ts = [timestamps[i] for i in self.order]
+        self._prefixes = None
+
+    def rank_range(self, start_ts, end_ts):
+        """Sorted-order slice bounds of rows with start_ts <= ts <= end_ts"""
+        return bisect_left(self.sorted_ts, start_ts), bisect_right(self.sorted_ts, end_ts)
+
+    def row_positions(self, start_ts, end_ts):
+        """Row positions in range, ordered by timestamp"""
+        low, high = self.rank_range(start_ts, end_ts)
+        return self.order[low:high]
+
+    def _prefix_bitmaps(self):
+        # prefixes[b] has every row whose rank is below b * DATE_BLOCK_ROWS
+        if self._prefixes is None:
+            digits = bytearray(b'0') * self.size
+            last = self.size - 1
+            prefixes = [0]
+            for block_start in range(0, self.size, DATE_BLOCK_ROWS):
+                for pos in self.order[block_start:block_start + DATE_BLOCK_ROWS]:
+                    digits[last - pos] = 49
+                prefixes.append(int(digits, 2))
+            self._prefixes = prefixes
+        return self._prefixes
+
+    def _rank_prefix(self, rank):
+        # Bitmap of rows whose rank is below `rank`
+        block, offset = divmod(rank, DATE_BLOCK_ROWS)
+        prefix = self._prefix_bitmaps()[block]
+        if offset:
+            block_start = block * DATE_BLOCK_ROWS
+            prefix |= bitmap_from_positions(self.order[block_start:rank], self.size)
+        return prefix
+
+    def range_bitmap(self, start_ts, end_ts):
+        """Bitmap of rows with start_ts <= ts <= end_ts"""
+        low, high = self.rank_range(start_ts, end_ts)
+        if low >= high:
+            return 0
+        return self._rank_prefix(high) & ~self._rank_prefix(low)
+
+
+class ProspectBitmapIndex:
+    """Per-version bitmaps over a prospect list, one Python int per predicate.
+
+    Python ints stand in for roaring or NumPy bitsets: &, |, ~ and
+    bit_count already run in C over the whole int, and neither library is a
+    dependency here. Dense ints cost size / 8 bytes per bitmap, which is
+    what a NumPy bitset would too.
+    """
+    def __init__(self, prospects):
+        self.prospects = prospects
+        self.size = len(prospects)
+        self.all = (1 << self.size) - 1
+        self._bitmaps = {}
+        self._date_indexes = {}
+        self._value_bitmaps = {}
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def bitmap(self, name):
+        """Bitmap for a named predicate, built on first use"""
+        bitmap = self._bitmaps.get(name)
+        if bitmap is None:
+            with self._lock:
+                bitmap = self._bitmaps.get(name)
+                if bitmap is None:
+                    predicate = PREDICATES[name]
+                    bitmap = bitmap_from_flags(predicate(p) for p in self.prospects)
+                    self._bitmaps[name] = bitmap
+        return bitmap
+
+    def view(self, terms):
+        """AND of predicate terms; a leading '!' negates a term"""
+        result = self.all
+        for term in terms:
+            if term.startswith('!'):
+                result &= ~self.bitmap(term[1:])
+            else:
+                result &= self.bitmap(term)
+        return result
+
+    def value_bitmap(self, field, value):
+        """Bitmap of rows where field == value, or None if the field is not indexable"""
+        if field not in self._value_bitmaps:
+            with self._lock:
+                if field not in self._value_bitmaps:
+                    self._value_bitmaps[field] = self._build_value_bitmaps(field)
+        bitmaps = self._value_bitmaps[field]
+        if bitmaps is None:
+            return None
+        try:
+            return bitmaps.get(value, 0)
+        except TypeError:
+            return None
+
+    def _build_value_bitmaps(self, field):
+        # Low-cardinality fields only: a high-cardinality field would need
+        # one full-width int per value
+        positions = {}
+        try:
+            for row, prospect in enumerate(self.prospects):
+                positions.setdefault(prospect.get(field), []).append(row)
+                if len(positions) > MAX_VALUE_BITMAPS:
+                    return None
+        except TypeError:
+            return None
+        return {value: bitmap_from_positions(rows, self.size) for value, rows in positions.items()}
+
+    def cached_result(self, key):
+        """Previously computed filter bitmap for a cache key, or None"""
+        with self._lock:
+            bitmap = self._results.get(key)
+            if bitmap is not None:
+                self._results.move_to_end(key)
+            return bitmap
+
+    def cache_result(self, key, bitmap):
+        with self._lock:
+            self._results[key] = bitmap
+            while len(self._results) > RESULT_CACHE_SIZE:
+                self._results.popitem(last=False)
+
+    def date_index(self, field):
+        """Sorted index for a date field, built on first use"""
+        index = self._date_indexes.get(field)
+        if index is None:
+            with self._lock:
+                index = self._date_indexes.get(field)
+                if index is None:
+                    index = DateIndex(self.prospects, field)
+                    self._date_indexes[field] = index
+        return index
+
+    def range_bitmap(self, field, start_ts, end_ts):
+        """Rows whose date field falls within [start_ts, end_ts]"""
+        return self.date_index(field).range_bitmap(start_ts, end_ts)
+
+    def after_bitmap(self, field, cutoff_ts):
+        """Rows whose date field is later than cutoff_ts"""
+        index = self.date_index(field)
+        return index.range_bitmap(cutoff_ts + 1, index.sorted_ts[-1]) if index.size else 0
+
+    def count(self, bitmap):
+        return bitmap_count(bitmap)
+
+    def rows(self, bitmap, start=0, limit=None):
+        """Prospects selected by a bitmap, in list order"""
+        prospects = self.prospects
+        return [prospects[i] for i in bitmap_positions(bitmap, start, limit)]
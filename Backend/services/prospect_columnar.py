@@ -0,0 +1,126 @@
+import io
+import zipfile
+from operator import attrgetter
+from services.prospect_records import IssueRow, ProspectRecord
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    # Columnar export is optional; the routes report it as unavailable
+    pa = None
+
+COLUMNAR_FORMATS = {
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.file', 'arrow')
+}
+
+COLUMNAR_COMPRESSION = 'zstd'
+
+# String columns with at most this share of distinct values are dictionary encoded
+DICTIONARY_MAX_DISTINCT_RATIO = 0.5
+
+
+def columnar_available():
+    return pa is not None
+
+def _row_columns(rows):
+    # Column names of a detail row: its referenced fields, then rule extras
+    first = rows[0]
+    if hasattr(first, 'fields'):
+        return [field for field, _ in first.fields] + list(first.extras or ())
+    if hasattr(first, 'keys'):
+        return list(first.keys())
+    return []
+
+def _column_values(rows, names):
+    """Value lists for the named columns, using attribute access on compact rows"""
+    if all(type(row) is ProspectRecord for row in rows):
+        return {name: list(map(attrgetter(name), rows)) for name in names}
+    if all(type(row) is IssueRow and type(row.prospect) is ProspectRecord for row in rows):
+        prospects = list(map(attrgetter('prospect'), rows))
+        # Rows from one rule share their field tuple, so those columns map
+        # straight onto record attributes
+        shared_fields = rows[0].fields
+        if not all(row.fields is shared_fields for row in rows):
+            shared_fields = ()
+        field_names = {field for field, _ in shared_fields}
+        columns = {}
+        for name in names:
+            if name in field_names:
+                columns[name] = list(map(attrgetter(name), prospects))
+            else:
+                columns[name] = [row.get(name) for row in rows]
+        return columns
+    return {name: [row.get(name) for row in rows] for name in names}
+
+def section_columns(rows, section):
+    """Column name -> value list for one section, read straight from the rows"""
+    rows = rows if isinstance(rows, list) else list(rows)
+    if section == 'duplicates':
+        members, emails, counts = [], [], []
+        for group in rows:
+            group_members = group.get('prospects', [])
+            members.extend(group_members)
+            emails.extend([group.get('email')] * len(group_members))
+            counts.extend([group.get('count')] * len(group_members))
+        columns = section_columns(members, 'duplicate_members') if members else {}
+        columns['duplicateEmail'] = emails
+        columns['duplicateCount'] = counts
+        return columns
+    if not rows:
+        return {}
+    return _column_values(rows, _row_columns(rows))
+
+def _arrow_array(values):
+    try:
+        array = pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+        # Mixed types (e.g. numeric and "N/A" scores) are kept as strings
+        array = pa.array([None if v is None else str(v) for v in values], pa.string())
+    if pa.types.is_null(array.type):
+        return array.cast(pa.string())
+    if pa.types.is_string(array.type) and len(array):
+        distinct = pc.count_distinct(array).as_py()
+        if distinct <= len(array) * DICTIONARY_MAX_DISTINCT_RATIO:
+            return array.dictionary_encode()
+    return array
+
+def build_table(rows, section):
+    """Arrow table for one export section"""
+    columns = section_columns(rows, section)
+    return pa.table({name: _arrow_array(values) for name, values in columns.items()})
+
+def write_table(table, sink, export_format):
+    """Write a table to a binary sink as Parquet or Arrow IPC"""
+    if export_format == 'parquet':
+        pq.write_table(table, sink, compression=COLUMNAR_COMPRESSION, use_dictionary=True)
+    else:
+        options = pa.ipc.IpcWriteOptions(compression=COLUMNAR_COMPRESSION)
+        with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+            writer.write_table(table)
+
+def export_columnar(sections, export_format='parquet'):
+    """Return (buffer, mimetype, extension) for (section name, rows) pairs.
+
+    A single section is one file; several are zipped with one file each.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed; columnar export is unavailable")
+    mimetype, extension = COLUMNAR_FORMATS[export_format]
+
+    if len(sections) == 1:
+        buffer = io.BytesIO()
+        write_table(build_table(sections[0][1], sections[0][0]), buffer, export_format)
+        buffer.seek(0)
+        return buffer, mimetype, extension
+
+    buffer = io.BytesIO()
+    # Files are already compressed, so the archive only stores them
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:
+        for section, rows in sections:
+            file_buffer = io.BytesIO()
+            write_table(build_table(rows, section), file_buffer, export_format)
+            archive.writestr(f"{section}.{extension}", file_buffer.getvalue())
+    buffer.seek(0)
+    return buffer, 'application/zip', 'zip'
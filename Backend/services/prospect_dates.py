@@ -0,0 +1,59 @@
+import calendar
+from datetime import datetime
+try:
+    from dateutil import parser
+except ImportError:
+    parser = None
+
+# Stored in place of a missing or unparseable timestamp. Every range bound is
+# a real epoch value, so the sentinel never satisfies a date comparison.
+NO_TIMESTAMP = -1
+
+# ISO date fields normalized once at ingestion -> key holding epoch seconds
+TIMESTAMP_FIELDS = {
+    'lastActivityAt': 'lastActivityTs',
+    'createdAt': 'createdTs',
+    'updatedAt': 'updatedTs',
+    'firstAssignedAt': 'firstAssignedTs'
+}
+
+def datetime_to_epoch(value):
+    """Convert a datetime to epoch seconds, treating naive values as UTC"""
+    if value.tzinfo is None:
+        return calendar.timegm(value.timetuple())
+    return int(value.timestamp())
+
+def to_epoch(value):
+    """Parse an ISO date or datetime string into epoch seconds or NO_TIMESTAMP"""
+    if value is None:
+        return NO_TIMESTAMP
+    text = str(value).strip()
+    if not text:
+        return NO_TIMESTAMP
+    try:
+        if 'T' in text:
+            parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+        else:
+            parsed = datetime.strptime(text[:10], '%Y-%m-%d')
+    except ValueError:
+        if parser is None:
+            return NO_TIMESTAMP
+        try:
+            parsed = parser.parse(text)
+        except (ValueError, OverflowError):
+            return NO_TIMESTAMP
+    return datetime_to_epoch(parsed)
+
+def normalize_prospect_dates(prospect):
+    """Add epoch-second companions for every timestamp field of a prospect"""
+    for field, ts_field in TIMESTAMP_FIELDS.items():
+        prospect[ts_field] = to_epoch(prospect.get(field))
+    return prospect
+
+def prospect_timestamp(prospect, field):
+    """Epoch seconds for a prospect date field, parsing only if not normalized"""
+    ts = prospect.get(TIMESTAMP_FIELDS[field])
+    if ts is None:
+        # Prospects cached before normalization carry only the ISO string
+        ts = to_epoch(prospect.get(field))
+    return ts
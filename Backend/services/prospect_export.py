@@ -0,0 +1,102 @@
+import csv
+import io
+import json
+import zlib
+from services.prospect_records import to_json_default
+
+# Rows serialized per chunk handed to the response
+EXPORT_CHUNK_ROWS = 1000
+
+# Export type -> tab data list it reads
+EXPORT_SECTIONS = {
+    'all_prospects': 'all_prospects',
+    'duplicates': 'duplicates',
+    'inactive': 'inactive',
+    'missing_fields': 'missing_fields',
+    'scoring_issues': 'scoring_issues'
+}
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv')
+}
+
+
+def _plain(row):
+    return row.to_dict() if hasattr(row, 'to_dict') else row
+
+def flatten_duplicate_groups(groups):
+    """One export row per duplicate group member, tagged with the group email"""
+    for group in groups:
+        for member in group.get('prospects', []):
+            yield dict(_plain(member), duplicateEmail=group.get('email'), duplicateCount=group.get('count'))
+
+def iter_section_rows(rows, section):
+    """Plain dict rows for one section, without copying the section list"""
+    if section == 'duplicates':
+        return flatten_duplicate_groups(rows)
+    return (_plain(row) for row in rows)
+
+def ndjson_chunks(sections, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Encode (section name, rows) pairs as NDJSON, one bytes chunk per batch of rows.
+
+    With more than one section each line is {"section": ..., "data": row}.
+    """
+    tagged = len(sections) > 1
+    batch = []
+    for section, rows in sections:
+        for row in rows:
+            record = {'section': section, 'data': row} if tagged else row
+            batch.append(json.dumps(record, default=to_json_default))
+            if len(batch) >= chunk_rows:
+                yield ('\n'.join(batch) + '\n').encode('utf-8')
+                batch = []
+    if batch:
+        yield ('\n'.join(batch) + '\n').encode('utf-8')
+
+def _csv_value(value):
+    if isinstance(value, (list, tuple)):
+        return '; '.join(str(v) for v in value)
+    return value
+
+def csv_chunks(rows, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Encode dict rows as CSV; columns come from the first row"""
+    buffer = io.StringIO()
+    writer = None
+    written = 0
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(row), restval='', extrasaction='ignore')
+            writer.writeheader()
+        writer.writerow({key: _csv_value(value) for key, value in row.items()})
+        written += 1
+        if written % chunk_rows == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+def gzip_chunks(chunks, level=6):
+    """Gzip a stream of byte chunks incrementally"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    first = True
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if first:
+            # Push the first chunk out right away so the download starts
+            compressed += compressor.flush(zlib.Z_SYNC_FLUSH)
+            first = False
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def stream_export(sections, export_format='ndjson', compress=False):
+    """Byte chunks for an export of (section name, rows) pairs"""
+    if export_format == 'csv':
+        if len(sections) != 1:
+            raise ValueError("CSV export needs a single export type")
+        chunks = csv_chunks(sections[0][1])
+    else:
+        chunks = ndjson_chunks(sections)
+    return gzip_chunks(chunks) if compress else chunks
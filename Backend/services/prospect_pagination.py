@@ -0,0 +1,141 @@
+import base64
+import itertools
+import json
+import threading
+from bisect import bisect_left, bisect_right
+from services.prospect_dates import TIMESTAMP_FIELDS
+
+# Date columns sort on their pre-parsed epoch field instead of the ISO string
+SORT_FIELDS = dict(TIMESTAMP_FIELDS)
+
+# Dataset versions handed out to snapshots, so cursors can tell which build produced them
+_versions = itertools.count(1)
+
+
+class StaleCursorError(ValueError):
+    """A position cursor issued for an older version of the data"""
+
+
+def encode_cursor(version, column, order, sort_key):
+    """Opaque cursor holding the last row's sort key"""
+    raw = json.dumps([version, column, order, sort_key], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """Return (version, column, order, sort_key) or raise ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        version, column, order, sort_key = json.loads(base64.urlsafe_b64decode(padded))
+        return version, column, order, _as_tuple(sort_key)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+def _as_tuple(value):
+    # JSON turns the nested sort key tuples into lists
+    if isinstance(value, list):
+        return tuple(_as_tuple(v) for v in value)
+    return value
+
+def _value_key(value):
+    # Missing values sort after present ones; strings compare case-insensitively
+    if value is None or value == '':
+        return (2, '')
+    if isinstance(value, bool):
+        return (0, int(value))
+    if isinstance(value, (int, float)):
+        return (0, value)
+    return (1, str(value).lower())
+
+def row_identity(row):
+    """Tie-breaker that stays the same across dataset versions.
+
+    Prospect rows use their id; duplicate groups have none and use their
+    canonical email, which is unique among groups.
+    """
+    prospect_id = row.get('id')
+    if prospect_id is not None and prospect_id != '':
+        return (0, _value_key(prospect_id))
+    return (1, _value_key(row.get('email')))
+
+def row_sort_key(row, column):
+    """Total order key for a row: column value, then its identity"""
+    value = row.get(SORT_FIELDS.get(column, column))
+    return (_value_key(value), row_identity(row))
+
+
+class SortedTab:
+    """One tab's rows plus sort permutations built lazily per column"""
+    def __init__(self, rows):
+        self.rows = rows
+        self._orders = {}  # column -> (row permutation, sort keys in that order)
+        self._lock = threading.Lock()
+
+    def _order(self, column):
+        order = self._orders.get(column)
+        if order is None:
+            with self._lock:
+                order = self._orders.get(column)
+                if order is None:
+                    keys = [row_sort_key(row, column) for row in self.rows]
+                    permutation = sorted(range(len(keys)), key=keys.__getitem__)
+                    order = (permutation, [keys[i] for i in permutation])
+                    self._orders[column] = order
+        return order
+
+    def page(self, column=None, order='asc', start=0, limit=10, after=None):
+        """Return (rows, last sort key or None) for one page.
+
+        Without a column rows keep their stored order. `after` is the sort key
+        of the last row already seen; the page resumes right after it.
+        """
+        if not column:
+            end = start + limit
+            return self.rows[start:end], (end if end < len(self.rows) else None)
+
+        permutation, keys = self._order(column)
+        descending = order == 'desc'
+        if after is not None:
+            # Keyset seek: bisect for the cursor key, so page cost does not
+            # depend on how deep the page is or on rows added since
+            if descending:
+                stop = bisect_left(keys, after)
+                positions = range(stop - 1, max(stop - 1 - limit, -1), -1)
+            else:
+                begin = bisect_right(keys, after)
+                positions = range(begin, min(begin + limit, len(keys)))
+        elif descending:
+            stop = len(keys) - start
+            positions = range(stop - 1, max(stop - 1 - limit, -1), -1)
+        else:
+            positions = range(start, min(start + limit, len(keys)))
+
+        rows = [self.rows[permutation[i]] for i in positions]
+        more = bool(positions) and (positions[-1] > 0 if descending else positions[-1] < len(keys) - 1)
+        return rows, (keys[positions[-1]] if more else None)
+
+
+class ProspectSnapshot:
+    """Immutable view of one dataset version's tab lists"""
+    def __init__(self, tabs):
+        self.version = next(_versions)
+        self.tabs = {name: SortedTab(rows) for name, rows in tabs.items()}
+
+    def page(self, tab_name, column=None, order='asc', start=0, limit=10, cursor=None):
+        """Return (rows, total, next cursor or None) for one tab page"""
+        tab = self.tabs[tab_name]
+        after = None
+        if cursor:
+            version, cursor_column, cursor_order, after = decode_cursor(cursor)
+            if cursor_column != column or cursor_order != order:
+                raise ValueError("Cursor does not match the requested sort")
+            if not column:
+                # Unsorted tabs use the stored position as their key, which
+                # only means the same row within one version; sorted cursors
+                # hold (value, identity) keys and stay valid across versions
+                if version != self.version:
+                    raise StaleCursorError("The data changed since this cursor was issued; start again from the first page")
+                start, after = after, None
+
+        rows, last = tab.page(column, order, start, limit, after)
+        next_cursor = encode_cursor(self.version, column, order, last) if last is not None else None
+        return rows, len(tab.rows), next_cursor
@@ -0,0 +1,424 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from services.prospect_bitmaps import ProspectBitmapIndex, bitmap_from_positions, bitmap_positions
+from services.prospect_dates import datetime_to_epoch
+try:
+    from dateutil import parser
+except ImportError:
+    parser = None
+
+# Compiled plans kept across requests, keyed by spec hash
+PLAN_CACHE_SIZE = 256
+
+# View name -> predicate terms for ProspectBitmapIndex.view(). Both the
+# /filter-prospects names and the ProspectFilterService labels are accepted.
+VIEWS = {
+    'all_prospects': (),
+    'active_prospects': ('has_activity',),
+    'never_active_prospects': ('!has_activity',),
+    'assigned_prospects': ('has_assigned_to_id',),
+    'mailable_prospects': ('mailable',),
+    'prospects_not_in_salesforce': ('!in_salesforce',),
+    'unassigned_prospects': ('!has_assigned_to_id',),
+    "All Prospects": (),
+    "Active Prospects": (),
+    "Active Prospects For Review": ('needs_review',),
+    "Assigned Prospects": ('has_assigned_to',),
+    "Mailable Prospects": ('mailable_no_bounce',),
+    "My Prospects": ('my_prospect',),
+    "My Starred Prospects": ('starred',),
+    "Never Active Prospects": ('!has_activity',),
+    "Prospects Not In Salesforce": ('!in_salesforce',),
+    "Reviewed Prospects": ('reviewed',),
+    "Unassigned Prospects": ('!has_assigned_to',),
+    "Unmailable Prospects": ('!mailable_no_bounce',),
+    "Unsubscribed Prospects": ('do_not_email',),
+    "Paused Prospects": ('paused',),
+    "Undelivered Prospects": ('undelivered',)
+}
+
+# Views that also require activity within the last N days
+RECENT_ACTIVITY_VIEWS = {"Active Prospects": 30, "Active Prospects For Review": 30}
+
+# Date field names used by /filter-prospects and by ProspectFilterService
+DATE_FIELDS = {
+    'last_activity': 'lastActivityAt',
+    'created': 'createdAt',
+    'updated': 'updatedAt',
+    'first_assigned': 'firstAssignedAt',
+    "Last Activity": 'lastActivityAt',
+    "Created": 'createdAt',
+    "Updated": 'updatedAt',
+    "First Assigned": 'firstAssignedAt'
+}
+
+# ProspectFilterService time labels -> date presets
+TIME_LABELS = {
+    "Today": 'today',
+    "Yesterday": 'yesterday',
+    "Last 7 Days": 'rolling_7_days',
+    "Last Week": 'last_week_monday',
+    "This Month": 'this_month',
+    "Last Month": 'last_month',
+    "This Quarter": 'this_quarter',
+    "Last Quarter": 'last_quarter',
+    "This Year": 'this_year',
+    "Last Year": 'last_year',
+    "Custom": 'custom_exact'
+}
+
+# /filter-prospects views and date presets reported by facet_counts
+FACET_VIEWS = (
+    'all_prospects', 'active_prospects', 'never_active_prospects', 'assigned_prospects',
+    'mailable_prospects', 'prospects_not_in_salesforce', 'unassigned_prospects'
+)
+FACET_DATE_PRESETS = (
+    'today', 'yesterday', 'last_7_days', 'last_week', 'this_month', 'last_month',
+    'this_quarter', 'last_quarter', 'this_year', 'last_year'
+)
+
+# Rough share of rows a field predicate keeps, used to order row checks
+OPERATOR_SELECTIVITY = {
+    'eq': 0.05, 'in': 0.1, 'contains': 0.2, 'gt': 0.3, 'gte': 0.3, 'lt': 0.3,
+    'lte': 0.3, 'exists': 0.5, 'missing': 0.5, 'ne': 0.9
+}
+
+
+def _midnight(value):
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def _end_of_day(value):
+    return value.replace(hour=23, minute=59, second=59, microsecond=999999)
+
+def _quarter_start(value):
+    return _midnight(value.replace(month=((value.month - 1) // 3) * 3 + 1, day=1))
+
+def _parse_datetime(value):
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        if parser is None:
+            raise
+        return parser.parse(value)
+
+def resolve_date_preset(preset, now, start=None, end=None):
+    """Return (start, end) datetimes for a date preset, or None for no filtering"""
+    today = _midnight(now)
+    if preset == 'today':
+        return today, now
+    if preset == 'yesterday':
+        return today - timedelta(days=1), _end_of_day(now - timedelta(days=1))
+    if preset == 'last_7_days':
+        return today - timedelta(days=6), now
+    if preset == 'rolling_7_days':
+        return now - timedelta(days=7), now
+    if preset == 'last_week':
+        last_sunday = today - timedelta(days=(now.weekday() + 1) % 7 + 7)
+        return last_sunday, _end_of_day(last_sunday + timedelta(days=6))
+    if preset == 'last_week_monday':
+        last_monday = today - timedelta(days=now.weekday() + 7)
+        return last_monday, _end_of_day(last_monday + timedelta(days=6))
+    if preset == 'this_month':
+        return today.replace(day=1), now
+    if preset == 'last_month':
+        last_day = today.replace(day=1) - timedelta(days=1)
+        return last_day.replace(day=1), _end_of_day(last_day)
+    if preset == 'this_quarter':
+        return _quarter_start(now), now
+    if preset == 'last_quarter':
+        this_quarter = _quarter_start(now)
+        return _quarter_start(this_quarter - timedelta(days=1)), this_quarter - timedelta(microseconds=1)
+    if preset == 'this_year':
+        return today.replace(month=1, day=1), now
+    if preset == 'last_year':
+        return today.replace(year=now.year - 1, month=1, day=1), _end_of_day(now.replace(year=now.year - 1, month=12, day=31))
+    if preset in ('custom', 'custom_exact') and start and end:
+        start_date, end_date = _parse_datetime(start), _parse_datetime(end)
+        if preset == 'custom':
+            # Whole calendar days
+            return _midnight(start_date), _end_of_day(end_date)
+        return start_date, end_date
+    return None
+
+
+class DateRangeStep:
+    """Date field within a (possibly relative) range, answered by the date index"""
+    selectivity = 0.3
+
+    def __init__(self, field, preset, start=None, end=None, include_missing=False):
+        self.field = field
+        self.preset = preset
+        self.start = start
+        self.end = end
+        self.include_missing = include_missing
+
+    def resolve(self, now):
+        """Concrete (start ts, end ts), or None when the preset does not filter"""
+        date_range = resolve_date_preset(self.preset, now, self.start, self.end)
+        if date_range is None:
+            return None
+        return datetime_to_epoch(date_range[0]), datetime_to_epoch(date_range[1])
+
+    def bitmap(self, index, bounds):
+        if bounds is None:
+            return index.all
+        if self.field is None:
+            return 0
+        bitmap = index.range_bitmap(self.field, *bounds)
+        if self.include_missing:
+            # Prospects with no activity count as matching a last-activity range
+            bitmap |= index.view(('!has_activity',))
+        return bitmap
+
+
+class RecentActivityStep:
+    """Last activity within the past N days"""
+    selectivity = 0.3
+
+    def __init__(self, days):
+        self.days = days
+
+    def resolve(self, now):
+        return datetime_to_epoch(now - timedelta(days=self.days))
+
+    def bitmap(self, index, cutoff_ts):
+        return index.after_bitmap('lastActivityAt', cutoff_ts)
+
+
+class ViewStep:
+    """Named view: an AND of cached predicate bitmaps"""
+    selectivity = 0.5
+
+    def __init__(self, terms):
+        self.terms = terms
+
+    def resolve(self, now):
+        return None
+
+    def bitmap(self, index, _):
+        return index.view(self.terms)
+
+
+class FieldStep:
+    """Arbitrary field predicate ({field, op, value}); equality can use value bitmaps"""
+    def __init__(self, field, op, value=None):
+        if op not in OPERATOR_SELECTIVITY:
+            raise ValueError(f"Unsupported filter operator: {op}")
+        self.field = field
+        self.op = op
+        self.value = value
+        self.selectivity = OPERATOR_SELECTIVITY[op]
+        if op == 'in':
+            self.values = set(value or ())
+        if op == 'contains':
+            self.needle = str(value or '').lower()
+
+    def bitmap(self, index):
+        """Bitmap from per-value bitmaps, or None if the field has none"""
+        if self.op not in ('eq', 'in'):
+            return None
+        values = [self.value] if self.op == 'eq' else self.values
+        bitmap = 0
+        for value in values:
+            value_bitmap = index.value_bitmap(self.field, value)
+            if value_bitmap is None:
+                return None
+            bitmap |= value_bitmap
+        return bitmap
+
+    def matches(self, prospect):
+        value = prospect.get(self.field)
+        op = self.op
+        if op == 'eq':
+            return value == self.value
+        if op == 'ne':
+            return value != self.value
+        if op == 'in':
+            return value in self.values
+        if op == 'exists':
+            return bool(value)
+        if op == 'missing':
+            return not value
+        if op == 'contains':
+            return value is not None and self.needle in str(value).lower()
+        if value is None:
+            return False
+        try:
+            if op == 'gt':
+                return value > self.value
+            if op == 'gte':
+                return value >= self.value
+            if op == 'lt':
+                return value < self.value
+            return value <= self.value
+        except TypeError:
+            return False
+
+
+class TagStep:
+    """Prospect tags containing any of the given terms"""
+    selectivity = 0.2
+
+    def __init__(self, terms):
+        self.terms = terms
+
+    def bitmap(self, index):
+        return None
+
+    def matches(self, prospect):
+        tags = prospect.get('tags', [])
+        if isinstance(tags, str):
+            tags = [tags]
+        lowered = [tag.lower() for tag in tags or ()]
+        return any(term in tag for term in self.terms for tag in lowered)
+
+
+def normalize_spec(filters):
+    """Canonical filter spec from either the route or the filter service format"""
+    filters = filters or {}
+    spec = {'view': filters.get('view') or 'all_prospects', 'date': None, 'tags': [], 'fields': []}
+
+    if filters.get('time') not in (None, '', "All Time"):
+        activity = filters.get('activity') or "Last Activity"
+        spec['date'] = {
+            'field': DATE_FIELDS.get(activity),
+            'preset': TIME_LABELS.get(filters['time']),
+            'start': filters.get('customStartDate'),
+            'end': filters.get('customEndDate'),
+            'include_missing': activity == "Last Activity"
+        }
+    elif filters.get('date_range') not in (None, '', 'all_time'):
+        spec['date'] = {
+            'field': DATE_FIELDS.get(filters.get('date_field') or 'last_activity', 'lastActivityAt'),
+            'preset': filters['date_range'],
+            'start': filters.get('start_date'),
+            'end': filters.get('end_date'),
+            'include_missing': False
+        }
+
+    tags = filters.get('tags') or ''
+    if isinstance(tags, str):
+        tags = tags.split(',')
+    spec['tags'] = [t.strip().lower() for t in tags if t and t.strip()]
+
+    for predicate in filters.get('fields') or []:
+        spec['fields'].append({'field': predicate['field'], 'op': predicate.get('op', 'eq'), 'value': predicate.get('value')})
+    return spec
+
+def spec_hash(spec):
+    """Stable hash of a normalized filter spec"""
+    encoded = json.dumps(spec, sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
+class FilterPlan:
+    """Compiled filter: index-backed steps first, then row checks by selectivity"""
+    def __init__(self, spec):
+        self.spec = spec
+        self.key = spec_hash(spec)
+        # Steps answered entirely by bitmaps and date indexes
+        self.index_steps = []
+        terms = VIEWS.get(spec['view'], ())
+        if terms:
+            self.index_steps.append(ViewStep(terms))
+        if spec['view'] in RECENT_ACTIVITY_VIEWS:
+            self.index_steps.append(RecentActivityStep(RECENT_ACTIVITY_VIEWS[spec['view']]))
+        if spec['date']:
+            date = spec['date']
+            self.index_steps.append(DateRangeStep(date['field'], date['preset'], date['start'],
+                                                  date['end'], date['include_missing']))
+        # Steps that may need per-row checks, most selective first
+        self.row_steps = [FieldStep(**predicate) for predicate in spec['fields']]
+        if spec['tags']:
+            self.row_steps.append(TagStep(spec['tags']))
+        self.row_steps.sort(key=lambda step: step.selectivity)
+
+    def resolve(self, now=None):
+        """Concrete bounds for relative date steps; part of the result cache key"""
+        # Prospect timestamps are whole epoch seconds, so dropping microseconds
+        # loses no rows; rounding to the minute would drop the last minute's
+        # activity from ranges ending now
+        now = now or datetime.now().replace(microsecond=0)
+        return tuple(step.resolve(now) for step in self.index_steps)
+
+    def execute(self, index, now=None):
+        """Return the result bitmap over index.prospects"""
+        params = self.resolve(now)
+        cache_key = (self.key, params)
+        cached = index.cached_result(cache_key)
+        if cached is not None:
+            return cached
+
+        bitmap = index.all
+        for step, step_params in zip(self.index_steps, params):
+            bitmap &= step.bitmap(index, step_params)
+            if not bitmap:
+                break
+
+        # Row steps use value bitmaps when the field has them, otherwise
+        # check only the rows that survived the index steps
+        pending = []
+        for step in self.row_steps:
+            step_bitmap = step.bitmap(index) if bitmap else None
+            if step_bitmap is None:
+                pending.append(step)
+            else:
+                bitmap &= step_bitmap
+        if pending and bitmap:
+            prospects = index.prospects
+            positions = [i for i in bitmap_positions(bitmap)
+                         if all(step.matches(prospects[i]) for step in pending)]
+            bitmap = bitmap_from_positions(positions, index.size)
+
+        index.cache_result(cache_key, bitmap)
+        return bitmap
+
+
+_plan_cache = OrderedDict()
+_plan_lock = threading.Lock()
+
+def compile_filter(filters):
+    """Compiled FilterPlan for a filter dict, reused across requests by spec hash"""
+    spec = normalize_spec(filters)
+    key = spec_hash(spec)
+    with _plan_lock:
+        plan = _plan_cache.get(key)
+        if plan is not None:
+            _plan_cache.move_to_end(key)
+            return plan
+    plan = FilterPlan(spec)
+    with _plan_lock:
+        _plan_cache[key] = plan
+        while len(_plan_cache) > PLAN_CACHE_SIZE:
+            _plan_cache.popitem(last=False)
+    return plan
+
+def filter_bitmap(index, filters, now=None):
+    """Bitmap of the prospects in `index` matching a filter dict"""
+    return compile_filter(filters).execute(index, now)
+
+def run_filter(prospects, filters, index=None, now=None):
+    """Filtered prospect list; builds a throwaway index when none is supplied"""
+    index = index if index is not None else ProspectBitmapIndex(prospects)
+    return index.rows(filter_bitmap(index, filters, now))
+
+def facet_counts(index, view='all_prospects', date_field='last_activity', now=None):
+    """Counts for every view and every date preset (within `view`) via popcounts"""
+    if view not in VIEWS:
+        raise ValueError(f"Unknown view: {view}")
+    if date_field not in DATE_FIELDS:
+        raise ValueError(f"Unknown date field: {date_field}")
+    now = now or datetime.now().replace(microsecond=0)
+    field = DATE_FIELDS[date_field]
+    base = index.view(VIEWS[view])
+    date_counts = {}
+    for preset in FACET_DATE_PRESETS:
+        start, end = resolve_date_preset(preset, now)
+        date_counts[preset] = index.count(base & index.range_bitmap(field, datetime_to_epoch(start), datetime_to_epoch(end)))
+    return {
+        'views': {name: index.count(index.view(VIEWS[name])) for name in FACET_VIEWS},
+        'date_ranges': date_counts
+    }
@@ -0,0 +1,160 @@
+import sys
+from collections.abc import Sequence
+
+# Low-cardinality string fields shared across prospects via sys.intern
+INTERNED_FIELDS = ('country', 'grade', 'jobTitle')
+
+_MISSING = object()
+
+
+class ProspectRecord:
+    """Compact prospect with fixed slots instead of a per-record key dict"""
+    __slots__ = (
+        'id', 'email', 'firstName', 'lastName', 'company', 'country', 'jobTitle',
+        'lastActivityAt', 'score', 'grade', 'createdAt', 'updatedAt',
+        'firstAssignedAt', 'firstActivityAt', 'isDeleted', 'isDoNotEmail',
+        'optedOut', 'isStarred', 'isReviewed', 'assignedToId', 'userId',
+        'salesforceId', 'isEmailHardBounced', 'campaignId',
+        'lastActivityTs', 'createdTs', 'updatedTs', 'firstAssignedTs'
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            value = fields.get(name)
+            if name in INTERNED_FIELDS and type(value) is str:
+                value = sys.intern(value)
+            setattr(self, name, value)
+
+    @classmethod
+    def from_dict(cls, prospect):
+        """Build a record from a prospect dict (records are returned as-is)"""
+        if isinstance(prospect, cls):
+            return prospect
+        return cls(**prospect)
+
+    def get(self, key, default=None):
+        """dict.get equivalent so existing filters and rules work unchanged"""
+        if key in self.__slots__:
+            return getattr(self, key)
+        return default
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def keys(self):
+        return self.__slots__
+
+    def to_dict(self):
+        """Plain dict for JSON responses and cache storage"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class IssueRow:
+    """Audit detail row that references its prospect instead of copying it"""
+    __slots__ = ('prospect', 'fields', 'extras')
+
+    def __init__(self, prospect, fields, extras=None):
+        self.prospect = prospect
+        self.fields = fields          # shared tuple of (field, default) pairs
+        self.extras = extras          # rule-specific values, or None
+
+    def get(self, key, default=None):
+        if self.extras and key in self.extras:
+            return self.extras[key]
+        for field, field_default in self.fields:
+            if field == key:
+                return self.prospect.get(field, field_default)
+        return default
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def to_dict(self):
+        """Materialize the row for JSON responses and cache storage"""
+        row = {field: self.prospect.get(field, default) for field, default in self.fields}
+        if self.extras:
+            row.update(self.extras)
+        return row
+
+
+class IssueRows(Sequence):
+    """A rule's detail rows, kept as prospect indices and built when read.
+
+    Parallel audits return these instead of lists so the parent never
+    builds rows that no page, export or cache write asks for.
+    """
+    __slots__ = ('prospects', 'rule', 'ctx', 'indices', 'codes')
+
+    def __init__(self, prospects, rule, ctx, indices, codes):
+        self.prospects = prospects
+        self.rule = rule
+        self.ctx = ctx
+        self.indices = indices        # prospect index per row
+        self.codes = codes            # issue codes per row
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self._row(i) for i in range(*position.indices(len(self.indices)))]
+        if position < 0:
+            position += len(self.indices)
+        return self._row(position)
+
+    def _row(self, position):
+        return self.rule.detail(self.prospects[self.indices[position]], self.codes[position], self.ctx)
+
+    def to_dict(self):
+        """Materialized rows; lets json dumps hooks treat this like a list"""
+        return [self._row(position).to_dict() for position in range(len(self.indices))]
+
+
+def to_json_default(value):
+    """json.dumps default hook for records and detail rows"""
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+# Field tuples shared by every row rebuilt from the same JSON shape
+_row_fields = {}
+
+def compact_audit_results(results):
+    """Re-point JSON-loaded audit results at shared ProspectRecords"""
+    records = [ProspectRecord.from_dict(p) for p in results.get('all_prospects', [])]
+    by_id = {record.id: record for record in records}
+
+    def compact_row(row):
+        if not isinstance(row, dict):
+            return row
+        record = by_id.get(row.get('id'))
+        if record is None:
+            return row
+        referenced = tuple(key for key, value in row.items() if key in record and record.get(key) == value)
+        fields = _row_fields.setdefault(referenced, tuple((key, None) for key in referenced))
+        extras = {key: value for key, value in row.items() if key not in referenced} or None
+        return IssueRow(record, fields, extras)
+
+    compact = dict(results)
+    compact['all_prospects'] = records
+    for section in ('inactive_prospects', 'missing_fields', 'scoring_issues'):
+        if section in results:
+            compact[section] = dict(results[section], details=[compact_row(r) for r in results[section].get('details', [])])
+    if 'duplicates' in results:
+        compact['duplicates'] = dict(results['duplicates'], details=[
+            dict(group, prospects=[compact_row(m) for m in group.get('prospects', [])])
+            for group in results['duplicates'].get('details', [])
+        ])
+    return compact
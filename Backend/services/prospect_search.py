@@ -0,0 +1,175 @@
+import heapq
+import re
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+
+# Searchable fields and their ranking weight; a name match outranks a job title match
+SEARCH_FIELDS = (
+    ('email', 4, ('email',)),
+    ('name', 3, ('firstName', 'lastName')),
+    ('company', 2, ('company',)),
+    ('jobTitle', 1, ('jobTitle',))
+)
+
+# Match quality of a query word against an indexed token
+EXACT_MATCH = 3
+PREFIX_MATCH = 2
+SUBSTRING_MATCH = 1
+
+# Posting entries per candidate row above which a query word is checked
+# against the candidate rows instead of expanding its postings
+ROW_CHECK_RATIO = 50
+
+_token_split = re.compile(r'[\W_]+')
+
+
+def tokenize(text):
+    """Lowercase word tokens of a field value or query"""
+    return [t for t in _token_split.split(str(text or '').casefold()) if t]
+
+def _trigrams(token):
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+def match_quality(token, word):
+    """How well a query word matches a token (0 if it does not)"""
+    if token == word:
+        return EXACT_MATCH
+    if token.startswith(word):
+        return PREFIX_MATCH
+    # Words shorter than a trigram only match as prefixes
+    if len(word) >= 3 and word in token:
+        return SUBSTRING_MATCH
+    return 0
+
+
+class ProspectSearchIndex:
+    """Token index over prospect search fields with a trigram index over the vocabulary.
+
+    Prospects share most tokens (first names, companies, email domains), so
+    substring matching runs against the distinct tokens and each matching
+    token then expands to its row postings.
+    """
+    def __init__(self, prospects):
+        self.prospects = prospects
+        token_ids = {}
+        # field position -> token id -> row positions
+        postings = [defaultdict(lambda: array('i')) for _ in SEARCH_FIELDS]
+        # Field values repeat heavily (names, companies, titles), so tokenize each once
+        tokenized = {}
+        for row, prospect in enumerate(prospects):
+            for field_pos, (_, _, source_fields) in enumerate(SEARCH_FIELDS):
+                tokens = set()
+                for source in source_fields:
+                    value = prospect.get(source)
+                    value_tokens = tokenized.get(value)
+                    if value_tokens is None:
+                        value_tokens = tokenized[value] = tokenize(value)
+                    tokens.update(value_tokens)
+                for token in tokens:
+                    token_id = token_ids.setdefault(token, len(token_ids))
+                    postings[field_pos][token_id].append(row)
+
+        self.tokens = [None] * len(token_ids)
+        for token, token_id in token_ids.items():
+            self.tokens[token_id] = token
+        self.postings = [dict(field_postings) for field_postings in postings]
+
+        self.trigrams = defaultdict(list)
+        for token_id, token in enumerate(self.tokens):
+            for gram in _trigrams(token):
+                self.trigrams[gram].append(token_id)
+        # Vocabulary in sorted order for prefix lookups of short query words
+        self.sorted_vocab = sorted(self.tokens)
+        self._token_ids = token_ids
+        self._tokenized = tokenized
+
+    def _matching_tokens(self, word):
+        """Yield (token id, match quality) for indexed tokens containing word"""
+        if len(word) < 3:
+            start = bisect_left(self.sorted_vocab, word)
+            for token in self.sorted_vocab[start:]:
+                if not token.startswith(word):
+                    break
+                yield self._token_ids[token], EXACT_MATCH if token == word else PREFIX_MATCH
+            return
+
+        candidates = None
+        # Intersect the rarest trigrams first
+        for gram in sorted(_trigrams(word), key=lambda g: len(self.trigrams.get(g, ()))):
+            token_ids = self.trigrams.get(gram)
+            if not token_ids:
+                return
+            candidates = set(token_ids) if candidates is None else candidates.intersection(token_ids)
+            if not candidates:
+                return
+        for token_id in candidates:
+            quality = match_quality(self.tokens[token_id], word)
+            if quality:
+                yield token_id, quality
+
+    def _row_score(self, row, word):
+        # Best weighted match of a word in one row, read from the prospect itself
+        prospect = self.prospects[row]
+        best = 0
+        for _, weight, source_fields in SEARCH_FIELDS:
+            for source in source_fields:
+                value = prospect.get(source)
+                tokens = self._tokenized.get(value)
+                for token in (tokenize(value) if tokens is None else tokens):
+                    best = max(best, match_quality(token, word) * weight)
+        return best
+
+    def _word_scores(self, matches):
+        # row -> best weighted match of this word in any field. Postings are
+        # applied in ascending score order so dict.update keeps the best one.
+        weighted = []
+        for token_id, quality in matches:
+            for field_pos, (_, weight, _) in enumerate(SEARCH_FIELDS):
+                rows = self.postings[field_pos].get(token_id)
+                if rows:
+                    weighted.append((quality * weight, field_pos, token_id))
+        weighted.sort()
+        scores = {}
+        for score, field_pos, token_id in weighted:
+            scores.update(dict.fromkeys(self.postings[field_pos][token_id], score))
+        return scores
+
+    def search(self, query, start=0, limit=10):
+        """Return (matching prospects for one page, total matches), best first"""
+        words = tokenize(query)
+        if not words:
+            return [], 0
+
+        # Every query word has to match. Score the most selective word from
+        # its postings, then check the surviving rows for the other words
+        # directly rather than walking large posting lists.
+        estimated = []
+        for word in set(words):
+            matches = list(self._matching_tokens(word))
+            rows = sum(len(self.postings[f].get(token_id, ())) for token_id, _ in matches
+                       for f in range(len(SEARCH_FIELDS)))
+            if not rows:
+                return [], 0
+            estimated.append((rows, word, matches))
+        estimated.sort(key=lambda item: item[0])
+
+        totals = self._word_scores(estimated[0][2])
+        for rows, word, matches in estimated[1:]:
+            # Posting walks run in C, row checks in Python; only check rows
+            # directly when the postings are far larger than the candidates
+            if rows > ROW_CHECK_RATIO * len(totals):
+                scored = ((row, self._row_score(row, word)) for row in totals)
+                totals = {row: totals[row] + score for row, score in scored if score}
+            else:
+                scores = self._word_scores(matches)
+                totals = {row: total + scores[row] for row, total in totals.items() if row in scores}
+            if not totals:
+                return [], 0
+
+        ranking = lambda row: (-totals[row], row)
+        if start + limit < len(totals) // 4:
+            ranked = heapq.nsmallest(start + limit, totals, key=ranking)
+        else:
+            ranked = sorted(totals, key=ranking)
+        return [self.prospects[row] for row in ranked[start:start + limit]], len(totals)
@@ -1,8 +1,16 @@
 import requests
 import json
 from datetime import datetime, timedelta, timezone
-from collections import defaultdict
 from config.settings import BUSINESS_UNIT_ID
+from services.prospect_audit_rules import FusedAuditExecutor, AuditContext, get_rules
+from services.prospect_dates import normalize_prospect_dates
+from services.prospect_records import ProspectRecord
+from services.prospect_audit_spill import AuditSpillStore, SpillingAuditAccumulator
+from services.prospect_audit_parallel import run_parallel_audit
+from services.duplicate_detection import find_fuzzy_duplicates
+
+# Minutes of overlap re-fetched on each incremental refresh
+REFRESH_OVERLAP_MINUTES = 5
 
 def get_prospect_health(access_token):
     """Main function to get prospect health analysis"""
@@ -14,11 +22,41 @@ def get_prospect_health(access_token):
         print(f"Error in get_prospect_health: {str(e)}")
         raise e
 
+def get_prospect_health_streaming(access_token, spill_dir=None):
+    """Prospect health analysis with bounded memory for very large databases"""
+    try:
+        auditor = ProspectHealthAuditor(access_token, BUSINESS_UNIT_ID, "https://pi.pardot.com")
+        return auditor.stream_prospect_health_audit(spill_dir)
+    except Exception as e:
+        print(f"Error in get_prospect_health_streaming: {str(e)}")
+        raise e
+
+def refresh_prospect_health(access_token, state, synced_at):
+    """Apply prospect changes since the last sync to an incremental audit state"""
+    try:
+        auditor = ProspectHealthAuditor(access_token, BUSINESS_UNIT_ID, "https://pi.pardot.com")
+        now = datetime.now(timezone.utc)
+        # Overlap the window so records updated during the last sync are not missed
+        since = datetime.fromisoformat(synced_at) - timedelta(minutes=REFRESH_OVERLAP_MINUTES)
+        changes = auditor.get_prospect_changes(since.isoformat())
+        state.advance_clock(now)
+        changed = state.apply_changes(upserts=changes)
+        state.synced_at = now.isoformat()
+        # Tabs read the state directly, so nothing is rebuilt here
+        return {'synced_at': state.synced_at, 'changed_prospects': changed}
+    except Exception as e:
+        print(f"Error in refresh_prospect_health: {str(e)}")
+        raise e
+
 def find_duplicate_prospects(prospects):
     """Find prospects with duplicate email addresses"""
     auditor = ProspectHealthAuditor("", "", "")
     return auditor.find_duplicate_prospects(prospects)
 
+def find_fuzzy_duplicate_prospects(prospects):
+    """Find likely duplicates by canonical email or similar name and company"""
+    return find_fuzzy_duplicates(prospects)
+
 def find_inactive_prospects(prospects):
     """Find prospects with no activity in 90+ days"""
     auditor = ProspectHealthAuditor("", "", "")
@@ -103,23 +141,65 @@ class ProspectHealthAuditor:
         """Build minimal API parameters - filters now applied client-side"""
         params = {'limit': '1000'}  # Use max limit for efficiency
         
-        # No API filters applied - all filtering done client-side
+        # Incremental refreshes are the only filter pushed to the API:
+        # fetch records changed since the last sync, including deletions
+        if filters.get('updated_since'):
+            params['updatedAtAfterOrEqualTo'] = filters['updated_since']
+            params['deleted'] = 'all'
         
         return params
     
-    def get_all_prospects(self, max_records=10000, filters=None):
-        """Fetch all prospects once, then apply filters client-side"""
-        # If we already have cached data and no filters, return cached data
-        if hasattr(self, '_cached_prospects') and not filters:
-            return self._cached_prospects[:max_records]
+    def convert_prospect(self, prospect):
+        """Convert a raw API prospect into the compact audit format"""
+        # Safe conversion with null handling
+        score_val = prospect.get('score')
+        if score_val is None or str(score_val).lower() in ['none', '', 'null']:
+            score_val = 0
+        else:
+            try:
+                score_val = int(float(score_val))
+            except:
+                score_val = 0
         
-        all_prospects = []
+        prospect_id = self.safe_get_value(prospect, 'id')
+        
+        converted = {
+            'id': prospect_id,
+            'email': self.safe_get_value(prospect, 'email'),
+            'firstName': self.safe_get_value(prospect, 'firstName'),
+            'lastName': self.safe_get_value(prospect, 'lastName'),
+            'company': self.safe_get_value(prospect, 'company'),
+            'country': self.safe_get_value(prospect, 'country'),
+            'jobTitle': self.safe_get_value(prospect, 'jobTitle'),
+            'lastActivityAt': self.safe_get_value(prospect, 'lastActivityAt'),
+            'score': score_val,
+            'grade': self.safe_get_value(prospect, 'grade', 'D'),
+            'createdAt': self.safe_get_value(prospect, 'createdAt'),
+            'updatedAt': self.safe_get_value(prospect, 'updatedAt'),
+            'firstAssignedAt': self.safe_get_value(prospect, 'firstAssignedAt'),
+            'firstActivityAt': self.safe_get_value(prospect, 'firstActivityAt'),
+            'isDeleted': prospect.get('isDeleted', False),
+            'isDoNotEmail': prospect.get('isDoNotEmail', False),
+            'optedOut': prospect.get('optedOut', False),
+            'isStarred': prospect.get('isStarred', False),
+            'isReviewed': prospect.get('isReviewed', False),
+            'assignedToId': prospect.get('assignedToId'),
+            'userId': prospect.get('userId'),
+            'salesforceId': prospect.get('salesforceId'),
+            'isEmailHardBounced': prospect.get('isEmailHardBounced', False),
+            'campaignId': prospect.get('campaignId')
+        }
+        # Parse timestamps once here so filters compare integers, then pack
+        # into a slotted record to avoid a key dict per prospect
+        return ProspectRecord.from_dict(normalize_prospect_dates(converted))
+    
+    def iter_prospect_pages(self, max_records=None, filters=None):
+        """Yield converted prospects one API page at a time"""
         next_page_token = None
-        limit = 1000
+        fetched = 0
         
-        # Fetch all data without problematic individual API calls
-        while len(all_prospects) < max_records:
-            data = self.get_prospects(limit=limit, next_page_token=next_page_token, filters=None)
+        while max_records is None or fetched < max_records:
+            data = self.get_prospects(limit=1000, next_page_token=next_page_token, filters=filters)
             if not data or 'values' not in data:
                 break
             
@@ -127,65 +207,33 @@ class ProspectHealthAuditor:
             if not prospects:
                 break
             
-            all_prospects.extend(prospects)
+            page = []
+            for prospect in prospects:
+                try:
+                    page.append(self.convert_prospect(prospect))
+                except Exception as e:
+                    print(f"[DEBUG] Error processing prospect: {e}")
+                    continue
+            fetched += len(prospects)
+            yield page
             
             # Check for next page
             next_page_token = data.get('nextPageToken')
             if not next_page_token:
                 break
-                
-            if len(all_prospects) % 2000 == 0:
-                print(f"[DEBUG] Fetched {len(all_prospects)} prospects so far...")
+            
+            if fetched % 2000 == 0:
+                print(f"[DEBUG] Fetched {fetched} prospects so far...")
+    
+    def get_all_prospects(self, max_records=None, filters=None):
+        """Fetch all prospects once, then apply filters client-side"""
+        # If we already have cached data and no filters, return cached data
+        if hasattr(self, '_cached_prospects') and not filters:
+            return self._cached_prospects[:max_records]
         
-        # Convert prospects
         converted_prospects = []
-        
-        print(f"\n=== PROCESSING {len(all_prospects)} PROSPECTS ===\n")
-        
-        for prospect in all_prospects:
-            try:
-                # Safe conversion with null handling
-                score_val = prospect.get('score')
-                if score_val is None or str(score_val).lower() in ['none', '', 'null']:
-                    score_val = 0
-                else:
-                    try:
-                        score_val = int(float(score_val))
-                    except:
-                        score_val = 0
-                
-                prospect_id = self.safe_get_value(prospect, 'id')
-                
-                converted_prospects.append({
-                    'id': prospect_id,
-                    'email': self.safe_get_value(prospect, 'email'),
-                    'firstName': self.safe_get_value(prospect, 'firstName'),
-                    'lastName': self.safe_get_value(prospect, 'lastName'),
-                    'company': self.safe_get_value(prospect, 'company'),
-                    'country': self.safe_get_value(prospect, 'country'),
-                    'jobTitle': self.safe_get_value(prospect, 'jobTitle'),
-                    'lastActivityAt': self.safe_get_value(prospect, 'lastActivityAt'),
-                    'score': score_val,
-                    'grade': self.safe_get_value(prospect, 'grade', 'D'),
-                    'createdAt': self.safe_get_value(prospect, 'createdAt'),
-                    'updatedAt': self.safe_get_value(prospect, 'updatedAt'),
-                    'firstAssignedAt': self.safe_get_value(prospect, 'firstAssignedAt'),
-                    'firstActivityAt': self.safe_get_value(prospect, 'firstActivityAt'),
-                    'isDeleted': prospect.get('isDeleted', False),
-                    'isDoNotEmail': prospect.get('isDoNotEmail', False),
-                    'optedOut': prospect.get('optedOut', False),
-                    'isStarred': prospect.get('isStarred', False),
-                    'isReviewed': prospect.get('isReviewed', False),
-                    'assignedToId': prospect.get('assignedToId'),
-                    'userId': prospect.get('userId'),
-                    'salesforceId': prospect.get('salesforceId'),
-                    'isEmailHardBounced': prospect.get('isEmailHardBounced', False),
-                    'campaignId': prospect.get('campaignId')
-                })
-                    
-            except Exception as e:
-                print(f"[DEBUG] Error processing prospect: {e}")
-                continue
+        for page in self.iter_prospect_pages(max_records):
+            converted_prospects.extend(page)
         
         print(f"\n=== FINAL SUMMARY ===")
         print(f"Total prospects processed: {len(converted_prospects)}")
@@ -196,179 +244,39 @@ class ProspectHealthAuditor:
         
         return converted_prospects[:max_records]
     
+    def get_prospect_changes(self, updated_since):
+        """Fetch prospects created, updated or deleted since an ISO timestamp"""
+        changes = []
+        for page in self.iter_prospect_pages(filters={'updated_since': updated_since}):
+            changes.extend(page)
+        print(f"[DEBUG] Fetched {len(changes)} changed prospects since {updated_since}")
+        return changes
+    
+    def run_audit_rules(self, prospects, rule_names=None, shards=1, parallel=False):
+        """Evaluate audit rules over the prospects in a single fused pass"""
+        if parallel:
+            return run_parallel_audit(prospects, rule_names)
+        executor = FusedAuditExecutor(get_rules(rule_names))
+        return executor.run(prospects, shards=shards)
+    
     def find_duplicate_prospects(self, prospects):
         """Find prospects with duplicate email addresses"""
-        email_counts = defaultdict(list)
-        
-        # Group prospects by email
-        for prospect in prospects:
-            email = prospect.get('email', '').lower().strip()
-            if email and email != 'n/a':
-                email_counts[email].append(prospect)
-        
-        # Find duplicates
-        duplicates = []
-        for email, prospect_list in email_counts.items():
-            if len(prospect_list) > 1:
-                duplicates.append({
-                    'email': email,
-                    'count': len(prospect_list),
-                    'prospects': [{
-                        'id': p.get('id'),
-                        'firstName': p.get('firstName', ''),
-                        'lastName': p.get('lastName', ''),
-                        'createdAt': p.get('createdAt', '')
-                    } for p in prospect_list]
-                })
-        
-        return duplicates
+        return self.run_audit_rules(prospects, ['duplicates'])['duplicates']
     
     def find_inactive_prospects(self, prospects, days=90):
         """Find prospects with no activity in specified days"""
-        cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
-        inactive_prospects = []
-        
-        for prospect in prospects:
-            last_activity = prospect.get('lastActivityAt')
-            if last_activity and str(last_activity).strip():
-                try:
-                    # Handle different date formats
-                    if 'T' in str(last_activity):
-                        activity_date = datetime.fromisoformat(str(last_activity).replace('Z', '+00:00'))
-                    else:
-                        # Make naive datetime timezone-aware
-                        activity_date = datetime.strptime(str(last_activity), '%Y-%m-%d')
-                        activity_date = activity_date.replace(tzinfo=timezone.utc)
-                    
-                    # Ensure both dates are timezone-aware
-                    if activity_date.tzinfo is None:
-                        activity_date = activity_date.replace(tzinfo=timezone.utc)
-                    
-                    if activity_date < cutoff_date:
-                        days_diff = (datetime.now(timezone.utc) - activity_date).days
-                        inactive_prospects.append({
-                            'id': prospect.get('id'),
-                            'email': prospect.get('email'),
-                            'firstName': prospect.get('firstName', ''),
-                            'lastName': prospect.get('lastName', ''),
-                            'company': prospect.get('company', ''),
-                            'lastActivityAt': str(last_activity),
-                            'daysInactive': days_diff
-                        })
-                except Exception as e:
-                    print(f"[DEBUG] Date parsing error for {prospect.get('email')}: {e}")
-                    # If date parsing fails, consider as inactive
-                    inactive_prospects.append({
-                        'id': prospect.get('id'),
-                        'email': prospect.get('email'),
-                        'firstName': prospect.get('firstName', ''),
-                        'lastName': prospect.get('lastName', ''),
-                        'company': prospect.get('company', ''),
-                        'lastActivityAt': 'Invalid date',
-                        'daysInactive': 'Unknown'
-                    })
-            else:
-                # No activity recorded
-                inactive_prospects.append({
-                    'id': prospect.get('id'),
-                    'email': prospect.get('email'),
-                    'firstName': prospect.get('firstName', ''),
-                    'lastName': prospect.get('lastName', ''),
-                    'company': prospect.get('company', ''),
-                    'lastActivityAt': None,
-                    'daysInactive': 'Never'
-                })
-        
-        return inactive_prospects
+        executor = FusedAuditExecutor(get_rules(['inactive_prospects']), AuditContext(inactive_days=days))
+        return executor.run(prospects)['inactive_prospects']
     
     def find_missing_critical_fields(self, prospects):
         """Find prospects missing critical fields"""
-        critical_fields = ['firstName', 'lastName', 'company', 'jobTitle', 'country']
-        missing_fields = []
-        
-        for prospect in prospects:
-            try:
-                missing = []
-                for field in critical_fields:
-                    field_value = prospect.get(field, '')
-                    # Check if field is empty, None, or contains placeholder values
-                    if (not field_value or 
-                        str(field_value).strip() == '' or 
-                        str(field_value).lower().strip() in ['none', 'null', 'n/a', 'undefined']):
-                        missing.append(field)
-                
-                if missing:
-                    missing_fields.append({
-                        'id': prospect.get('id', ''),
-                        'email': prospect.get('email', 'N/A'),
-                        'firstName': prospect.get('firstName', ''),
-                        'lastName': prospect.get('lastName', ''),
-                        'company': prospect.get('company', ''),
-                        'missingFields': missing
-                    })
-            except Exception as e:
-                print(f"[DEBUG] Error processing missing fields for prospect: {e}")
-                continue
-        
+        missing_fields = self.run_audit_rules(prospects, ['missing_fields'])['missing_fields']
         print(f"[DEBUG] Found {len(missing_fields)} prospects with missing fields")
         return missing_fields
     
     def find_scoring_issues(self, prospects):
         """Find prospects with scoring inconsistencies"""
-        scoring_issues = []
-        
-        for prospect in prospects:
-            try:
-                score = prospect.get('score', 0)
-                grade = prospect.get('grade', 'D')
-                last_activity = prospect.get('lastActivityAt')
-                
-                issues = []
-                
-                # Check for score/grade mismatch
-                if score >= 100 and grade in ['D', 'F']:
-                    issues.append('High score with low grade')
-                elif score <= 10 and grade in ['A', 'B']:
-                    issues.append('Low score with high grade')
-                
-                # Check for active prospects with very low scores
-                if last_activity and score == 0:
-                    issues.append('Active prospect with zero score')
-                
-                # Check for prospects with negative scores
-                if score < 0:
-                    issues.append('Negative score')
-                
-                # Check for prospects with extremely high scores
-                if score > 1000:
-                    issues.append('Unusually high score')
-                
-                # Check for grade without corresponding score range
-                if grade == 'A' and score < 75:
-                    issues.append('Grade A with score below 75')
-                elif grade == 'B' and (score < 50 or score >= 75):
-                    issues.append('Grade B with score outside 50-74 range')
-                elif grade == 'C' and (score < 25 or score >= 50):
-                    issues.append('Grade C with score outside 25-49 range')
-                elif grade == 'D' and score >= 25:
-                    issues.append('Grade D with score above 24')
-                
-                if issues:
-                    scoring_issues.append({
-                        'id': prospect.get('id', ''),
-                        'email': prospect.get('email', 'N/A'),
-                        'firstName': prospect.get('firstName', ''),
-                        'lastName': prospect.get('lastName', ''),
-                        'company': prospect.get('company', ''),
-                        'score': score,
-                        'grade': grade,
-                        'lastActivityAt': last_activity,
-                        'issues': issues
-                    })
-            except Exception as e:
-                print(f"[DEBUG] Error processing scoring for prospect: {e}")
-                continue
-        
+        scoring_issues = self.run_audit_rules(prospects, ['scoring_issues'])['scoring_issues']
         print(f"[DEBUG] Found {len(scoring_issues)} prospects with scoring issues")
         return scoring_issues
     
@@ -380,6 +288,7 @@ class ProspectHealthAuditor:
         
         # Fetch all prospects (cached after first call)
         print("Fetching prospects...")
+        synced_at = datetime.now(timezone.utc).isoformat()
         prospects = self.get_all_prospects(filters=filters)
         
         if not prospects:
@@ -395,11 +304,12 @@ class ProspectHealthAuditor:
         total_fetched = len(prospects)
         print(f"Analyzing {total_fetched:,} prospects...")
         
-        # Run all audits
-        duplicates = self.find_duplicate_prospects(prospects)
-        inactive = self.find_inactive_prospects(prospects)
-        missing = self.find_missing_critical_fields(prospects)
-        scoring_issues = self.find_scoring_issues(prospects)
+        # Run all audit rules in one pass, sharded across cores when large
+        rule_results = self.run_audit_rules(prospects, parallel=True)
+        duplicates = rule_results['duplicates']
+        inactive = rule_results['inactive_prospects']
+        missing = rule_results['missing_fields']
+        scoring_issues = rule_results['scoring_issues']
         
         print(f"[DEBUG] Duplicates found: {len(duplicates)}")
         print(f"[DEBUG] Inactive prospects: {len(inactive)}")
@@ -424,8 +334,38 @@ class ProspectHealthAuditor:
                 'count': len(scoring_issues),
                 'details': scoring_issues
             },
-            'all_prospects': prospects  # Cache all prospects for filtering
+            'all_prospects': prospects,  # Cache all prospects for filtering
+            'synced_at': synced_at  # Starting point for incremental refreshes
         }
         
         print(f"Audit completed successfully - {total_fetched:,} prospects analyzed")
-        return audit_results
\ No newline at end of file
+        return audit_results
+    
+    def stream_prospect_health_audit(self, spill_dir=None):
+        """Run the health audit page by page with detail rows spilled to disk"""
+        print("Starting streaming Prospect Database Health Audit...")
+        executor = FusedAuditExecutor(get_rules())
+        store = AuditSpillStore(spill_dir)
+        acc = SpillingAuditAccumulator(executor.rules, executor.ctx, store)
+        
+        try:
+            for page in self.iter_prospect_pages():
+                for prospect in page:
+                    acc.add(prospect)
+                acc.flush()
+            counts = acc.results()
+        except Exception:
+            store.close()
+            raise
+        
+        print(f"Streaming audit completed - {acc.total:,} prospects analyzed")
+        
+        return {
+            'total_prospects': acc.total,
+            'active_prospects': acc.active,
+            'duplicates': {'count': counts['duplicates']},
+            'inactive_prospects': {'count': counts['inactive_prospects']},
+            'missing_fields': {'count': counts['missing_fields']},
+            'scoring_issues': {'count': counts['scoring_issues']},
+            'store': store  # Detail rows are paged from here; caller closes it
+        }
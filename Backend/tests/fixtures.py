@@ -0,0 +1,49 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+# Fixed clock so every test sees the same inactivity cutoffs
+NOW = datetime(2026, 6, 15, 12, 0, tzinfo=timezone.utc)
+
+
+def make_prospects(count, seed=1, now=NOW):
+    """Deterministic prospect dicts shaped like ProspectHealthAuditor.convert_prospect output"""
+    rng = random.Random(seed)
+    prospects = []
+    for i in range(count):
+        last_activity = rng.choice([
+            '', '', 'garbage',
+            (now - timedelta(days=rng.randint(0, 400), seconds=rng.randint(0, 86399))).isoformat().replace('+00:00', 'Z'),
+            (now - timedelta(days=rng.randint(0, 400))).strftime('%Y-%m-%d')
+        ])
+        prospects.append({
+            'id': str(i),
+            'email': rng.choice([
+                f"u{rng.randint(0, count // 3)}@example.com",
+                f" U{rng.randint(0, count // 3)}@Example.com ",
+                '',
+                f"a+{i}@example.org"
+            ]),
+            'firstName': rng.choice(['Ann', 'Bob', 'Cara', '', 'n/a']),
+            'lastName': rng.choice(['Xu', 'Young', 'Zeller', '']),
+            'company': rng.choice(['Acme', 'Globex', '', 'null']),
+            'country': rng.choice(['US', 'UK', '']),
+            'jobTitle': rng.choice(['CEO', 'Engineer', '']),
+            'lastActivityAt': last_activity,
+            'score': rng.choice([0, 5, 30, 60, 80, 120, -1, 2000]),
+            'grade': rng.choice(['A', 'B', 'C', 'D', 'F']),
+            'createdAt': (now - timedelta(days=rng.randint(0, 900), seconds=rng.randint(0, 86399))).isoformat(),
+            'updatedAt': (now - timedelta(days=rng.randint(0, 30), seconds=rng.randint(0, 86399))).isoformat(),
+            'firstAssignedAt': rng.choice(['', (now - timedelta(days=rng.randint(0, 90))).isoformat()]),
+            'firstActivityAt': '',
+            'isDeleted': False,
+            'isDoNotEmail': rng.random() < 0.2,
+            'optedOut': rng.random() < 0.1,
+            'isStarred': rng.random() < 0.1,
+            'isReviewed': rng.random() < 0.3,
+            'assignedToId': rng.choice([None, 5]),
+            'userId': None,
+            'salesforceId': rng.choice([None, 'sf']),
+            'isEmailHardBounced': False,
+            'campaignId': None
+        })
+    return prospects
@@ -0,0 +1,127 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+from services import activity_store, email_rollups, first_activity
+from services.activity_store import LAKE_STREAM, get_activity_store, sync_activity_lake
+from services.email_rollups import get_email_rollups
+from services.first_activity import get_first_activity_index
+from services.form_service import partition_form_activities
+from tests.test_email_rollups import naive_email_stats
+from tests.test_email_stats import make_activities
+from tests.test_first_activity import naive_first_activity
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+        self.text = str(payload)
+
+    def json(self):
+        return self.payload
+
+
+class FakeActivityApi:
+    """Pardot v4 visitor activity query: every type, ascending, created_after and offset paging"""
+    def __init__(self, activities):
+        self.activities = activities
+        self.requests = []
+        self.fail_at_offset = None
+
+    def get(self, url, headers=None, params=None):
+        self.requests.append(dict(params))
+        if params['offset'] == self.fail_at_offset:
+            return FakeResponse('unavailable', status_code=503)
+        created_after = params.get('created_after')
+        rows = sorted(
+            (a for a in self.activities if not created_after or a['created_at'] > created_after),
+            key=lambda a: a['created_at']
+        )
+        page = rows[params['offset']:params['offset'] + params['limit']]
+        # The v4 API returns a lone result as an object instead of a list
+        return FakeResponse({'result': {'visitor_activity': page[0] if len(page) == 1 else page}})
+
+
+def lake_activities(count, seed):
+    """Dated email, form and landing page activities mixed in one stream, oldest first"""
+    activities = sorted((a for a in make_activities(count, seed=seed) if a['created_at']), key=lambda a: a['created_at'])
+    for position, activity in enumerate(activities):
+        kind = position % 3
+        if kind:
+            activity['list_email_id'] = None
+            activity['type'] = (2, 4, 1, 6)[position % 4]
+            activity['form_id' if kind == 1 else 'landing_page_id'] = position % 40 + 1
+    return activities
+
+
+class ActivityLakeTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.activities = lake_activities(3000, seed=48)
+        self.api = FakeActivityApi(self.activities[:2000])
+        patches = [
+            mock.patch.object(activity_store, 'ACTIVITY_STORE_PATH', os.path.join(self.tmp.name, 'lake.sqlite')),
+            mock.patch.object(activity_store, 'MIN_SYNC_INTERVAL_SECONDS', 0),
+            mock.patch.object(activity_store, '_stores', {}),
+            mock.patch.object(activity_store.requests, 'get', self.api.get),
+            mock.patch.object(email_rollups, '_rollups', {}),
+            mock.patch.object(first_activity, '_indexes', {}),
+            redirect_stdout(io.StringIO()),
+        ]
+        for patch in patches:
+            patch.__enter__()
+            self.addCleanup(patch.__exit__, None, None, None)
+        self.addCleanup(self.tmp.cleanup)
+
+    def tearDown(self):
+        for store in activity_store._stores.values():
+            store._conn.close()
+
+    def test_one_crawl_feeds_every_reader(self):
+        store = sync_activity_lake({})
+        # Every request is the all-types query; none filters by type
+        self.assertEqual({tuple(sorted(params)) for params in self.api.requests},
+                         {('format', 'limit', 'offset', 'sort_by', 'sort_order')})
+        self.assertIs(store, get_activity_store())
+        self.assertEqual(len(store._listeners[LAKE_STREAM]), 2)
+        rollups, index = get_email_rollups(store), get_first_activity_index(store)
+
+        first = self.activities[:2000]
+        self.assertEqual(rollups.email_stats(), naive_email_stats(first))
+        self.assertEqual(index.first_activity_at(range(1, 401)), naive_first_activity(first, set(range(1, 401))))
+
+        self.api.activities = self.activities
+        self.api.requests.clear()
+        sync_activity_lake({})
+        watermark = max(a['created_at'] for a in first)
+        self.assertTrue(all(params['created_after'] < watermark for params in self.api.requests))
+        self.assertEqual(rollups.email_stats(), naive_email_stats(self.activities))
+        self.assertEqual(index.first_activity_at(range(1, 401)), naive_first_activity(self.activities, set(range(1, 401))))
+
+        forms = partition_form_activities(store.activities(LAKE_STREAM, present=('form_id',)))
+        for form_id in (1, 2, 17):
+            expected = [a for a in self.activities if a.get('form_id') == form_id]
+            self.assertEqual(sum(len(rows) for rows in forms[str(form_id)].values()), len(expected))
+
+    def test_failed_page_is_retried_on_the_next_request(self):
+        self.api.fail_at_offset = 400
+        store = sync_activity_lake({})
+        self.assertEqual(len(store.activities(LAKE_STREAM)), 400)
+        self.assertIsNone(store.watermark(LAKE_STREAM)[1])
+
+        self.api.fail_at_offset = None
+        sync_activity_lake({})
+        self.assertEqual(len(store.activities(LAKE_STREAM)), 2000)
+        self.assertEqual(get_email_rollups(store).email_stats(), naive_email_stats(self.activities[:2000]))
+
+    def test_lone_result_object(self):
+        self.api.activities = self.activities[:1]
+        store = sync_activity_lake({})
+        self.assertEqual([row['id'] for row in store.activities(LAKE_STREAM)], [str(self.activities[0]['id'])])
+
+
+if __name__ == '__main__':
+    unittest.main()
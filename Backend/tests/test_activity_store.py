@@ -0,0 +1,182 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+from services import activity_store
+from services.activity_store import ActivityStore, created_at_bound
+from tests.test_email_stats import make_activities
+
+
+class ActivityStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = self.open_store()
+        self.stdout = redirect_stdout(io.StringIO())
+        self.stdout.__enter__()
+
+    def tearDown(self):
+        self.stdout.__exit__(None, None, None)
+        self.store._conn.close()
+        self.tmp.cleanup()
+
+    def open_store(self, business_unit='bu'):
+        return ActivityStore(os.path.join(self.tmp.name, 'activities.sqlite'), business_unit=business_unit)
+
+
+class Upstream:
+    """Fake activity API: serves stored activities created after a bound, oldest first"""
+    def __init__(self, activities, page_size=300, fail_after_pages=None):
+        self.activities = list(activities)
+        self.page_size = page_size
+        self.fail_after_pages = fail_after_pages
+        self.requests = []
+
+    def __call__(self, created_after):
+        self.requests.append(created_after)
+        rows = sorted(
+            (a for a in self.activities if created_after is None or (a['created_at'] or '') > created_after),
+            key=lambda a: a['created_at'] or ''
+        )
+        for number, start in enumerate(range(0, len(rows), self.page_size)):
+            if self.fail_after_pages is not None and number >= self.fail_after_pages:
+                raise RuntimeError('upstream failed')
+            yield rows[start:start + self.page_size]
+
+
+def dated(activities):
+    return [a for a in activities if a['created_at']]
+
+def ids(rows):
+    return sorted(int(row['id']) for row in rows)
+
+
+class ActivityStoreSyncTest(ActivityStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.activities = dated(make_activities(2000, seed=42))
+        self.activities.sort(key=lambda a: a['created_at'])
+
+    def test_delta_sync_fetches_from_the_watermark(self):
+        upstream = Upstream(self.activities[:1200])
+        self.assertEqual(self.store.sync('lake', upstream), 1200)
+        watermark, synced_at = self.store.watermark('lake')
+        self.assertEqual(watermark, self.activities[1199]['created_at'])
+        self.assertIsNotNone(synced_at)
+
+        upstream.activities = self.activities
+        self.assertEqual(self.store.sync('lake', upstream, force=True), len(self.activities) - 1200)
+        # The second crawl starts WATERMARK_OVERLAP_SECONDS before the watermark
+        self.assertEqual(upstream.requests, [None, activity_store._overlap_start(watermark)])
+        self.assertLess(upstream.requests[1], watermark)
+        self.assertEqual(ids(self.store.activities('lake')), ids(self.activities))
+
+    def test_recent_sync_is_not_repeated(self):
+        upstream = Upstream(self.activities)
+        self.store.sync('lake', upstream)
+        self.assertEqual(self.store.sync('lake', upstream), 0)
+        self.assertEqual(len(upstream.requests), 1)
+        with mock.patch.object(activity_store, 'MIN_SYNC_INTERVAL_SECONDS', 0):
+            self.store.sync('lake', upstream)
+        self.assertEqual(len(upstream.requests), 2)
+
+    def test_failed_crawl_keeps_completed_pages_and_resumes(self):
+        upstream = Upstream(self.activities, fail_after_pages=2)
+        self.assertEqual(self.store.sync('lake', upstream), 600)
+        watermark, synced_at = self.store.watermark('lake')
+        self.assertEqual(watermark, self.activities[599]['created_at'])
+        # Not stamped, so the next request retries without waiting
+        self.assertIsNone(synced_at)
+
+        upstream.fail_after_pages = None
+        self.assertEqual(self.store.sync('lake', upstream), len(self.activities) - 600)
+        self.assertEqual(ids(self.store.activities('lake')), ids(self.activities))
+
+    def test_failing_listener_rolls_back_its_page(self):
+        pages = []
+
+        def listener(conn, activities):
+            pages.append(len(activities))
+            if len(pages) == 3:
+                raise RuntimeError('listener failed')
+
+        self.store.add_listener('lake', listener)
+        self.store.sync('lake', Upstream(self.activities))
+        self.assertEqual(len(self.store.activities('lake')), 600)
+        self.assertEqual(self.store.watermark('lake')[0], self.activities[599]['created_at'])
+
+    def test_listeners_see_only_new_rows(self):
+        seen = []
+        self.store.add_listener('lake', lambda conn, activities: seen.extend(activities))
+        self.store.sync('lake', Upstream(self.activities[:500]))
+        self.store.sync('lake', Upstream(self.activities), force=True)
+        self.assertEqual(ids(seen), ids(self.activities))
+
+    def test_streams_and_business_units_are_separate(self):
+        self.store.add_activities('lake', self.activities[:100])
+        self.store.add_activities('other', self.activities[:50])
+        other_unit = self.open_store('other-bu')
+        try:
+            other_unit.add_activities('lake', self.activities[:10])
+            self.assertEqual(len(other_unit.activities('lake')), 10)
+        finally:
+            other_unit._conn.close()
+        self.assertEqual(len(self.store.activities('lake')), 100)
+        self.assertEqual(len(self.store.activities('other')), 50)
+
+
+class ActivityStoreQueryTest(ActivityStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.activities = make_activities(2000, seed=7)
+        self.store.add_activities('lake', self.activities)
+
+    def naive(self, created_after=None, created_before=None, types=None, present=()):
+        created_after, created_before = created_at_bound(created_after), created_at_bound(created_before)
+        return [
+            a for a in self.activities
+            if (not created_after or (a['created_at'] and a['created_at'] > created_after))
+            and (not created_before or (a['created_at'] and a['created_at'] < created_before))
+            and (not types or a['type'] in types)
+            and all(a.get(field) is not None for field in present)
+        ]
+
+    def test_windows_match_a_scan(self):
+        cases = (
+            {},
+            {'created_after': '2026-02-01 00:00:00'},
+            {'created_before': '2026-02-01'},
+            {'created_after': '2026-01-10T08:00:00Z', 'created_before': '2026-01-10T20:00:00Z'},
+            {'created_after': '2026-01-10', 'created_before': '2026-03-02', 'types': (11, 12)},
+            {'present': ('list_email_id', 'visitor_id')},
+        )
+        for case in cases:
+            with self.subTest(**case):
+                self.assertEqual(ids(self.store.activities('lake', **case)), ids(self.naive(**case)))
+
+    def test_aggregate_matches_a_scan(self):
+        rows = self.store.aggregate(
+            'lake', 'type', ['COUNT(*)', 'COUNT(DISTINCT visitor_id)'],
+            created_after='2026-01-15 00:00:00', present=('list_email_id',)
+        )
+        expected = {}
+        for a in self.naive(created_after='2026-01-15 00:00:00', present=('list_email_id',)):
+            count, visitors = expected.get(a['type'], (0, set()))
+            if a['visitor_id'] is not None:
+                visitors.add(a['visitor_id'])
+            expected[a['type']] = (count + 1, visitors)
+        self.assertEqual(
+            {group: (count, distinct) for group, count, distinct in rows},
+            {group: (count, len(visitors)) for group, (count, visitors) in expected.items()}
+        )
+
+    def test_created_at_bound(self):
+        self.assertEqual(created_at_bound('2026-01-31'), '2026-01-31 00:00:00')
+        self.assertEqual(created_at_bound('2026-01-31T10:20:30Z'), '2026-01-31 10:20:30')
+        self.assertEqual(created_at_bound('2026-01-31 10:20:30'), '2026-01-31 10:20:30')
+        self.assertIsNone(created_at_bound(''))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import random
+import unittest
+from services.duplicate_detection import (
+    MATCH_THRESHOLD, DuplicateDetector, _DuplicateRecord, canonicalize_email, jaccard,
+    minhash_signature, score_pair
+)
+
+FIRST_NAMES = ['ann', 'bob', 'carl', 'dina', 'eve', 'fay', 'gus', 'hal', 'ida', 'jon']
+
+
+def make_population(count, seed=7):
+    """Distinct prospects plus a planted near-duplicate for every fifth one"""
+    rng = random.Random(seed)
+    prospects = []
+    for i in range(count):
+        first = f"{rng.choice(FIRST_NAMES)}{rng.randrange(1000)}"
+        last = f"smith{rng.randrange(5000)}"
+        company = f"company{rng.randrange(20000)}"
+        prospects.append({'id': str(i), 'email': f"{first}.{last}@{company}.com",
+                          'firstName': first, 'lastName': last, 'company': f"{company} Inc"})
+    for original in list(prospects[::5]):
+        variant = dict(original, id=f"{original['id']}-dup", email=f"{original['firstName']}@gmail.com")
+        change = rng.randrange(3)
+        if change == 0:
+            variant['lastName'] += 'e'
+        elif change == 1:
+            variant['company'] = variant['company'].replace(' Inc', ', LLC')
+        else:
+            variant['firstName'] = variant['firstName'].title()
+        prospects.append(variant)
+    return prospects
+
+def exhaustive_pairs(prospects):
+    """Every pair whose verification score passes, found by comparing all pairs"""
+    records = [_DuplicateRecord(i, p) for i, p in enumerate(prospects)]
+    pairs = set()
+    for i, left in enumerate(records):
+        for right in records[i + 1:]:
+            if score_pair(left, right)[0] >= MATCH_THRESHOLD:
+                pairs.add((left.index, right.index))
+    return pairs
+
+def clustered_pairs(clusters):
+    pairs = set()
+    for cluster in clusters:
+        indices = [index for index, _, _ in cluster]
+        pairs.update((a, b) for i, a in enumerate(indices) for b in indices[i + 1:])
+    return pairs
+
+
+class CanonicalEmailTest(unittest.TestCase):
+    def test_variants_share_a_key(self):
+        self.assertEqual(canonicalize_email(' John.Doe+news@GoogleMail.com '), 'johndoe@gmail.com')
+        self.assertEqual(canonicalize_email('A.B@Example.com'), 'a.b@example.com')
+        for value in (None, '', 'n/a', 'no-at-sign', '+tag@example.com'):
+            self.assertEqual(canonicalize_email(value), '', value)
+
+
+class MinHashTest(unittest.TestCase):
+    def test_identical_sets_share_signatures(self):
+        tokens = {'abc', 'bcd', 'cde'}
+        self.assertEqual(minhash_signature(tokens), minhash_signature(set(tokens)))
+
+    def test_signature_agreement_tracks_jaccard(self):
+        rng = random.Random(11)
+        for _ in range(20):
+            base = {f"t{rng.randrange(10 ** 6)}" for _ in range(200)}
+            other = set(list(base)[:150]) | {f"u{rng.randrange(10 ** 6)}" for _ in range(50)}
+            left, right = minhash_signature(base), minhash_signature(other)
+            agreement = sum(a == b for a, b in zip(left, right)) / len(left)
+            self.assertLess(abs(agreement - jaccard(base, other)), 0.3)
+
+
+class DuplicateDetectorTest(unittest.TestCase):
+    def setUp(self):
+        self.prospects = make_population(600)
+        self.expected = exhaustive_pairs(self.prospects)
+
+    def test_lsh_recall_against_all_pairs(self):
+        found = clustered_pairs(DuplicateDetector().find_clusters(self.prospects))
+        recall = len(found & self.expected) / len(self.expected)
+        self.assertGreaterEqual(recall, 0.95)
+
+    def test_lsh_finds_what_exact_blocking_misses(self):
+        without_lsh = clustered_pairs(DuplicateDetector(use_lsh=False).find_clusters(self.prospects))
+        with_lsh = clustered_pairs(DuplicateDetector().find_clusters(self.prospects))
+        self.assertLess(len(without_lsh & self.expected), len(with_lsh & self.expected))
+
+    def test_reported_clusters_are_verified(self):
+        # Pairs inside a cluster may be joined transitively, but every
+        # member must have matched someone with a passing score
+        for cluster in DuplicateDetector().find_clusters(self.prospects):
+            for _, score, reason in cluster:
+                self.assertGreaterEqual(score, MATCH_THRESHOLD)
+                self.assertIn(reason, ('email', 'name_company'))
+
+    def test_group_shape(self):
+        prospects = [
+            {'id': '1', 'email': 'Ann.Lee@gmail.com', 'firstName': 'Ann', 'lastName': 'Lee', 'company': 'Acme'},
+            {'id': '2', 'email': 'annlee+x@gmail.com', 'firstName': 'Ann', 'lastName': 'Lee', 'company': ''},
+            {'id': '3', 'email': 'bob@globex.com', 'firstName': 'Bob', 'lastName': 'Ray', 'company': 'Globex'}
+        ]
+        groups = DuplicateDetector().find_duplicates(prospects)
+        self.assertEqual(len(groups), 1)
+        self.assertEqual(groups[0]['email'], 'annlee@gmail.com')
+        self.assertEqual(groups[0]['matchedOn'], ['email'])
+        self.assertEqual([p['id'] for p in groups[0]['prospects']], ['1', '2'])
+
+
+if __name__ == '__main__':
+    unittest.main()
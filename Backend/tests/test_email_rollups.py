@@ -0,0 +1,117 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from services.activity_store import LAKE_STREAM, ActivityStore
+from services.email_rollups import EmailRollups
+from services.email_stats import ACTIVITY_COLUMNS, CLICKS, OPENS, OTHER, stats_from_counts
+from tests.test_email_stats import make_activities
+
+RANGES = (
+    (None, None),
+    ('2026-02-10 13:00:00', None),
+    (None, '2026-02-10 13:00:00'),
+    ('2026-02-10 08:00:00', '2026-02-10 20:00:00'),
+    ('2026-02-10 13:00:00', '2026-02-11 09:30:00'),
+    ('2026-01-03 00:00:00', '2026-03-20 23:59:59'),
+    ('2026-01-05', '2026-01-06'),
+    ('2026-04-01 00:00:00', None),
+)
+
+
+def naive_email_stats(activities, created_after=None, created_before=None):
+    """Stats per email from a scan of the raw activities in (created_after, created_before)"""
+    counts, visitors = {}, {}
+    for activity in activities:
+        created_at = activity.get('created_at')
+        if not activity.get('list_email_id'):
+            continue
+        if created_after and not (created_at and created_at > created_after):
+            continue
+        if created_before and not (created_at and created_at < created_before):
+            continue
+        list_email_id = activity['list_email_id']
+        column = ACTIVITY_COLUMNS.get(activity.get('type'), OTHER)
+        counts.setdefault(list_email_id, [0] * 6)[column] += 1
+        visitor = activity.get('visitor_id') or activity.get('prospect_id')
+        if column in (OPENS, CLICKS) and visitor:
+            visitors.setdefault((list_email_id, column), set()).add(visitor)
+    return {
+        list_email_id: stats_from_counts(
+            row, len(visitors.get((list_email_id, OPENS), ())), len(visitors.get((list_email_id, CLICKS), ()))
+        )
+        for list_email_id, row in counts.items()
+    }
+
+def pages(activities, size=400):
+    """Sync fetcher yielding activities oldest first, in pages"""
+    ordered = sorted(activities, key=lambda a: a.get('created_at') or '')
+    return lambda created_after: (ordered[i:i + size] for i in range(0, len(ordered), size))
+
+
+class EmailRollupsTestCase(unittest.TestCase):
+    unique_mode = 'exact'
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = ActivityStore(os.path.join(self.tmp.name, 'activities.sqlite'), business_unit='bu')
+        self.activities = make_activities(4000, seed=43)
+        self.stdout = redirect_stdout(io.StringIO())
+        self.stdout.__enter__()
+
+    def tearDown(self):
+        self.stdout.__exit__(None, None, None)
+        self.store._conn.close()
+        self.tmp.cleanup()
+
+    def rollups(self):
+        return EmailRollups(self.store, unique_mode=self.unique_mode)
+
+    def sync(self, activities):
+        self.store.sync(LAKE_STREAM, pages(activities), force=True)
+
+
+class EmailRollupsTest(EmailRollupsTestCase):
+    def assert_ranges_match(self, rollups):
+        for created_after, created_before in RANGES:
+            with self.subTest(created_after=created_after, created_before=created_before):
+                self.assertEqual(
+                    rollups.email_stats(created_after, created_before),
+                    naive_email_stats(self.activities, created_after, created_before)
+                )
+
+    def test_built_from_stored_activities(self):
+        self.sync(self.activities)
+        self.assert_ranges_match(self.rollups())
+
+    def test_synced_pages_match_a_rebuild(self):
+        half = len(self.activities) // 2
+        self.sync(self.activities[:half])
+        rollups = self.rollups()
+        self.sync(self.activities[half:])
+        self.assert_ranges_match(rollups)
+
+        rollups.rebuild_all()
+        self.assert_ranges_match(rollups)
+
+    def test_resynced_rows_are_not_counted_twice(self):
+        self.sync(self.activities)
+        rollups = self.rollups()
+        self.sync(self.activities[:1000])
+        self.assert_ranges_match(rollups)
+
+    def test_most_recently_active_first(self):
+        self.sync(self.activities)
+        stats = self.rollups().email_stats('2026-01-01 00:00:00', None)
+        latest = {}
+        for activity in self.activities:
+            if activity.get('list_email_id') and activity.get('created_at'):
+                day = activity['created_at'][:10]
+                latest[activity['list_email_id']] = max(latest.get(activity['list_email_id'], day), day)
+        days = [latest[list_email_id] for list_email_id in stats]
+        self.assertEqual(days, sorted(days, reverse=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
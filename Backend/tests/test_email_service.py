@@ -0,0 +1,93 @@
+import io
+import threading
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from unittest import mock
+from services import email_service
+from services.email_stats import stats_from_counts
+from tests.test_prospect_routes import FakeCache
+
+LIST_EMAILS = [
+    {'id': 1, 'name': 'Welcome', 'subject': 'Hello', 'createdAt': '2026-01-01T00:00:00Z'},
+    {'id': 2, 'name': 'Newsletter', 'subject': 'News', 'createdAt': '2026-02-01T00:00:00Z'},
+]
+
+
+class FakeRollups:
+    def __init__(self):
+        self.ranges = []
+
+    def email_stats(self, created_after=None, created_before=None):
+        self.ranges.append((created_after, created_before))
+        # Email 99 has activity but is not a list email any more
+        return {
+            2: stats_from_counts([5, 3, 1, 0, 0, 0], 2, 1),
+            99: stats_from_counts([1, 0, 0, 0, 0, 0], 0, 0),
+            1: stats_from_counts([10, 4, 2, 1, 0, 0], 3, 2),
+        }
+
+
+class EmailStatsServiceTest(unittest.TestCase):
+    def setUp(self):
+        self.rollups = FakeRollups()
+        # Each crawl waits for the other, so this only passes if they overlap
+        self.started = threading.Barrier(2, timeout=5)
+        patches = [
+            mock.patch.object(email_service, 'get_list_emails', self.fake_list_emails),
+            mock.patch.object(email_service, 'sync_email_activities', self.fake_sync),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        stdout = redirect_stdout(io.StringIO())
+        stdout.__enter__()
+        self.addCleanup(stdout.__exit__, None, None, None)
+
+    def fake_list_emails(self, access_token):
+        self.started.wait()
+        return LIST_EMAILS
+
+    def fake_sync(self, access_token):
+        self.started.wait()
+        return self.rollups
+
+    def test_list_emails_and_sync_run_concurrently(self):
+        results = email_service.get_email_stats('token')
+        self.assertEqual([row['id'] for row in results], ['2', '1'])
+        self.assertEqual(results[1]['name'], 'Welcome')
+        self.assertEqual(results[1]['stats']['uniqueOpens'], 3)
+        self.assertEqual(self.rollups.ranges, [(None, None)])
+
+    def test_custom_range_is_passed_in_created_at_format(self):
+        email_service.get_email_stats('token', 'custom', '2026-01-05T08:00:00Z', '2026-02-01T00:00:00.000Z')
+        self.assertEqual(self.rollups.ranges, [('2026-01-05 08:00:00', '2026-02-01 00:00:00')])
+
+    def test_failed_crawl_returns_no_rows(self):
+        self.started.abort()
+        with redirect_stderr(io.StringIO()):
+            self.assertEqual(email_service.get_email_stats('token'), [])
+
+
+class ListEmailsCacheTest(unittest.TestCase):
+    def setUp(self):
+        cache = FakeCache()
+        for name, method in (('get_cached_data', cache.get), ('set_cached_data', cache.set)):
+            patch = mock.patch.object(email_service, name, method)
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_fetched_once_and_cached(self):
+        with mock.patch.object(email_service, 'fetch_all_mails', return_value=LIST_EMAILS) as fetch:
+            self.assertEqual(email_service.get_list_emails('token'), LIST_EMAILS)
+            self.assertEqual(email_service.get_list_emails('token'), LIST_EMAILS)
+        self.assertEqual(fetch.call_count, 1)
+
+    def test_empty_result_is_not_cached(self):
+        with mock.patch.object(email_service, 'fetch_all_mails', return_value=[]) as fetch:
+            email_service.get_list_emails('token')
+            email_service.get_list_emails('token')
+        self.assertEqual(fetch.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
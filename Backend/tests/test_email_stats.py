@@ -0,0 +1,86 @@
+import random
+import unittest
+from unittest import mock
+from services import email_stats
+from services.email_stats import (
+    ACTIVITY_COLUMNS, CLICKS, OPENS, OTHER, UNDATED, ActivityColumns, _rollup_numpy, _rollup_python,
+    rollup_activities, stats_from_counts
+)
+
+TYPES = (6, 6, 11, 11, 1, 12, 13, 36, 2, 20, None)
+
+
+def make_activities(count, seed=1):
+    """Random email activities, including rows without an email id, a date or a visitor"""
+    rng = random.Random(seed)
+    activities = []
+    for i in range(count):
+        created_at = f"2026-{rng.randint(1, 3):02d}-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00"
+        activities.append({
+            'id': i,
+            'list_email_id': rng.choice([None, 0, rng.randint(1, 30), rng.randint(1, 30)]),
+            'type': rng.choice(TYPES),
+            'visitor_id': rng.choice([None, rng.randint(1, 400)]),
+            'prospect_id': rng.choice([None, rng.randint(1, 400)]),
+            'created_at': rng.choice([created_at] * 20 + [None, '']),
+        })
+    return activities
+
+def naive_rollup(activities):
+    """Counts and visitor rows of one activity at a time"""
+    counts, visitors = {}, set()
+    for activity in activities:
+        if not activity.get('list_email_id'):
+            continue
+        day = activity['created_at'][:10] if activity.get('created_at') else UNDATED
+        key = (activity['list_email_id'], day)
+        column = ACTIVITY_COLUMNS.get(activity.get('type'), OTHER)
+        counts.setdefault(key, [0] * 6)[column] += 1
+        visitor = activity.get('visitor_id') or activity.get('prospect_id')
+        if column in (OPENS, CLICKS) and visitor:
+            visitors.add((activity['list_email_id'], column, visitor, day))
+    return counts, visitors
+
+
+@unittest.skipUnless(email_stats.np is not None, 'numpy is not installed')
+class RollupTest(unittest.TestCase):
+    def test_numpy_matches_python(self):
+        for seed in range(5):
+            activities = make_activities(3000, seed=seed)
+            counts, visitors = _rollup_numpy(ActivityColumns(activities))
+            self.assertEqual((counts, visitors), _rollup_python(activities))
+            self.assertEqual((counts, visitors), naive_rollup(activities))
+
+    def test_rows_without_email_or_visitor(self):
+        activities = [
+            {'list_email_id': None, 'type': 11, 'visitor_id': 1, 'created_at': '2026-01-01 10:00:00'},
+            {'list_email_id': 0, 'type': 6, 'created_at': '2026-01-01 10:00:00'},
+            {'list_email_id': 7, 'type': 11, 'created_at': '2026-01-01 10:00:00'},
+            {'list_email_id': 7, 'type': 12, 'prospect_id': 3, 'created_at': ''},
+            {'list_email_id': 7, 'type': 1, 'visitor_id': 3, 'created_at': None},
+        ]
+        counts, visitors = rollup_activities(activities)
+        self.assertEqual(counts, {(7, '2026-01-01'): [0, 1, 0, 0, 0, 0], (7, UNDATED): [0, 0, 2, 0, 0, 0]})
+        self.assertEqual(visitors, {(7, CLICKS, 3, UNDATED)})
+        self.assertEqual((counts, visitors), _rollup_python(activities))
+
+    def test_python_fallback_without_numpy(self):
+        activities = make_activities(500, seed=9)
+        with mock.patch.object(email_stats, 'np', None):
+            self.assertEqual(rollup_activities(activities), naive_rollup(activities))
+
+    def test_empty(self):
+        self.assertEqual(rollup_activities([]), ({}, set()))
+
+
+class StatsFromCountsTest(unittest.TestCase):
+    def test_bounces_are_not_delivered(self):
+        stats = stats_from_counts([10, 4, 3, 2, 1, 5], 3, 2)
+        self.assertEqual(stats['sent'], 10)
+        self.assertEqual(stats['delivered'], 7)
+        self.assertEqual(stats['bounces'], 3)
+        self.assertEqual((stats['uniqueOpens'], stats['uniqueClicks']), (3, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+from unittest import mock
+from services import first_activity
+from services.activity_store import LAKE_STREAM
+from services.first_activity import FirstActivityIndex
+from services.form_service import calculate_form_stats, partition_form_activities
+from tests.test_activity_store import ActivityStoreTestCase, Upstream
+from tests.test_email_stats import make_activities
+
+
+def naive_first_activity(activities, prospect_ids):
+    """Earliest dated activity per prospect from a scan of every activity"""
+    first = {}
+    for activity in activities:
+        prospect_id = activity.get('prospect_id')
+        if prospect_id in prospect_ids and activity.get('created_at'):
+            first[prospect_id] = min(first.get(prospect_id, activity['created_at']), activity['created_at'])
+    return first
+
+
+class FirstActivityIndexTest(ActivityStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.activities = make_activities(3000, seed=46)
+        self.activities.sort(key=lambda a: a['created_at'] or '')
+        self.index = FirstActivityIndex(self.store)
+
+    def sync(self, activities):
+        self.store.sync(LAKE_STREAM, Upstream(activities), force=True)
+
+    def test_matches_a_scan(self):
+        self.sync(self.activities)
+        prospect_ids = set(range(0, 450))
+        with mock.patch.object(first_activity, 'LOOKUP_BATCH', 37):
+            self.assertEqual(self.index.first_activity_at(prospect_ids), naive_first_activity(self.activities, prospect_ids))
+        # Second lookup is served from the cache
+        self.assertEqual(self.index.first_activity_at(prospect_ids), naive_first_activity(self.activities, prospect_ids))
+
+    def test_synced_pages_replace_cached_answers(self):
+        half = len(self.activities) // 2
+        later, earlier = self.activities[half:], self.activities[:half]
+        prospect_ids = set(range(1, 401))
+        self.sync(later)
+        self.assertEqual(self.index.first_activity_at(prospect_ids), naive_first_activity(later, prospect_ids))
+        # Older activity committed late upstream moves first activity times back
+        self.store.sync(LAKE_STREAM, lambda created_after: [earlier], force=True)
+        self.assertEqual(self.index.first_activity_at(prospect_ids), naive_first_activity(self.activities, prospect_ids))
+
+    def test_cache_stays_bounded(self):
+        self.sync(self.activities)
+        with mock.patch.object(first_activity, 'LOOKUP_CACHE_SIZE', 50):
+            self.index.first_activity_at(range(1, 401))
+            self.assertLessEqual(len(self.index._cache), 50)
+            self.assertEqual(self.index.first_activity_at({7, 8}), naive_first_activity(self.activities, {7, 8}))
+
+    def test_unknown_and_missing_prospects(self):
+        self.sync(self.activities)
+        self.assertEqual(self.index.first_activity_at({None, 0, 10 ** 9}), {})
+
+    def test_form_conversions_match_per_prospect_lookups(self):
+        activities = [a for a in self.activities if a['created_at']]
+        for position, activity in enumerate(activities):
+            activity.update(form_id=position % 5 + 1, type=(2, 2, 4, 6, 20)[position % 5 if position % 3 else 2])
+        self.sync(activities)
+        partitions = partition_form_activities(activities)
+        for form_id in range(1, 6):
+            submissions = [a for a in activities if a['form_id'] == form_id and a['type'] == 4]
+            # A submission converts unless its prospect had any earlier activity
+            expected = sum(
+                1 for s in submissions
+                if s['prospect_id'] and not any(
+                    a['prospect_id'] == s['prospect_id'] and a['created_at'] < s['created_at'] for a in activities
+                )
+            )
+            stats = calculate_form_stats({'id': form_id, 'name': f'Form {form_id}'}, partitions, self.index)
+            self.assertEqual(stats['submissions'], len(submissions))
+            self.assertEqual(stats['conversions'], expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
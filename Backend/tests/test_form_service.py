@@ -0,0 +1,90 @@
+import unittest
+from unittest import mock
+from services import form_service
+from services.activity_store import LAKE_STREAM
+from services.first_activity import FirstActivityIndex
+from tests.test_activity_store import ActivityStoreTestCase
+from tests.test_email_stats import make_activities
+
+FORM_COUNT = 450
+
+
+class FakeResponse:
+    status_code = 200
+    text = ''
+
+    def __init__(self, values):
+        self.values = values
+
+    def json(self):
+        return {'values': self.values}
+
+
+def naive_form_counts(activities, form_id):
+    """Views, submissions and clicks of one form, with unique visitors, from a scan"""
+    counts = {}
+    for name, types in (('views', (2,)), ('submissions', (4,)), ('clicks', (1, 6))):
+        rows = [a for a in activities if a['form_id'] == form_id and a['type'] in types]
+        counts[name] = len(rows)
+        counts[f'unique_{name}'] = len({a['visitor_id'] or a['prospect_id'] for a in rows} - {None})
+    return counts
+
+
+class FormStatsTest(ActivityStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.activities = [a for a in make_activities(6000, seed=47) if a['created_at']]
+        for position, activity in enumerate(self.activities):
+            activity.update(form_id=position % (FORM_COUNT + 20) + 1, type=(2, 2, 2, 4, 1, 6, 20)[position % 7])
+        self.store.add_activities(LAKE_STREAM, self.activities)
+        # Forms past FORM_COUNT have activity but were deleted upstream
+        self.forms = [{'id': form_id, 'name': f'Form {form_id}', 'createdAt': '2025-12-01T00:00:00Z'}
+                      for form_id in range(1, FORM_COUNT + 1)]
+        index = FirstActivityIndex(self.store)
+        patches = [
+            mock.patch.object(form_service.requests, 'get', self.fake_get),
+            mock.patch.object(form_service, 'sync_activity_lake', lambda headers: self.store),
+            mock.patch.object(form_service, 'get_first_activity_index', lambda store: index),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def fake_get(self, url, headers=None, params=None):
+        offset, limit = params['offset'], params['limit']
+        return FakeResponse(self.forms[offset:offset + limit])
+
+    def form_stats(self, workers, *args):
+        with mock.patch.object(form_service, 'FORM_STATS_WORKERS', workers):
+            return form_service.get_form_stats('token', *args)
+
+    def test_pool_matches_one_worker(self):
+        parallel = self.form_stats(8)
+        self.assertEqual(parallel, self.form_stats(1))
+        self.assertEqual([stats['id'] for stats in parallel], [str(form['id']) for form in self.forms])
+
+    def test_counts_match_a_scan(self):
+        for stats in self.form_stats(4):
+            expected = naive_form_counts(self.activities, int(stats['id']))
+            self.assertEqual({name: stats[name] for name in expected}, expected)
+            self.assertEqual(stats['abandoned'], max(stats['views'] - stats['submissions'], 0))
+
+    def test_failing_form_is_skipped(self):
+        del self.forms[3]['name']
+        stats = self.form_stats(4)
+        self.assertEqual(len(stats), FORM_COUNT - 1)
+        self.assertNotIn('4', [row['id'] for row in stats])
+
+    def test_date_filter_drops_forms_without_activity(self):
+        created_after = '2026-03-01 00:00:00'
+        stats = self.form_stats(4, created_after)
+        in_window = [a for a in self.activities if a['created_at'] > created_after]
+        active = {a['form_id'] for a in in_window if a['type'] in (1, 2, 4, 6)} & set(range(1, FORM_COUNT + 1))
+        self.assertEqual({int(row['id']) for row in stats}, active)
+        for row in stats:
+            expected = naive_form_counts(in_window, int(row['id']))
+            self.assertEqual({name: row[name] for name in expected}, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
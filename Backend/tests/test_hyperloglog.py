@@ -0,0 +1,98 @@
+import unittest
+from services.email_rollups import EmailRollups
+from services.hyperloglog import HyperLogLog, standard_error
+from tests.test_email_rollups import RANGES, EmailRollupsTestCase, naive_email_stats
+
+CARDINALITIES = (1, 10, 100, 1000, 10000, 60000)
+
+
+def within_error(estimate, actual, precision, sigmas=4):
+    """Whether a count is within `sigmas` standard errors (or one value, for tiny counts)"""
+    return abs(estimate - actual) <= max(1, sigmas * standard_error(precision) * actual)
+
+
+class HyperLogLogTest(unittest.TestCase):
+    def test_counts_within_error_bounds(self):
+        for precision in (10, 12, 14):
+            for cardinality in CARDINALITIES:
+                with self.subTest(precision=precision, cardinality=cardinality):
+                    sketch = HyperLogLog(precision).update(range(cardinality))
+                    self.assertTrue(within_error(sketch.count(), cardinality, precision), sketch.count())
+
+    def test_repeated_values_count_once(self):
+        sketch = HyperLogLog(12).update(list(range(500)) * 4)
+        self.assertTrue(within_error(sketch.count(), 500, 12))
+        self.assertEqual(HyperLogLog(12).update([5, '5']).count(), 1)
+
+    def test_merge_is_the_union(self):
+        first = HyperLogLog(12).update(range(0, 30000))
+        second = HyperLogLog(12).update(range(20000, 50000))
+        union = HyperLogLog(12).update(range(0, 50000))
+        self.assertEqual(first.merge(second).registers, union.registers)
+        self.assertTrue(within_error(first.count(), 50000, 12))
+
+    def test_serialization_round_trip(self):
+        for cardinality in (0, 20, 5000):
+            with self.subTest(cardinality=cardinality):
+                sketch = HyperLogLog(12).update(range(cardinality))
+                data = sketch.to_bytes()
+                # Sparse while fewer than a third of the registers are set
+                self.assertEqual(data[:1], b'S' if cardinality < 1000 else b'D')
+                self.assertEqual(HyperLogLog.from_bytes(data).registers, sketch.registers)
+                self.assertEqual(HyperLogLog.from_dict(sketch.to_dict()).registers, sketch.registers)
+
+                other = HyperLogLog(12).update(range(100000, 100300))
+                self.assertEqual(
+                    HyperLogLog(12).merge(other).merge(data).registers,
+                    HyperLogLog(12).merge(other).merge(sketch).registers
+                )
+
+    def test_rejects_bad_precision_and_data(self):
+        with self.assertRaises(ValueError):
+            HyperLogLog(3)
+        with self.assertRaises(ValueError):
+            HyperLogLog(17)
+        with self.assertRaises(ValueError):
+            HyperLogLog(12).merge(HyperLogLog(10))
+        with self.assertRaises(ValueError):
+            HyperLogLog(12).merge(HyperLogLog(10).to_bytes())
+        with self.assertRaises(ValueError):
+            HyperLogLog.from_bytes(b'X\x0c')
+
+
+class ApproximateEmailRollupsTest(EmailRollupsTestCase):
+    unique_mode = 'approximate'
+    precision = 12
+
+    def rollups(self):
+        return EmailRollups(self.store, unique_mode=self.unique_mode, precision=self.precision)
+
+    def assert_close_to_exact(self, rollups):
+        for created_after, created_before in RANGES:
+            with self.subTest(created_after=created_after, created_before=created_before):
+                stats = rollups.email_stats(created_after, created_before)
+                expected = naive_email_stats(self.activities, created_after, created_before)
+                self.assertEqual(set(stats), set(expected))
+                for list_email_id, row in expected.items():
+                    approximate = stats[list_email_id]
+                    for name, value in row.items():
+                        if name in ('uniqueOpens', 'uniqueClicks'):
+                            self.assertTrue(within_error(approximate[name], value, self.precision), (name, approximate[name], value))
+                        else:
+                            self.assertEqual(approximate[name], value, name)
+
+    def test_sketches_built_and_synced(self):
+        half = len(self.activities) // 2
+        self.sync(self.activities[:half])
+        rollups = self.rollups()
+        self.sync(self.activities[half:])
+        self.assert_close_to_exact(rollups)
+
+    def test_switching_from_exact_mode_rebuilds_sketches(self):
+        self.sync(self.activities)
+        EmailRollups(self.store, unique_mode='exact')
+        self.assert_close_to_exact(self.rollups())
+
+
+if __name__ == '__main__':
+    unittest.main()
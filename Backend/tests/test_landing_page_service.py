@@ -0,0 +1,174 @@
+import io
+import random
+import threading
+import unittest
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from unittest import mock
+from services import Landing_page_service
+from services.Landing_page_service import (
+    ACTIVE_DAYS, aggregate_landing_page_activity, get_landing_pages, iter_landing_page_batches, landing_page_stats
+)
+from services.activity_store import CREATED_AT_FORMAT, LAKE_STREAM
+from tests.test_activity_lake import FakeResponse
+from tests.test_activity_store import ActivityStoreTestCase
+from tests.test_prospect_routes import FakeCache
+
+
+def landing_page_activities(count, seed=49):
+    """Landing page activities over the last year, with ids and types stored as numbers or text"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    activities = []
+    for i in range(count):
+        page_id = rng.randint(1, 60)
+        activity_type = rng.choice([2, 2, 2, 4, 1, 6, 20, None])
+        activities.append({
+            'id': i,
+            'landing_page_id': str(page_id) if i % 5 == 0 else page_id,
+            'type': str(activity_type) if activity_type and i % 7 == 0 else activity_type,
+            'visitor_id': rng.randint(1, 500),
+            'created_at': (now - timedelta(days=rng.uniform(0, 365))).strftime(CREATED_AT_FORMAT) if i % 50 else None,
+        })
+    return activities
+
+def naive_totals(activities, created_after=None, created_before=None):
+    """Per-page totals from a scan of the raw activities"""
+    recent_since = (datetime.now() - timedelta(days=ACTIVE_DAYS)).strftime(CREATED_AT_FORMAT)
+    totals = {}
+    for activity in activities:
+        created_at = activity['created_at']
+        if created_after and not (created_at and created_at > created_after):
+            continue
+        if created_before and not (created_at and created_at < created_before):
+            continue
+        activity_type = int(activity['type'] or 0)
+        row = totals.setdefault(str(activity['landing_page_id']), [0, 0, 0, 0, 0, None])
+        row[0] += activity_type == 2
+        row[1] += activity_type == 4
+        row[2] += activity_type in (1, 6)
+        row[3] += 1
+        row[4] += bool(created_at and created_at > recent_since)
+        if created_at and (row[5] is None or created_at > row[5]):
+            row[5] = created_at
+    return totals
+
+
+class LandingPageTotalsTest(ActivityStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.activities = landing_page_activities(5000)
+        self.store.add_activities(LAKE_STREAM, self.activities)
+        # Other lake rows have no landing page and must not be counted
+        self.store.add_activities(LAKE_STREAM, [{'id': f'email-{i}', 'type': 6, 'list_email_id': 3} for i in range(50)])
+
+    def test_grouped_pass_matches_a_scan(self):
+        now = datetime.now()
+        windows = (
+            (None, None),
+            ((now - timedelta(days=30)).strftime(CREATED_AT_FORMAT), None),
+            (None, (now - timedelta(days=200)).strftime(CREATED_AT_FORMAT)),
+            ((now - timedelta(days=120)).strftime(CREATED_AT_FORMAT), (now - timedelta(days=60)).strftime(CREATED_AT_FORMAT)),
+        )
+        for created_after, created_before in windows:
+            with self.subTest(created_after=created_after, created_before=created_before):
+                self.assertEqual(
+                    aggregate_landing_page_activity(self.store, created_after, created_before),
+                    naive_totals(self.activities, created_after, created_before)
+                )
+
+    def test_page_stats(self):
+        totals = aggregate_landing_page_activity(self.store)
+        stats = landing_page_stats({'id': 7, 'name': 'Pricing', 'vanityUrl': 'go.example.com/pricing'}, totals)
+        views, submissions, clicks, total, recent, last = naive_totals(self.activities)['7']
+        self.assertEqual(
+            (stats['views'], stats['submissions'], stats['clicks'], stats['total_activities'], stats['last_activity']),
+            (views, submissions, clicks, total, last)
+        )
+        self.assertEqual(stats['is_active'], recent > 0)
+        self.assertEqual(stats['url'], 'go.example.com/pricing')
+
+        empty = landing_page_stats({'id': 999, 'name': 'Unused'}, totals)
+        self.assertEqual((empty['total_activities'], empty['is_active'], empty['url']), (0, False, 'No URL'))
+
+
+class FakeLandingPageApi:
+    """v5 landing-pages endpoint: 200 per page, continued with nextPageToken"""
+    def __init__(self, count):
+        self.pages = [{'id': i, 'name': f'Page {i}', 'isDeleted': i % 10 == 0} for i in range(1, count + 1)]
+        self.requests = []
+        self.fail_at_token = None
+
+    def get(self, url, headers=None, params=None):
+        self.requests.append(dict(params))
+        token = params.get('nextPageToken')
+        if token is not None and token == self.fail_at_token:
+            return FakeResponse('unavailable', status_code=503)
+        start = int(token or 0)
+        end = start + 200
+        payload = {'values': self.pages[start:end]}
+        if end < len(self.pages):
+            payload['nextPageToken'] = str(end)
+        return FakeResponse(payload)
+
+
+class LandingPagePaginationTest(unittest.TestCase):
+    def setUp(self):
+        self.api = FakeLandingPageApi(1150)
+        self.cache = FakeCache()
+        patches = [
+            mock.patch.object(Landing_page_service.requests, 'get', self.api.get),
+            mock.patch.object(Landing_page_service, 'get_cached_data', self.cache.get),
+            mock.patch.object(Landing_page_service, 'set_cached_data', self.cache.set),
+            redirect_stdout(io.StringIO()),
+        ]
+        for patch in patches:
+            patch.__enter__()
+            self.addCleanup(patch.__exit__, None, None, None)
+
+    def test_follows_next_page_tokens_to_the_end(self):
+        batches = list(iter_landing_page_batches({}))
+        self.assertEqual([len(batch) for batch in batches], [200] * 5 + [150])
+        self.assertEqual([page['id'] for batch in batches for page in batch], list(range(1, 1151)))
+        # Only the first request sets a limit; the rest continue from the token
+        self.assertEqual(self.api.requests[0].get('limit'), 200)
+        self.assertTrue(all('limit' not in params and 'nextPageToken' in params for params in self.api.requests[1:]))
+
+    def test_failed_page_raises(self):
+        self.api.fail_at_token = '600'
+        with self.assertRaises(Exception):
+            list(iter_landing_page_batches({}))
+        with self.assertRaises(Exception):
+            get_landing_pages({})
+        self.assertIsNone(self.cache.get(f"landing_page_metadata:{Landing_page_service.BUSINESS_UNIT_ID}"))
+
+    def test_metadata_is_cached_without_deleted_pages(self):
+        pages = get_landing_pages({})
+        self.assertEqual([page['id'] for page in pages], [i for i in range(1, 1151) if i % 10])
+        requests = len(self.api.requests)
+        self.assertEqual(get_landing_pages({}), pages)
+        self.assertEqual(len(self.api.requests), requests)
+
+    def test_metadata_crawl_overlaps_the_lake_sync(self):
+        started = threading.Barrier(2, timeout=5)
+        store = mock.Mock()
+        store.aggregate.return_value = [(2, 3, 1, 0, 5, 1, '2026-10-01 10:00:00')]
+
+        def fake_get_landing_pages(headers):
+            started.wait()
+            return [{'id': 2, 'name': 'Home'}, {'id': 3, 'name': 'Contact'}]
+
+        def fake_sync(headers):
+            started.wait()
+            return store
+
+        with mock.patch.object(Landing_page_service, 'get_landing_pages', fake_get_landing_pages), \
+                mock.patch.object(Landing_page_service, 'sync_activity_lake', fake_sync):
+            stats = Landing_page_service.get_landing_page_stats('token')
+        self.assertEqual(stats['active_pages']['count'], 1)
+        self.assertEqual(stats['inactive_pages']['pages'][0]['id'], '3')
+        self.assertEqual(stats['summary']['total_pages'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from services import prospect_audit_parallel
+from services.prospect_audit_parallel import key_partition, run_parallel_audit, shutdown_audit_pool
+from services.prospect_audit_rules import AuditContext, FusedAuditExecutor, get_rules
+from services.prospect_dates import normalize_prospect_dates
+from services.prospect_records import IssueRows
+from tests.fixtures import NOW, make_prospects
+from tests.test_prospect_audit_rules import plain
+
+
+class ParallelAuditTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.prospects = [normalize_prospect_dates(p) for p in make_prospects(3000, seed=5)]
+        cls.ctx = AuditContext(now=NOW)
+        cls.expected = plain(FusedAuditExecutor(get_rules(), cls.ctx).run(cls.prospects))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutdown_audit_pool()
+
+    def setUp(self):
+        self.spill_dir = tempfile.TemporaryDirectory()
+        # Small enough that these prospects take the process pool path
+        patches = [
+            mock.patch.object(prospect_audit_parallel, 'PARALLEL_MIN_PROSPECTS', 100),
+            mock.patch.object(prospect_audit_parallel, 'AUDIT_SPILL_DIR', self.spill_dir.name)
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(self.spill_dir.cleanup)
+
+    def test_matches_sequential_audit(self):
+        for workers in (2, 3):
+            results = run_parallel_audit(self.prospects, ctx=self.ctx, workers=workers)
+            self.assertEqual(plain(results), self.expected, workers)
+
+    def test_rule_subset(self):
+        results = run_parallel_audit(self.prospects, ['scoring_issues', 'duplicates'], ctx=self.ctx, workers=2)
+        self.assertEqual(list(results), ['scoring_issues', 'duplicates'])
+        self.assertEqual(plain(results['duplicates']), self.expected['duplicates'])
+
+    def test_row_rules_are_built_lazily(self):
+        rows = run_parallel_audit(self.prospects, ctx=self.ctx, workers=2)['inactive_prospects']
+        expected = self.expected['inactive_prospects']
+        self.assertIsInstance(rows, IssueRows)
+        self.assertEqual(len(rows), len(expected))
+        self.assertEqual(rows[0].to_dict(), expected[0])
+        self.assertEqual(rows[-1].to_dict(), expected[-1])
+        self.assertEqual([row.to_dict() for row in rows[5:9]], expected[5:9])
+
+    def test_column_file_is_removed(self):
+        run_parallel_audit(self.prospects, ctx=self.ctx, workers=2)
+        self.assertEqual(os.listdir(self.spill_dir.name), [])
+
+    def test_small_inputs_run_in_process(self):
+        with mock.patch.object(prospect_audit_parallel, 'get_audit_pool') as get_pool:
+            results = run_parallel_audit(self.prospects[:50], ctx=self.ctx, workers=2)
+        get_pool.assert_not_called()
+        self.assertEqual(plain(results), plain(FusedAuditExecutor(get_rules(), self.ctx).run(self.prospects[:50])))
+
+    def test_key_partition_is_stable(self):
+        self.assertEqual(key_partition('a@example.com', 4), key_partition('a@example.com', 4))
+        self.assertTrue(0 <= key_partition('b@example.com', 3) < 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import json
+import unittest
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from services.duplicate_detection import canonicalize_email
+from services.prospect_audit_rules import AuditContext, FusedAuditExecutor, get_rules
+from services.prospect_dates import normalize_prospect_dates
+from services.prospect_records import ProspectRecord, to_json_default
+from tests.fixtures import NOW, make_prospects
+
+
+def plain(value):
+    """Detail rows and records as the JSON a route would send"""
+    return json.loads(json.dumps(value, default=to_json_default))
+
+
+# One loop per rule, as the audit ran before rules were fused into one pass
+
+def reference_duplicates(prospects):
+    groups = defaultdict(list)
+    for p in prospects:
+        email = canonicalize_email(p.get('email'))
+        if email:
+            groups[email].append(p)
+    return [{
+        'email': email,
+        'count': len(members),
+        'prospects': [{
+            'id': p.get('id'),
+            'firstName': p.get('firstName', ''),
+            'lastName': p.get('lastName', ''),
+            'createdAt': p.get('createdAt', '')
+        } for p in members]
+    } for email, members in groups.items() if len(members) > 1]
+
+def reference_inactive(prospects, now, days=90):
+    cutoff = now - timedelta(days=days)
+    rows = []
+    for p in prospects:
+        row = {
+            'id': p.get('id'), 'email': p.get('email'), 'firstName': p.get('firstName', ''),
+            'lastName': p.get('lastName', ''), 'company': p.get('company', '')
+        }
+        last_activity = p.get('lastActivityAt')
+        if not last_activity or not str(last_activity).strip():
+            rows.append(dict(row, lastActivityAt=None, daysInactive='Never'))
+            continue
+        try:
+            if 'T' in str(last_activity):
+                activity_date = datetime.fromisoformat(str(last_activity).replace('Z', '+00:00'))
+            else:
+                activity_date = datetime.strptime(str(last_activity), '%Y-%m-%d').replace(tzinfo=timezone.utc)
+        except ValueError:
+            rows.append(dict(row, lastActivityAt='Invalid date', daysInactive='Unknown'))
+            continue
+        if activity_date < cutoff:
+            rows.append(dict(row, lastActivityAt=str(last_activity), daysInactive=(now - activity_date).days))
+    return rows
+
+def reference_missing_fields(prospects):
+    rows = []
+    for p in prospects:
+        missing = [
+            field for field in ['firstName', 'lastName', 'company', 'jobTitle', 'country']
+            if not p.get(field, '') or str(p.get(field, '')).lower().strip() in ['', 'none', 'null', 'n/a', 'undefined']
+        ]
+        if missing:
+            rows.append({
+                'id': p.get('id', ''), 'email': p.get('email', 'N/A'), 'firstName': p.get('firstName', ''),
+                'lastName': p.get('lastName', ''), 'company': p.get('company', ''), 'missingFields': missing
+            })
+    return rows
+
+def reference_scoring_issues(prospects):
+    rows = []
+    for p in prospects:
+        score, grade, last_activity = p.get('score', 0), p.get('grade', 'D'), p.get('lastActivityAt')
+        issues = []
+        if score >= 100 and grade in ['D', 'F']:
+            issues.append('High score with low grade')
+        elif score <= 10 and grade in ['A', 'B']:
+            issues.append('Low score with high grade')
+        if last_activity and score == 0:
+            issues.append('Active prospect with zero score')
+        if score < 0:
+            issues.append('Negative score')
+        if score > 1000:
+            issues.append('Unusually high score')
+        if grade == 'A' and score < 75:
+            issues.append('Grade A with score below 75')
+        elif grade == 'B' and (score < 50 or score >= 75):
+            issues.append('Grade B with score outside 50-74 range')
+        elif grade == 'C' and (score < 25 or score >= 50):
+            issues.append('Grade C with score outside 25-49 range')
+        elif grade == 'D' and score >= 25:
+            issues.append('Grade D with score above 24')
+        if issues:
+            rows.append({
+                'id': p.get('id', ''), 'email': p.get('email', 'N/A'), 'firstName': p.get('firstName', ''),
+                'lastName': p.get('lastName', ''), 'company': p.get('company', ''), 'score': score,
+                'grade': grade, 'lastActivityAt': last_activity, 'issues': issues
+            })
+    return rows
+
+
+class FusedAuditTest(unittest.TestCase):
+    def setUp(self):
+        self.prospects = make_prospects(3000)
+        self.ctx = AuditContext(now=NOW)
+
+    def reference(self, prospects):
+        return {
+            'duplicates': reference_duplicates(prospects),
+            'inactive_prospects': reference_inactive(prospects, NOW),
+            'missing_fields': reference_missing_fields(prospects),
+            'scoring_issues': reference_scoring_issues(prospects)
+        }
+
+    def test_single_pass_matches_per_rule_loops(self):
+        results = FusedAuditExecutor(get_rules(), self.ctx).run(self.prospects)
+        expected = self.reference(self.prospects)
+        for name in expected:
+            self.assertEqual(plain(results[name]), expected[name], name)
+
+    def test_every_rule_flags_something(self):
+        results = FusedAuditExecutor(get_rules(), self.ctx).run(self.prospects)
+        for name, rows in results.items():
+            self.assertTrue(rows, name)
+
+    def test_shards_merge_to_the_unsharded_result(self):
+        executor = FusedAuditExecutor(get_rules(), self.ctx)
+        self.assertEqual(plain(executor.run(self.prospects, shards=7)), plain(executor.run(self.prospects)))
+
+    def test_records_with_parsed_dates_match_raw_dicts(self):
+        records = [ProspectRecord.from_dict(normalize_prospect_dates(dict(p))) for p in self.prospects]
+        executor = FusedAuditExecutor(get_rules(), self.ctx)
+        self.assertEqual(plain(executor.run(records)), plain(executor.run(self.prospects)))
+
+    def test_rule_subset(self):
+        results = FusedAuditExecutor(get_rules(['scoring_issues']), self.ctx).run(self.prospects)
+        self.assertEqual(list(results), ['scoring_issues'])
+        self.assertEqual(plain(results['scoring_issues']), reference_scoring_issues(self.prospects))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+from services.prospect_audit_rules import AuditContext, FusedAuditExecutor, get_rules
+from services.prospect_audit_spill import AuditSpillStore, SpillingAuditAccumulator
+from tests.fixtures import NOW, make_prospects
+from tests.test_prospect_audit_rules import plain
+
+
+class SpillingAuditTest(unittest.TestCase):
+    def setUp(self):
+        self.spill_dir = tempfile.TemporaryDirectory()
+        self.prospects = make_prospects(2500, seed=3)
+        self.ctx = AuditContext(now=NOW)
+        self.expected = plain(FusedAuditExecutor(get_rules(), self.ctx).run(self.prospects))
+        self.store = AuditSpillStore(self.spill_dir.name)
+        acc = SpillingAuditAccumulator(get_rules(), self.ctx, self.store)
+        # Flush every page, as stream_prospect_health_audit does
+        for start in range(0, len(self.prospects), 1000):
+            for prospect in self.prospects[start:start + 1000]:
+                acc.add(prospect)
+            acc.flush()
+        self.counts = acc.results()
+        self.active = acc.active
+
+    def tearDown(self):
+        self.store.close()
+        self.spill_dir.cleanup()
+
+    def test_counts_match_in_memory_audit(self):
+        self.assertEqual(self.counts, {name: len(rows) for name, rows in self.expected.items()})
+        self.assertEqual(self.active, sum(1 for p in self.prospects if p['lastActivityAt']))
+
+    def test_rows_match_in_memory_audit(self):
+        for name, rows in self.expected.items():
+            self.assertEqual(list(self.store.iter_details(name, batch_size=97)), rows, name)
+            self.assertEqual(self.store.page(name, 10, 25), rows[10:35], name)
+
+    def test_close_removes_the_spill_file(self):
+        path = self.store.path
+        self.assertTrue(os.path.exists(path))
+        self.store.close()
+        self.assertFalse(os.path.exists(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import random
+import unittest
+from datetime import timedelta
+from services.prospect_audit_rules import AuditContext, FusedAuditExecutor, get_rules
+from services.prospect_audit_state import IncrementalAuditState
+from services.prospect_dates import normalize_prospect_dates
+from tests.fixtures import NOW, make_prospects
+from tests.test_prospect_audit_rules import plain
+
+
+def by_id(rows):
+    return sorted(rows, key=lambda row: row['id'])
+
+def by_group(rows):
+    return sorted(((row['email'], sorted(m['id'] for m in row['prospects'])) for row in rows))
+
+
+class IncrementalAuditStateTest(unittest.TestCase):
+    def setUp(self):
+        self.prospects = {p['id']: p for p in (normalize_prospect_dates(p) for p in make_prospects(3000, seed=2))}
+        self.state = IncrementalAuditState()
+        self.state.advance_clock(NOW)
+        self.state.load(list(self.prospects.values()))
+
+    def assert_matches_full_audit(self, now):
+        expected = plain(FusedAuditExecutor(get_rules(), AuditContext(now=now)).run(list(self.prospects.values())))
+        results = plain(self.state.results(now))
+        self.assertEqual(results['total_prospects'], len(self.prospects))
+        for name in ('inactive_prospects', 'missing_fields', 'scoring_issues'):
+            self.assertEqual(results[name]['count'], len(expected[name]), name)
+            self.assertEqual(by_id(results[name]['details']), by_id(expected[name]), name)
+        self.assertEqual(by_group(results['duplicates']['details']), by_group(expected['duplicates']))
+        summary = self.state.summary(now)
+        self.assertEqual(summary['active_prospects'], sum(1 for p in self.prospects.values() if p['lastActivityAt']))
+        self.assertEqual(summary['duplicate_count'], len(expected['duplicates']))
+
+    def test_load_matches_full_audit(self):
+        self.assert_matches_full_audit(NOW)
+
+    def test_change_sets_match_full_recompute(self):
+        rng = random.Random(4)
+        for round_number in range(3):
+            upserts = [normalize_prospect_dates(p) for p in make_prospects(200, seed=10 + round_number)]
+            for prospect in upserts:
+                # Mix of updates to existing prospects and new ones
+                prospect['id'] = str(rng.randrange(3500))
+            deletes = [str(rng.randrange(3000)) for _ in range(50)]
+            soft_deleted = dict(self.prospects[next(iter(self.prospects))], isDeleted=True)
+
+            self.state.apply_changes(upserts=upserts + [soft_deleted], deletes=deletes)
+            for prospect_id in deletes:
+                self.prospects.pop(prospect_id, None)
+            for prospect in upserts:
+                self.prospects[prospect['id']] = prospect
+            self.prospects.pop(soft_deleted['id'], None)
+            self.assert_matches_full_audit(NOW)
+
+    def test_advancing_the_clock_ages_prospects_out(self):
+        later = NOW + timedelta(days=45)
+        before = self.state.count('inactive_prospects', NOW)
+        self.assert_matches_full_audit(later)
+        self.assertGreater(self.state.count('inactive_prospects', later), before)
+
+    def test_pages_slice_the_full_results(self):
+        details = plain(self.state.results(NOW))['missing_fields']['details']
+        self.assertEqual(plain(self.state.page('missing_fields', 20, 15, NOW)), details[20:35])
+        duplicates = plain(self.state.results(NOW))['duplicates']['details']
+        self.assertEqual(plain(self.state.page('duplicates', 3, 4, NOW)), duplicates[3:7])
+
+
+if __name__ == '__main__':
+    unittest.main()
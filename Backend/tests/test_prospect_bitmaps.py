@@ -0,0 +1,110 @@
+import random
+import unittest
+from unittest import mock
+from services import prospect_bitmaps
+from services.prospect_bitmaps import (
+    PREDICATES, DateIndex, ProspectBitmapIndex, bitmap_count, bitmap_from_flags, bitmap_from_positions, bitmap_positions
+)
+from services.prospect_dates import NO_TIMESTAMP, normalize_prospect_dates, prospect_timestamp
+from services.prospect_records import ProspectRecord
+from tests.fixtures import make_prospects
+
+
+class BitmapHelperTest(unittest.TestCase):
+    def test_positions_round_trip(self):
+        rng = random.Random(1)
+        for size in (0, 1, 63, 64, 65, 1000):
+            positions = sorted(rng.sample(range(size), size // 3)) if size else []
+            bitmap = bitmap_from_positions(positions, size)
+            self.assertEqual(bitmap_positions(bitmap), positions)
+            self.assertEqual(bitmap_count(bitmap), len(positions))
+            self.assertEqual(bitmap_from_flags(i in positions for i in range(size)), bitmap)
+
+    def test_positions_start_and_limit(self):
+        positions = list(range(0, 300000, 3))
+        bitmap = bitmap_from_positions(positions, 300000)
+        # Deep starts skip whole blocks before scanning
+        for start in (0, 1, 21845, 50000, len(positions) - 1, len(positions)):
+            self.assertEqual(bitmap_positions(bitmap, start, 10), positions[start:start + 10])
+        self.assertEqual(bitmap_positions(0), [])
+        self.assertEqual(bitmap_positions(0b1010, 1), [3])
+
+
+class ProspectBitmapIndexTest(unittest.TestCase):
+    def setUp(self):
+        prospects = make_prospects(2000, seed=12)
+        for prospect in prospects[::4]:
+            prospect['assignedTo'] = 'current_user_id'
+        for prospect in prospects[::6]:
+            prospect['isPaused'] = True
+        self.prospects = [ProspectRecord.from_dict(normalize_prospect_dates(p)) if i % 2 else p
+                          for i, p in enumerate(prospects)]
+        self.index = ProspectBitmapIndex(self.prospects)
+
+    def naive_view(self, terms):
+        rows = []
+        for prospect in self.prospects:
+            if all(bool(PREDICATES[term.lstrip('!')](prospect)) != term.startswith('!') for term in terms):
+                rows.append(prospect)
+        return rows
+
+    def test_predicates_match_a_linear_scan(self):
+        for name in PREDICATES:
+            for terms in ((name,), ('!' + name,)):
+                bitmap = self.index.view(terms)
+                expected = self.naive_view(terms)
+                self.assertEqual(self.index.count(bitmap), len(expected), terms)
+                self.assertEqual(self.index.rows(bitmap), expected, terms)
+
+    def test_combined_views_and_paging(self):
+        terms = ('has_activity', '!in_salesforce', 'mailable')
+        bitmap = self.index.view(terms)
+        expected = self.naive_view(terms)
+        self.assertEqual(self.index.rows(bitmap, 7, 20), expected[7:27])
+        self.assertEqual(self.index.view(()), self.index.all)
+
+    def test_value_bitmaps(self):
+        expected = [p for p in self.prospects if p.get('grade') == 'B']
+        self.assertEqual(self.index.rows(self.index.value_bitmap('grade', 'B')), expected)
+        self.assertEqual(self.index.value_bitmap('grade', 'Z'), 0)
+        # Unique per row, so too many distinct values to index
+        self.assertIsNone(self.index.value_bitmap('id', '1'))
+
+    def test_result_cache_is_bounded(self):
+        for n in range(100):
+            self.index.cache_result(('plan', n), n + 1)
+        self.assertIsNone(self.index.cached_result(('plan', 0)))
+        self.assertEqual(self.index.cached_result(('plan', 99)), 100)
+
+
+class DateIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.prospects = [normalize_prospect_dates(p) for p in make_prospects(1500, seed=13)]
+        # Small blocks so ranges span many prefix bitmaps and partial blocks
+        patch = mock.patch.object(prospect_bitmaps, 'DATE_BLOCK_ROWS', 64)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_ranges_match_a_linear_scan(self):
+        rng = random.Random(2)
+        for field in ('lastActivityAt', 'createdAt', 'firstAssignedAt'):
+            index = DateIndex(self.prospects, field)
+            timestamps = [prospect_timestamp(p, field) for p in self.prospects]
+            real = sorted(ts for ts in timestamps if ts != NO_TIMESTAMP)
+            bounds = [(real[0], real[-1]), (real[-1] + 1, real[-1] + 10), (NO_TIMESTAMP, NO_TIMESTAMP)]
+            bounds += [tuple(sorted(rng.sample(real, 2))) for _ in range(30)]
+            for start, end in bounds:
+                expected = [i for i, ts in enumerate(timestamps) if start <= ts <= end]
+                self.assertEqual(bitmap_positions(index.range_bitmap(start, end)), expected, (field, start, end))
+                self.assertEqual(sorted(index.row_positions(start, end)), expected)
+
+    def test_after_bitmap(self):
+        index = ProspectBitmapIndex(self.prospects)
+        cutoff = sorted(prospect_timestamp(p, 'lastActivityAt') for p in self.prospects)[1000]
+        expected = [p for p in self.prospects if prospect_timestamp(p, 'lastActivityAt') > cutoff]
+        self.assertEqual(index.rows(index.after_bitmap('lastActivityAt', cutoff)), expected)
+        self.assertEqual(ProspectBitmapIndex([]).after_bitmap('lastActivityAt', 0), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
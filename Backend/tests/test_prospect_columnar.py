@@ -0,0 +1,66 @@
+import io
+import unittest
+import zipfile
+from services.prospect_columnar import columnar_available, export_columnar
+from services.prospect_export import iter_section_rows
+from tests.test_prospect_audit_rules import plain
+from tests.test_prospect_export import audit_sections
+
+if columnar_available():
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+
+def read_table(data, export_format):
+    if export_format == 'parquet':
+        return pq.read_table(io.BytesIO(data))
+    return pa.ipc.open_file(pa.BufferReader(data)).read_all()
+
+def expected_rows(rows, section):
+    """Exported rows as read back: columns mixing value types come back as strings"""
+    rows = plain(list(iter_section_rows(rows, section)))
+    for name in rows[0] if rows else ():
+        if len({type(row[name]) for row in rows if row[name] is not None}) > 1:
+            for row in rows:
+                if row[name] is not None:
+                    row[name] = str(row[name])
+    return rows
+
+
+@unittest.skipUnless(columnar_available(), "pyarrow is not installed")
+class ColumnarExportTest(unittest.TestCase):
+    def setUp(self):
+        self.sections = audit_sections(800)
+
+    def test_round_trip(self):
+        for export_format in ('parquet', 'arrow'):
+            for section, rows in self.sections.items():
+                buffer, _, extension = export_columnar([(section, rows)], export_format)
+                self.assertEqual(extension, export_format)
+                table = read_table(buffer.getvalue(), export_format)
+                self.assertEqual(table.to_pylist(), expected_rows(rows, section), (export_format, section))
+
+    def test_repeated_strings_are_dictionary_encoded(self):
+        buffer, _, _ = export_columnar([('all_prospects', self.sections['all_prospects'])], 'arrow')
+        schema = read_table(buffer.getvalue(), 'arrow').schema
+        self.assertTrue(pa.types.is_dictionary(schema.field('country').type))
+        self.assertFalse(pa.types.is_dictionary(schema.field('id').type))
+
+    def test_mixed_types_become_strings(self):
+        rows = [{'id': '1', 'score': 10}, {'id': '2', 'score': 'N/A'}, {'id': '3', 'score': None}]
+        buffer, _, _ = export_columnar([('scoring_issues', rows)], 'parquet')
+        self.assertEqual(read_table(buffer.getvalue(), 'parquet').column('score').to_pylist(), ['10', 'N/A', None])
+
+    def test_several_sections_are_zipped(self):
+        names = ['inactive', 'duplicates']
+        buffer, mimetype, extension = export_columnar([(name, self.sections[name]) for name in names], 'parquet')
+        self.assertEqual((mimetype, extension), ('application/zip', 'zip'))
+        with zipfile.ZipFile(buffer) as archive:
+            self.assertEqual(archive.namelist(), ['inactive.parquet', 'duplicates.parquet'])
+            for name in names:
+                table = read_table(archive.read(f"{name}.parquet"), 'parquet')
+                self.assertEqual(table.num_rows, len(list(iter_section_rows(self.sections[name], name))))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+from datetime import datetime, timezone
+from services.prospect_dates import NO_TIMESTAMP, normalize_prospect_dates, prospect_timestamp, to_epoch
+
+
+class ToEpochTest(unittest.TestCase):
+    def test_iso_formats(self):
+        expected = int(datetime(2026, 3, 1, 8, 30, tzinfo=timezone.utc).timestamp())
+        self.assertEqual(to_epoch('2026-03-01T08:30:00Z'), expected)
+        self.assertEqual(to_epoch('2026-03-01T08:30:00+00:00'), expected)
+        self.assertEqual(to_epoch('2026-03-01T10:30:00+02:00'), expected)
+        # Naive values are read as UTC
+        self.assertEqual(to_epoch('2026-03-01T08:30:00'), expected)
+        self.assertEqual(to_epoch(' 2026-03-01 '), expected - 8 * 3600 - 30 * 60)
+
+    def test_missing_and_invalid_values(self):
+        for value in (None, '', '   ', 'garbage'):
+            self.assertEqual(to_epoch(value), NO_TIMESTAMP, value)
+
+
+class NormalizeTest(unittest.TestCase):
+    def test_companion_fields(self):
+        prospect = normalize_prospect_dates({'lastActivityAt': '2026-03-01T00:00:00Z', 'createdAt': ''})
+        self.assertEqual(prospect['lastActivityTs'], to_epoch('2026-03-01'))
+        self.assertEqual(prospect['createdTs'], NO_TIMESTAMP)
+        self.assertEqual(prospect['updatedTs'], NO_TIMESTAMP)
+
+    def test_unnormalized_prospects_are_parsed_on_read(self):
+        prospect = {'lastActivityAt': '2026-03-01'}
+        self.assertEqual(prospect_timestamp(prospect, 'lastActivityAt'), to_epoch('2026-03-01'))
+        self.assertEqual(prospect_timestamp({'lastActivityAt': 'x', 'lastActivityTs': 5}, 'lastActivityAt'), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
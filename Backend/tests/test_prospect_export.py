@@ -0,0 +1,76 @@
+import csv
+import gzip
+import io
+import json
+import unittest
+from services.prospect_audit_rules import AuditContext, FusedAuditExecutor, get_rules
+from services.prospect_dates import normalize_prospect_dates
+from services.prospect_export import iter_section_rows, stream_export
+from services.prospect_records import ProspectRecord
+from tests.fixtures import NOW, make_prospects
+from tests.test_prospect_audit_rules import plain
+
+
+def audit_sections(count=1200):
+    """Export sections as the routes hold them: records and referencing detail rows"""
+    records = [ProspectRecord.from_dict(normalize_prospect_dates(p)) for p in make_prospects(count, seed=40)]
+    results = FusedAuditExecutor(get_rules(), AuditContext(now=NOW)).run(records)
+    return {
+        'all_prospects': records,
+        'duplicates': results['duplicates'],
+        'inactive': results['inactive_prospects'],
+        'missing_fields': results['missing_fields'],
+        'scoring_issues': results['scoring_issues']
+    }
+
+def expected_rows(rows, section):
+    return plain(list(iter_section_rows(rows, section)))
+
+
+class StreamExportTest(unittest.TestCase):
+    def setUp(self):
+        self.sections = audit_sections()
+
+    def test_ndjson_round_trip(self):
+        for section, rows in self.sections.items():
+            body = b''.join(stream_export([(section, iter_section_rows(rows, section))]))
+            decoded = [json.loads(line) for line in body.decode('utf-8').splitlines()]
+            self.assertEqual(decoded, expected_rows(rows, section), section)
+
+    def test_ndjson_sections_are_tagged(self):
+        names = ['duplicates', 'scoring_issues']
+        body = b''.join(stream_export([(name, iter_section_rows(self.sections[name], name)) for name in names]))
+        decoded = [json.loads(line) for line in body.decode('utf-8').splitlines()]
+        for name in names:
+            self.assertEqual([line['data'] for line in decoded if line['section'] == name],
+                             expected_rows(self.sections[name], name))
+
+    def test_csv_round_trip(self):
+        for section in ('all_prospects', 'missing_fields', 'duplicates'):
+            rows = expected_rows(self.sections[section], section)
+            body = b''.join(stream_export([(section, iter_section_rows(self.sections[section], section))], 'csv'))
+            decoded = list(csv.DictReader(io.StringIO(body.decode('utf-8'))))
+            self.assertEqual(len(decoded), len(rows), section)
+            for row, original in zip(decoded, rows):
+                self.assertEqual(list(row), list(original))
+                for key, value in original.items():
+                    if isinstance(value, list):
+                        value = '; '.join(str(v) for v in value)
+                    self.assertEqual(row[key], '' if value is None else str(value), (section, key))
+
+    def test_csv_needs_one_section(self):
+        with self.assertRaises(ValueError):
+            stream_export([('inactive', []), ('missing_fields', [])], 'csv')
+
+    def test_gzip_stream_decompresses_to_the_plain_stream(self):
+        for export_format in ('ndjson', 'csv'):
+            section = [('inactive', iter_section_rows(self.sections['inactive'], 'inactive'))]
+            plain_body = b''.join(stream_export(section, export_format))
+            section = [('inactive', iter_section_rows(self.sections['inactive'], 'inactive'))]
+            chunks = list(stream_export(section, export_format, compress=True))
+            self.assertGreater(len(chunks), 1)
+            self.assertEqual(gzip.decompress(b''.join(chunks)), plain_body)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import random
+import unittest
+from services.prospect_dates import normalize_prospect_dates
+from services.prospect_pagination import ProspectSnapshot, StaleCursorError, decode_cursor, row_sort_key
+from tests.fixtures import make_prospects
+from tests.test_prospect_routes import ProspectRouteTestCase
+
+
+def walk(snapshot, tab, column, order, limit):
+    """Every row of a tab, read page by page through next cursors"""
+    rows, cursor = [], None
+    while True:
+        page, _, cursor = snapshot.page(tab, column, order, limit=limit, cursor=cursor)
+        rows.extend(page)
+        if cursor is None:
+            return rows
+
+def ids(rows):
+    return [row['id'] for row in rows]
+
+
+class KeysetCursorTest(unittest.TestCase):
+    def setUp(self):
+        # Few distinct scores and grades, so most sort values are ties
+        self.rows = [normalize_prospect_dates(p) for p in make_prospects(700, seed=6)]
+        self.snapshot = ProspectSnapshot({'all_prospects': self.rows})
+
+    def test_cursor_walk_visits_every_row_once_in_order(self):
+        for column in ('score', 'grade', 'lastActivityAt', 'email'):
+            for order in ('asc', 'desc'):
+                expected = sorted(self.rows, key=lambda row: row_sort_key(row, column), reverse=order == 'desc')
+                self.assertEqual(ids(walk(self.snapshot, 'all_prospects', column, order, 33)), ids(expected), (column, order))
+
+    def test_unsorted_walk_keeps_stored_order(self):
+        self.assertEqual(ids(walk(self.snapshot, 'all_prospects', None, 'asc', 50)), ids(self.rows))
+
+    def test_sorted_cursor_continues_across_a_refresh(self):
+        for order in ('asc', 'desc'):
+            first_page, _, cursor = self.snapshot.page('all_prospects', 'score', order, limit=100)
+            _, _, _, after = decode_cursor(cursor)
+
+            # A refresh adds, drops and rescores rows and reorders the list
+            rng = random.Random(3)
+            refreshed = [dict(row) for row in self.rows if rng.random() > 0.1]
+            rescored = set()
+            for row in refreshed[::9]:
+                row['score'] = rng.choice([0, 30, 60])
+                rescored.add(row['id'])
+            refreshed += [dict(row, id=f"new-{row['id']}") for row in self.rows[:40]]
+            rng.shuffle(refreshed)
+            newer = ProspectSnapshot({'all_prospects': refreshed})
+
+            rest = walk_from(newer, 'all_prospects', 'score', order, cursor)
+            expected = sorted(refreshed, key=lambda row: row_sort_key(row, 'score'), reverse=order == 'desc')
+            if order == 'asc':
+                expected = [row for row in expected if row_sort_key(row, 'score') > after]
+            else:
+                expected = [row for row in expected if row_sort_key(row, 'score') < after]
+            self.assertEqual(ids(rest), ids(expected), order)
+            # Rows already shown are not repeated unless their score moved
+            self.assertFalse((set(ids(first_page)) - rescored) & set(ids(rest)))
+
+    def test_position_cursor_from_an_older_version_is_stale(self):
+        _, _, cursor = self.snapshot.page('all_prospects', limit=10)
+        newer = ProspectSnapshot({'all_prospects': self.rows})
+        with self.assertRaises(StaleCursorError):
+            newer.page('all_prospects', cursor=cursor)
+        # The issuing version still accepts it
+        self.assertEqual(ids(self.snapshot.page('all_prospects', cursor=cursor)[0]), ids(self.rows[10:20]))
+
+    def test_cursor_must_match_the_sort(self):
+        _, _, cursor = self.snapshot.page('all_prospects', 'score', 'asc', limit=10)
+        with self.assertRaises(ValueError):
+            self.snapshot.page('all_prospects', 'score', 'desc', cursor=cursor)
+        with self.assertRaises(ValueError):
+            self.snapshot.page('all_prospects', 'score', 'asc', cursor='not-a-cursor')
+
+    def test_duplicate_groups_break_ties_by_email(self):
+        groups = [{'email': f"{name}@example.com", 'count': 2, 'prospects': []} for name in 'dbeac']
+        snapshot = ProspectSnapshot({'duplicates': groups})
+        rows = walk(snapshot, 'duplicates', 'count', 'asc', 2)
+        self.assertEqual([row['email'] for row in rows], sorted(row['email'] for row in groups))
+
+
+def walk_from(snapshot, tab, column, order, cursor, limit=37):
+    rows = []
+    while cursor is not None:
+        page, _, cursor = snapshot.page(tab, column, order, limit=limit, cursor=cursor)
+        rows.extend(page)
+    return rows
+
+
+class StaleCursorRouteTest(ProspectRouteTestCase):
+    def test_stale_cursor_is_a_conflict(self):
+        self.client.get('/get-prospect-health')
+        cursor = self.client.get('/get-all-prospects?per_page=5').get_json()['pagination']['next_cursor']
+        self.changes = [dict(self.prospects[0], company='Renamed Co')]
+        self.client.post('/refresh-prospect-health')
+        response = self.client.get(f'/get-all-prospects?per_page=5&cursor={cursor}')
+        self.assertEqual(response.status_code, 409)
+
+    def test_sorted_cursor_survives_a_refresh(self):
+        self.client.get('/get-prospect-health')
+        cursor = self.client.get('/get-all-prospects?per_page=5&sort=score').get_json()['pagination']['next_cursor']
+        self.changes = [dict(self.prospects[0], company='Renamed Co')]
+        self.client.post('/refresh-prospect-health')
+        response = self.client.get(f'/get-all-prospects?per_page=5&sort=score&cursor={cursor}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()['all_prospects']), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,180 @@
+import unittest
+from datetime import datetime, timedelta
+from services.prospect_bitmaps import PREDICATES, ProspectBitmapIndex
+from services.prospect_dates import datetime_to_epoch, normalize_prospect_dates, prospect_timestamp
+from services.prospect_filter_service import ProspectFilterService
+from services.prospect_query import (
+    DATE_FIELDS, FACET_DATE_PRESETS, FACET_VIEWS, RECENT_ACTIVITY_VIEWS, TIME_LABELS, VIEWS,
+    compile_filter, facet_counts, filter_bitmap, resolve_date_preset, run_filter
+)
+from services.prospect_records import ProspectRecord
+from tests.fixtures import make_prospects
+from tests.test_prospect_routes import ProspectRouteTestCase
+
+# Naive local time, as the filter engine resolves presets (a Monday)
+NOW = datetime(2026, 6, 15, 12, 0)
+
+
+def day(month, day_of_month, year=2026):
+    return datetime(year, month, day_of_month)
+
+def end_of(month, day_of_month, year=2026):
+    return datetime(year, month, day_of_month, 23, 59, 59, 999999)
+
+
+def naive_filter(prospects, filters, now):
+    """One pass per row, spelling out the filter service semantics"""
+    view = filters.get('view') or 'all_prospects'
+    terms = VIEWS.get(view, ())
+    date_range = None
+    field = None
+    include_missing = False
+    if filters.get('time') not in (None, '', "All Time"):
+        activity = filters.get('activity') or "Last Activity"
+        field = DATE_FIELDS.get(activity)
+        include_missing = activity == "Last Activity"
+        date_range = resolve_date_preset(TIME_LABELS.get(filters['time']), now,
+                                         filters.get('customStartDate'), filters.get('customEndDate'))
+    elif filters.get('date_range') not in (None, '', 'all_time'):
+        field = DATE_FIELDS.get(filters.get('date_field') or 'last_activity', 'lastActivityAt')
+        date_range = resolve_date_preset(filters['date_range'], now, filters.get('start_date'), filters.get('end_date'))
+    tags = [t.strip().lower() for t in (filters.get('tags') or '').split(',') if t.strip()]
+
+    rows = []
+    for prospect in prospects:
+        if not all(bool(PREDICATES[t.lstrip('!')](prospect)) != t.startswith('!') for t in terms):
+            continue
+        if view in RECENT_ACTIVITY_VIEWS:
+            cutoff = datetime_to_epoch(now - timedelta(days=RECENT_ACTIVITY_VIEWS[view]))
+            if prospect_timestamp(prospect, 'lastActivityAt') <= cutoff:
+                continue
+        if date_range is not None:
+            in_range = field is not None and (
+                datetime_to_epoch(date_range[0]) <= prospect_timestamp(prospect, field) <= datetime_to_epoch(date_range[1])
+            )
+            if not in_range and not (include_missing and not prospect.get('lastActivityAt')):
+                continue
+        if tags:
+            prospect_tags = [tag.lower() for tag in prospect.get('tags') or ()]
+            if not any(term in tag for term in tags for tag in prospect_tags):
+                continue
+        rows.append(prospect)
+    return rows
+
+
+class DatePresetTest(unittest.TestCase):
+    def test_presets(self):
+        expected = {
+            'today': (day(6, 15), NOW),
+            'yesterday': (day(6, 14), end_of(6, 14)),
+            'last_7_days': (day(6, 9), NOW),
+            'rolling_7_days': (datetime(2026, 6, 8, 12, 0), NOW),
+            'last_week': (day(6, 7), end_of(6, 13)),
+            'last_week_monday': (day(6, 8), end_of(6, 14)),
+            'this_month': (day(6, 1), NOW),
+            'last_month': (day(5, 1), end_of(5, 31)),
+            'this_quarter': (day(4, 1), NOW),
+            'last_quarter': (day(1, 1), end_of(3, 31)),
+            'this_year': (day(1, 1), NOW),
+            'last_year': (day(1, 1, 2025), end_of(12, 31, 2025))
+        }
+        for preset, bounds in expected.items():
+            self.assertEqual(resolve_date_preset(preset, NOW), bounds, preset)
+        self.assertIsNone(resolve_date_preset('all_time', NOW))
+        self.assertIsNone(resolve_date_preset('custom', NOW))
+
+    def test_year_boundaries(self):
+        january = datetime(2026, 1, 10, 9, 30)
+        self.assertEqual(resolve_date_preset('last_month', january), (day(12, 1, 2025), end_of(12, 31, 2025)))
+        self.assertEqual(resolve_date_preset('last_quarter', january), (day(10, 1, 2025), end_of(12, 31, 2025)))
+
+    def test_custom_ranges(self):
+        self.assertEqual(resolve_date_preset('custom', NOW, '2026-02-03T10:00:00', '2026-02-05'),
+                         (day(2, 3), end_of(2, 5)))
+        self.assertEqual(resolve_date_preset('custom_exact', NOW, '2026-02-03T10:00:00', '2026-02-05'),
+                         (datetime(2026, 2, 3, 10, 0), day(2, 5)))
+
+
+class FilterPlanTest(unittest.TestCase):
+    def setUp(self):
+        prospects = make_prospects(1600, seed=21, now=NOW.astimezone())
+        for i, prospect in enumerate(prospects):
+            prospect['tags'] = ['Webinar', 'Trade Show'] if i % 5 == 0 else (['webinar 2026'] if i % 7 == 0 else [])
+            prospect['assignedTo'] = prospect['assignedToId']
+        self.prospects = [ProspectRecord.from_dict(normalize_prospect_dates(p)) for p in prospects[:800]]
+        # Records carry no tags; keep some plain dicts so tag filters see them
+        self.prospects += [normalize_prospect_dates(p) for p in prospects[800:]]
+        self.index = ProspectBitmapIndex(self.prospects)
+
+    def test_service_filters_match_a_linear_scan(self):
+        views = [name for name in VIEWS if name[0].isupper()] + ['Unknown View']
+        for view in views:
+            for activity in ("Last Activity", "Created", "Updated", "First Assigned"):
+                for time_filter in ["All Time"] + list(TIME_LABELS):
+                    filters = {'view': view, 'activity': activity, 'time': time_filter,
+                               'customStartDate': '2025-09-01', 'customEndDate': '2026-03-31T12:00:00'}
+                    expected = naive_filter(self.prospects, filters, NOW)
+                    self.assertEqual(run_filter(self.prospects, filters, self.index, NOW), expected, filters)
+
+    def test_route_filters_match_a_linear_scan(self):
+        for view in FACET_VIEWS:
+            for date_field in ('last_activity', 'created', 'updated', 'first_assigned'):
+                for date_range in ('all_time', 'custom') + FACET_DATE_PRESETS:
+                    filters = {'view': view, 'date_field': date_field, 'date_range': date_range,
+                               'start_date': '2025-12-01', 'end_date': '2026-02-15'}
+                    expected = naive_filter(self.prospects, filters, NOW)
+                    self.assertEqual(self.index.rows(filter_bitmap(self.index, filters, NOW)), expected, filters)
+
+    def test_tags_and_field_predicates(self):
+        filters = {'view': "Mailable Prospects", 'tags': 'webinar, expo'}
+        self.assertEqual(run_filter(self.prospects, filters, self.index, NOW), naive_filter(self.prospects, filters, NOW))
+
+        filters = {'view': 'unassigned_prospects', 'fields': [
+            {'field': 'country', 'op': 'eq', 'value': 'UK'},
+            {'field': 'score', 'op': 'gt', 'value': 50},
+            {'field': 'company', 'op': 'contains', 'value': 'acm'}
+        ]}
+        expected = [p for p in self.prospects if not p.get('assignedToId') and p.get('country') == 'UK'
+                    and p.get('score') > 50 and 'acm' in p.get('company').lower()]
+        self.assertEqual(run_filter(self.prospects, filters, self.index, NOW), expected)
+        with self.assertRaises(ValueError):
+            compile_filter({'fields': [{'field': 'score', 'op': 'between'}]})
+
+    def test_results_and_plans_are_cached(self):
+        filters = {'view': 'active_prospects', 'date_range': 'last_month'}
+        first = filter_bitmap(self.index, filters, NOW)
+        self.assertIs(compile_filter(dict(filters)), compile_filter(filters))
+        self.assertEqual(filter_bitmap(self.index, filters, NOW), first)
+        self.assertEqual(len(self.index._results), 1)
+
+    def test_activity_in_the_current_minute_is_kept(self):
+        prospect = normalize_prospect_dates({'id': '1', 'createdAt': datetime.now().isoformat(), 'lastActivityAt': ''})
+        rows = ProspectFilterService([prospect]).apply_filters("All Prospects", "Created", "Today")
+        self.assertEqual(rows, [prospect])
+
+    def test_facets_are_popcounts_of_the_filters(self):
+        facets = facet_counts(self.index, 'mailable_prospects', 'created', NOW)
+        for view in FACET_VIEWS:
+            self.assertEqual(facets['views'][view], len(naive_filter(self.prospects, {'view': view}, NOW)), view)
+        for preset in FACET_DATE_PRESETS:
+            filters = {'view': 'mailable_prospects', 'date_field': 'created', 'date_range': preset}
+            self.assertEqual(facets['date_ranges'][preset], len(naive_filter(self.prospects, filters, NOW)), preset)
+
+
+class FacetRouteTest(ProspectRouteTestCase):
+    def test_facet_counts_equal_filtered_totals(self):
+        now = datetime.now().astimezone()
+        for prospect in self.prospects[:20]:
+            prospect['lastActivityAt'] = now.isoformat()
+        self.client.get('/get-prospect-health')
+        facets = self.client.get('/prospect-facets?view=active_prospects').get_json()
+        for preset in ('today', 'this_month', 'last_year'):
+            filtered = self.client.post('/filter-prospects', json={
+                'filters': {'view': 'active_prospects', 'date_range': preset}
+            }).get_json()
+            self.assertEqual(facets['date_ranges'][preset], filtered['filtered_count'], preset)
+        self.assertGreaterEqual(facets['date_ranges']['today'], 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
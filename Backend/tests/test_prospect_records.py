@@ -0,0 +1,54 @@
+import unittest
+from services.prospect_audit_rules import AuditContext, FusedAuditExecutor, get_rules
+from services.prospect_dates import normalize_prospect_dates
+from services.prospect_records import IssueRow, ProspectRecord, compact_audit_results
+from tests.fixtures import NOW, make_prospects
+from tests.test_prospect_audit_rules import plain
+
+
+class ProspectRecordTest(unittest.TestCase):
+    def test_dict_round_trip(self):
+        prospect = normalize_prospect_dates(make_prospects(1)[0])
+        record = ProspectRecord.from_dict(prospect)
+        self.assertEqual(record.to_dict(), prospect)
+        self.assertIs(ProspectRecord.from_dict(record), record)
+
+    def test_dict_access(self):
+        record = ProspectRecord(id='1', country='US')
+        self.assertEqual(record['country'], 'US')
+        self.assertIsNone(record.get('email'))
+        self.assertEqual(record.get('notAField', 'x'), 'x')
+        self.assertIn('email', record)
+        with self.assertRaises(KeyError):
+            record['notAField']
+
+    def test_low_cardinality_strings_are_shared(self):
+        a = ProspectRecord(country=''.join(['U', 'S']))
+        b = ProspectRecord(country=''.join(['U', 'S']))
+        self.assertIs(a.country, b.country)
+
+
+class CompactAuditResultsTest(unittest.TestCase):
+    def test_compacted_rows_serialize_unchanged(self):
+        prospects = [normalize_prospect_dates(p) for p in make_prospects(800, seed=4)]
+        audit = FusedAuditExecutor(get_rules(), AuditContext(now=NOW)).run(prospects)
+        results = plain({
+            'all_prospects': prospects,
+            'duplicates': {'count': len(audit['duplicates']), 'details': audit['duplicates']},
+            'inactive_prospects': {'count': len(audit['inactive_prospects']), 'details': audit['inactive_prospects']},
+            'missing_fields': {'count': len(audit['missing_fields']), 'details': audit['missing_fields']},
+            'scoring_issues': {'count': len(audit['scoring_issues']), 'details': audit['scoring_issues']}
+        })
+
+        compact = compact_audit_results(results)
+        self.assertEqual(plain(compact), results)
+        records = {record.id: record for record in compact['all_prospects']}
+        row = compact['inactive_prospects']['details'][0]
+        self.assertIsInstance(row, IssueRow)
+        self.assertIs(row.prospect, records[row['id']])
+        member = compact['duplicates']['details'][0]['prospects'][0]
+        self.assertIs(member.prospect, records[member['id']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import contextlib
+import io
+import json
+import time
+import unittest
+from unittest import mock
+import jwt
+import routes.prospect_routes as prospect_routes
+from app import create_app
+from cache import _json_default
+from config.settings import SECRET_KEY
+from services.prospect_audit_state import IncrementalAuditState
+from services.prospect_service import ProspectHealthAuditor
+from tests.fixtures import make_prospects
+
+ACCESS_TOKEN = 'test-access-token-0123456789'
+CACHE_KEY = f"prospects:{ACCESS_TOKEN[:20]}"
+
+
+class FakeCache:
+    """Redis stand-in shared by every simulated worker: JSON values with expiry"""
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        entry = self.values.get(key)
+        if entry is None or entry[1] <= time.time():
+            return None
+        return json.loads(entry[0])
+
+    def set(self, key, value, ttl=3600):
+        self.values[key] = (json.dumps(value, default=_json_default), time.time() + ttl)
+        return True
+
+
+class ProspectRouteTestCase(unittest.TestCase):
+    """Flask test client with auth, the Pardot API and Redis faked out"""
+    def setUp(self):
+        self.cache = FakeCache()
+        self.prospects = make_prospects(1500, seed=8)
+        self.changes = []
+        self.full_fetches = 0
+
+        def get_all_prospects(auditor, max_records=None, filters=None):
+            self.full_fetches += 1
+            return [dict(p) for p in self.prospects]
+
+        patches = [
+            mock.patch('middleware.auth_middleware.auth_service.get_valid_access_token', return_value=ACCESS_TOKEN),
+            mock.patch.object(prospect_routes, 'get_cached_data', self.cache.get),
+            mock.patch.object(prospect_routes, 'set_cached_data', self.cache.set),
+            mock.patch.object(ProspectHealthAuditor, 'get_all_prospects', get_all_prospects),
+            mock.patch.object(ProspectHealthAuditor, 'get_prospect_changes', lambda auditor, since: [dict(p) for p in self.changes]),
+            # The routes log every request; keep test output readable
+            contextlib.redirect_stdout(io.StringIO())
+        ]
+        for patch in patches:
+            patch.__enter__()
+            self.addCleanup(patch.__exit__, None, None, None)
+        for store in (prospect_routes._audit_states, prospect_routes._tab_cache, prospect_routes._memory_cache):
+            self.addCleanup(store.clear)
+
+        self.client = create_app().test_client()
+        self.client.set_cookie('auth_token', jwt.encode({'token_ref': ACCESS_TOKEN[:10]}, SECRET_KEY, algorithm='HS256'))
+
+    def switch_worker(self):
+        """Drop this process's in-memory state, as if another gunicorn worker answered"""
+        prospect_routes._audit_states.clear()
+        prospect_routes._tab_cache.clear()
+        prospect_routes._memory_cache.clear()
+
+
+class AuditStateLifecycleTest(ProspectRouteTestCase):
+    def refresh_with_new_duplicates(self):
+        self.changes = [dict(p, email='shared@example.net') for p in self.prospects[:40]]
+        return self.client.post('/refresh-prospect-health').get_json()
+
+    def test_refresh_is_visible_to_other_workers(self):
+        before = self.client.get('/get-prospect-health').get_json()
+        refreshed = self.refresh_with_new_duplicates()
+        self.assertEqual(refreshed['changed_prospects'], 40)
+        self.assertNotEqual(refreshed['duplicate_count'], before['duplicate_count'])
+
+        self.switch_worker()
+        summary = self.client.get('/get-prospect-health').get_json()
+        self.assertEqual(summary['duplicate_count'], refreshed['duplicate_count'])
+        page = self.client.get('/get-duplicate-prospects?per_page=5').get_json()
+        self.assertEqual(page['pagination']['total'], refreshed['duplicate_count'])
+        self.assertEqual(self.full_fetches, 1)
+
+    def test_state_superseded_by_another_worker_is_dropped(self):
+        self.client.get('/get-prospect-health')
+        self.refresh_with_new_duplicates()
+        self.assertIsNotNone(prospect_routes.get_audit_state(CACHE_KEY))
+        self.cache.set(f"{CACHE_KEY}:synced_at", 'refreshed-elsewhere')
+        self.assertIsNone(prospect_routes.get_audit_state(CACHE_KEY))
+        self.assertNotIn(CACHE_KEY, prospect_routes._audit_states)
+
+    def test_expired_state_falls_back_to_full_audit(self):
+        self.client.get('/get-prospect-health')
+        self.refresh_with_new_duplicates()
+        state = prospect_routes._audit_states[CACHE_KEY][0]
+        state.expires_at = time.time() - 1
+        prospect_routes.put_audit_state(CACHE_KEY, state)
+        self.cache.values.clear()
+
+        self.assertIsNone(prospect_routes.get_audit_state(CACHE_KEY))
+        self.client.get('/get-prospect-health')
+        self.assertEqual(self.full_fetches, 2)
+
+    def test_refresh_needs_an_unexpired_audit(self):
+        self.assertEqual(self.client.post('/refresh-prospect-health').status_code, 400)
+
+    def test_states_are_bounded(self):
+        for n in range(prospect_routes.MAX_AUDIT_STATES + 2):
+            state = IncrementalAuditState()
+            state.expires_at = time.time() + 60
+            prospect_routes.put_audit_state(f"prospects:{n}", state)
+        self.assertEqual(len(prospect_routes._audit_states), prospect_routes.MAX_AUDIT_STATES)
+        self.assertNotIn('prospects:0', prospect_routes._audit_states)
+
+
+if __name__ == '__main__':
+    unittest.main()
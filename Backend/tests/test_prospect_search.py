@@ -0,0 +1,71 @@
+import unittest
+from unittest import mock
+from services import prospect_search
+from services.prospect_search import SEARCH_FIELDS, ProspectSearchIndex, match_quality, tokenize
+from tests.fixtures import make_prospects
+
+QUERIES = (
+    'ann', 'an', 'a', 'ceo', 'xu', 'acme', 'cme', 'example', 'EXAMPLE.COM', 'u1', 'u12@example',
+    'ann acme', 'bob young engineer', 'zeller globex', 'nope', 'ann nope', 'ngin', 'strasse', 'o_brien', '@@'
+)
+
+
+def linear_search(prospects, query):
+    """Score every row directly: each query word's best weighted match, summed"""
+    words = set(tokenize(query))
+    if not words:
+        return []
+    totals = {}
+    for row, prospect in enumerate(prospects):
+        total = 0
+        for word in words:
+            best = max((match_quality(token, word) * weight
+                        for _, weight, fields in SEARCH_FIELDS
+                        for field in fields
+                        for token in tokenize(prospect.get(field))), default=0)
+            if not best:
+                break
+            total += best
+        else:
+            totals[row] = total
+    return [prospects[row] for row in sorted(totals, key=lambda row: (-totals[row], row))]
+
+
+class ProspectSearchTest(unittest.TestCase):
+    def setUp(self):
+        self.prospects = make_prospects(2000, seed=30)
+        self.prospects[5].update(lastName='Straße', company='O_Brien GmbH')
+        self.index = ProspectSearchIndex(self.prospects)
+
+    def assert_matches_linear_scan(self):
+        for query in QUERIES:
+            expected = linear_search(self.prospects, query)
+            rows, total = self.index.search(query, 0, len(self.prospects))
+            self.assertEqual(total, len(expected), query)
+            self.assertEqual(rows, expected, query)
+            # Pages are slices of the full ranking
+            self.assertEqual(self.index.search(query, 3, 7), (expected[3:10], len(expected)), query)
+
+    def test_matches_linear_scan(self):
+        self.assert_matches_linear_scan()
+
+    def test_row_checks_match_posting_walks(self):
+        # Force every later word down each of the two intersection paths
+        for ratio in (0, 10 ** 9):
+            with mock.patch.object(prospect_search, 'ROW_CHECK_RATIO', ratio):
+                self.assert_matches_linear_scan()
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize(' Ann.Lee+x@Example.COM '), ['ann', 'lee', 'x', 'example', 'com'])
+        self.assertEqual(tokenize('Straße O_Brien'), ['strasse', 'o', 'brien'])
+        self.assertEqual(tokenize(None), [])
+
+    def test_match_quality(self):
+        self.assertEqual(match_quality('acme', 'acme'), prospect_search.EXACT_MATCH)
+        self.assertEqual(match_quality('acme', 'ac'), prospect_search.PREFIX_MATCH)
+        self.assertEqual(match_quality('acme', 'cme'), prospect_search.SUBSTRING_MATCH)
+        self.assertEqual(match_quality('acme', 'me'), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()